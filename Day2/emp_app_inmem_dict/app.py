@@ -1,4 +1,5 @@
-import repo_inmem_dict as repo
+# run from Day2 as a module: python -m emp_app_inmem_dict.app
+from . import repo_inmem_dict as repo
 
 def menu():
     message = '''
@@ -21,9 +22,11 @@ Your Option:'''
         employee = {'id':id, 'name':name, 'age':age, 
                     'salary':salary, 'is_active':is_active}
 
-        repo.create_employee(employee)
-
-        print('Employee Created Successfully.')
+        try:
+            repo.create_employee(employee)
+            print('Employee Created Successfully.')
+        except ValueError as ex:
+            print(ex)
     elif choice == 2:
         print('List of Employees:')
         for employee in repo.read_all_employee():
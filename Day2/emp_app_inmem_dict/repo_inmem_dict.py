@@ -1,37 +1,48 @@
 #CRUD (Create, Read All | Read One, Update, Delete)
-#Employee App - Inmem array - dict element 
-employees = [] # [{'id':id,'name':name,'age':age,'salary':salary,'is_active':is_active}, ...]
+#Employee App - Inmem dict indexed by id - dict element 
+employees = {} # {id: {'id':id,'name':name,'age':age,'salary':salary,'is_active':is_active}, ...}
+indexed_fields = ['is_active']
+indexes = {field: {} for field in indexed_fields} # {field: {value: {id: employee}}}
+
+def _add_to_indexes(employee):
+    for field in indexed_fields:
+        indexes[field].setdefault(employee[field], {})[employee['id']] = employee
+
+def _remove_from_indexes(employee):
+    for field in indexed_fields:
+        matches = indexes[field].get(employee[field])
+        if matches is not None:
+            matches.pop(employee['id'], None)
+            if not matches:
+                del indexes[field][employee[field]]
 
 def create_employee(employee):
-    global employees 
-    employees.append(employee)
+    if employee['id'] in employees:
+        raise ValueError(f"Employee id={employee['id']} exists already.")
+    employees[employee['id']] = employee
+    _add_to_indexes(employee)
 
 def read_all_employee():
-    return employees 
+    return list(employees.values())
 
 def read_by_id(id):
-    for employee in employees:
-        if employee['id'] == id:
-            return employee 
-    return None 
+    return employees.get(id)
+
+def read_by_field(field, value):
+    if field in indexes:
+        return list(indexes[field].get(value, {}).values())
+    return [employee for employee in employees.values() if employee[field] == value]
 
 def update(id, new_employee):#new_employee is update at id
-    global employees
-    I = 0
-    for employee in employees:
-        if employee['id'] == id:
-            employees[I] = new_employee
-            break 
-        I += 1
+    employee = employees.get(id)
+    if employee is None:
+        return
+    new_employee = {**new_employee, 'id': id} # the record stays at id
+    _remove_from_indexes(employee)
+    employees[id] = new_employee
+    _add_to_indexes(new_employee)
     
 def delete_employee(id):
-    global employees
-    index = -1
-    I = 0
-    for employee in employees:
-        if employee['id'] == id:
-            index = I
-            break 
-        I += 1
-    if index != -1:
-        employees.pop(index)
\ No newline at end of file
+    employee = employees.pop(id, None)
+    if employee is not None:
+        _remove_from_indexes(employee)
@@ -0,0 +1,28 @@
+import importlib
+import pytest
+
+@pytest.fixture
+def repo():
+    return importlib.reload(importlib.import_module(__package__ + '.repo_inmem_dict'))
+
+def employee(id, name = 'Dravid', is_active = True):
+    return {'id':id,'name':name,'age':50,'salary':1200,'is_active':is_active}
+
+def test_create_read_update_delete(repo):
+    repo.create_employee(employee(1))
+    repo.create_employee(employee(2, is_active=False))
+    assert repo.read_by_id(1) == employee(1)
+    repo.update(1, employee(99, 'Rahul', is_active=False)) # the record stays at id 1
+    assert repo.read_by_id(1) == employee(1, 'Rahul', is_active=False)
+    assert repo.read_by_id(99) is None
+    assert sorted(emp['id'] for emp in repo.read_by_field('is_active', False)) == [1, 2]
+    assert repo.read_by_field('is_active', True) == []
+    repo.delete_employee(1)
+    assert repo.read_all_employee() == [employee(2, is_active=False)]
+    assert repo.read_by_field('name', 'Dravid') == [employee(2, is_active=False)]
+
+def test_create_duplicate_id_raises(repo):
+    repo.create_employee(employee(1))
+    with pytest.raises(ValueError):
+        repo.create_employee(employee(1, 'Rahul'))
+    assert repo.read_all_employee() == [employee(1)]
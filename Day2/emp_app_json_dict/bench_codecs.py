@@ -0,0 +1,58 @@
+# Compare snapshot codecs on a synthetic dataset:
+#   python -m emp_app_json_dict.bench_codecs [number of employees]   (from Day2)
+# Each codec is loaded in a fresh subprocess so peak RSS only reflects that
+# codec's load.
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from store_common import peak_rss_kb
+
+from . import db_json as db
+
+def make_employees(count):
+    return [{'id': i, 'name': f'Employee {i}', 'age': 20 + i % 40,
+             'salary': 30000.0 + i % 1000, 'is_active': i % 2 == 0}
+            for i in range(count)]
+
+def available_codecs():
+    codecs = ['json', 'ndjson']
+    if db.orjson is not None:
+        codecs.append('orjson')
+    if db.msgpack is not None:
+        codecs.append('msgpack')
+    return codecs
+
+def run_child(filename):
+    baseline_kb = peak_rss_kb()
+    started = time.perf_counter()
+    employees = {employee['id']: employee for employee in db.iter_records(filename)}
+    load = time.perf_counter() - started
+    peak_kb = peak_rss_kb()
+    print(f'{load:.3f} {(peak_kb - baseline_kb) / 1024:.1f} {len(employees)}')
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+    employees = make_employees(count)
+    print(f'{count} employees, orjson {"on" if db.orjson else "off"} for json decoding')
+    print(f'{"codec":<8} {"size MB":>8} {"save s":>7} {"load s":>7} {"load RSS MB":>12}')
+    with tempfile.TemporaryDirectory() as tmp:
+        for codec in available_codecs():
+            filename = os.path.join(tmp, f'employees.{codec}')
+            started = time.perf_counter()
+            db.write_to_file(employees, filename, codec)
+            save = time.perf_counter() - started
+            output = subprocess.run([sys.executable, '-m', __spec__.name, '--child', filename],
+                                    check=True, capture_output=True, text=True).stdout
+            load, rss, loaded = output.split()
+            assert int(loaded) == count
+            print(f'{codec:<8} {os.path.getsize(filename) / 1e6:8.1f} {save:7.3f} '
+                  f'{float(load):7.3f} {float(rss):12.1f}')
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--child':
+        run_child(sys.argv[2])
+    else:
+        main()
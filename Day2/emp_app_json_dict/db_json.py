@@ -1,15 +1,281 @@
 import json
 import os
+import threading
 
-def read_from_file(filename = 'db.json'):
+try:
+    import orjson
+except ImportError: # optional, stdlib json is used instead
+    orjson = None
+try:
+    import msgpack
+except ImportError: # optional, only needed for the 'msgpack' codec
+    msgpack = None
+
+# WriteBuffer, RWLock, FileLock and file_state are shared by the Day2 apps
+from store_common import FileLock, RWLock, WriteBuffer, file_state
+
+# Append-only storage: every create/update/delete is appended as one JSON
+# line to '<filename>.log'. On startup the snapshot '<filename>' is loaded
+# and the log replayed on top of it. When the log grows past
+# COMPACT_THRESHOLD bytes it is folded into a new snapshot in the background.
+COMPACT_THRESHOLD = 1024 * 1024
+lock = threading.Lock()
+
+# Snapshot codecs. The format of an existing snapshot is detected from its
+# first bytes, so CODEC only decides how the next snapshot is written:
+#   'json'    - one JSON array
+#   'orjson'  - the same JSON array, encoded with orjson
+#   'ndjson'  - one JSON object per line, decoded one record at a time
+#   'msgpack' - MSGPACK_MAGIC followed by one msgpack map per record
+CODEC = 'ndjson'
+MSGPACK_MAGIC = b'MSGPACK1'
+
+def _dumps(value):
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value).encode('utf-8')
+
+def _loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def _write_json(records, writer):
+    writer.write(json.dumps(list(records)).encode('utf-8'))
+
+def _write_orjson(records, writer):
+    if orjson is None:
+        raise ImportError("the 'orjson' codec needs the orjson package")
+    writer.write(orjson.dumps(list(records)))
+
+def _write_ndjson(records, writer):
+    for record in records:
+        writer.write(_dumps(record) + b'\n')
+
+def _write_msgpack(records, writer):
+    if msgpack is None:
+        raise ImportError("the 'msgpack' codec needs the msgpack package")
+    packer = msgpack.Packer()
+    writer.write(MSGPACK_MAGIC)
+    for record in records:
+        writer.write(packer.pack(record))
+
+WRITERS = {'json': _write_json, 'orjson': _write_orjson,
+           'ndjson': _write_ndjson, 'msgpack': _write_msgpack}
+
+def detect_format(filename = 'db.json'):
+    with open(filename, 'rb') as reader:
+        head = reader.read(len(MSGPACK_MAGIC))
+    if head == MSGPACK_MAGIC:
+        return 'msgpack'
+    if head.lstrip().startswith(b'['):
+        return 'json'
+    if head.lstrip().startswith(b'{') or not head.strip():
+        return 'ndjson'
+    raise ValueError(f'{filename} is not a known snapshot format')
+
+def iter_records(filename = 'db.json'):
+    # ndjson and msgpack snapshots are decoded lazily, one record at a time
     if not os.path.exists(filename):
-        employees = []
-        return employees 
-    
-    with open(filename, 'r') as reader:
-        employees = json.load(reader)
-        return employees 
-    
-def write_to_file(employees, filename = 'db.json'):
-    with open(filename, 'w') as writer:
-        json.dump(employees, writer) 
\ No newline at end of file
+        return
+    snapshot_format = detect_format(filename)
+    with open(filename, 'rb') as reader:
+        if snapshot_format == 'msgpack':
+            if msgpack is None:
+                raise ImportError(f'{filename} is msgpack, install msgpack to read it')
+            reader.read(len(MSGPACK_MAGIC))
+            yield from msgpack.Unpacker(reader, raw=False)
+        elif snapshot_format == 'ndjson':
+            for line in reader:
+                if line.strip():
+                    yield _loads(line)
+        else:
+            yield from _loads(reader.read())
+
+def log_name(filename):
+    return filename + '.log'
+
+def _expand(entry):
+    # a batch is one line, so it is replayed completely or not at all
+    return entry['entries'] if entry['op'] == 'batch' else [entry]
+
+def _decode_line(line):
+    # the entry on a complete log line, or None for a line torn by a crash
+    # (write_log_entries ends it with a newline before appending more)
+    try:
+        return _loads(line)
+    except ValueError:
+        return None
+
+def _replay(employees_by_id, log_filename):
+    if not os.path.exists(log_filename):
+        return
+    with open(log_filename, 'rb') as reader:
+        for line in reader:
+            if not line.endswith(b'\n'): # torn last line after a crash
+                break
+            entry = _decode_line(line)
+            if entry is None:
+                continue
+            for entry in _expand(entry):
+                if entry['op'] == 'delete':
+                    employees_by_id.pop(entry['id'], None)
+                else:
+                    employees_by_id[entry['id']] = entry['record']
+
+def read_from_file(filename = 'db.json'):
+    employees_by_id = {employee['id']: employee for employee in iter_records(filename)}
+    # replay is idempotent, so a log left over from an interrupted compaction is safe
+    _replay(employees_by_id, log_name(filename) + '.old')
+    _replay(employees_by_id, log_name(filename))
+    return list(employees_by_id.values())
+
+def write_to_file(employees, filename = 'db.json', codec = None):
+    write = WRITERS[codec or CODEC]
+    # write to a temp file, fsync, then atomically rename over the snapshot
+    temp_filename = filename + '.tmp'
+    with open(temp_filename, 'wb') as writer:
+        write(employees, writer)
+        writer.flush()
+        os.fsync(writer.fileno())
+    os.replace(temp_filename, filename)
+
+class LogFollower:
+    # Remembers how much of the snapshot and log this process has applied,
+    # so other processes' changes are picked up by replaying only the new
+    # log lines. A replaced snapshot or log (compaction) needs a full load().
+    # Apart from changed(), call it with the FileLock held.
+    def __init__(self, filename = 'db.json'):
+        self.filename = filename
+        self.snapshot_state = None
+        self.log_inode = None
+        self.offset = 0
+
+    def changed(self):
+        if file_state(self.filename) != self.snapshot_state:
+            return True
+        log_state = file_state(log_name(self.filename))
+        if log_state is None:
+            return self.log_inode is not None
+        return log_state[0] != self.log_inode or log_state[2] != self.offset
+
+    def load(self):
+        records = read_from_file(self.filename)
+        self.snapshot_state = file_state(self.filename)
+        self.mark_log_end()
+        return records
+
+    def mark_log_end(self):
+        # everything in the log so far has been applied
+        log_state = file_state(log_name(self.filename))
+        self.log_inode, self.offset = (None, 0) if log_state is None else (log_state[0], log_state[2])
+
+    def new_entries(self):
+        # entries appended since the last call, or None if a full load() is needed
+        if file_state(self.filename) != self.snapshot_state:
+            return None
+        log_filename = log_name(self.filename)
+        log_state = file_state(log_filename)
+        if log_state is None:
+            return [] if self.log_inode is None else None
+        if log_state[0] != self.log_inode or log_state[2] < self.offset:
+            return None
+        entries = []
+        with open(log_filename, 'rb') as reader:
+            reader.seek(self.offset)
+            for line in reader:
+                if not line.endswith(b'\n'): # torn last line after a crash
+                    break
+                entry = _decode_line(line)
+                if entry is not None:
+                    entries.extend(_expand(entry))
+                self.offset += len(line)
+        return entries
+
+def log_entry(op, record):
+    entry = {'op': op, 'id': record['id']}
+    if op != 'delete':
+        entry['record'] = record
+    return entry
+
+def _ends_torn(log_filename):
+    # True if the log's last line was cut short by a crash
+    with open(log_filename, 'rb') as reader:
+        if reader.seek(0, os.SEEK_END) == 0:
+            return False
+        reader.seek(-1, os.SEEK_END)
+        return reader.read(1) != b'\n'
+
+def write_log_entries(entries, filename = 'db.json'):
+    # one write and one fsync however many entries there are; call with the
+    # FileLock held exclusively
+    if len(entries) > 1:
+        line = _dumps({'op': 'batch', 'entries': entries})
+    else:
+        line = _dumps(entries[0])
+    with lock:
+        log_filename = log_name(filename)
+        if os.path.exists(log_filename) and _ends_torn(log_filename):
+            # end the torn line first, so it is skipped as one bad line
+            # instead of swallowing the entries written after it
+            line = b'\n' + line
+        with open(log_filename, 'ab') as writer:
+            writer.write(line + b'\n')
+            writer.flush()
+            os.fsync(writer.fileno())
+
+def append_to_log(op, record, filename = 'db.json'):
+    write_log_entries([log_entry(op, record)], filename)
+
+_compactions = {} # filename: this process's compaction thread
+
+def compact(employees, filename = 'db.json', compaction_lock = None):
+    # write the new snapshot beside the old one, then swap it in and drop
+    # the rotated log while other processes are locked out
+    try:
+        write_to_file(employees, filename + '.compact')
+        with FileLock(filename).exclusive():
+            os.replace(filename + '.compact', filename)
+            os.remove(log_name(filename) + '.old')
+    finally:
+        if compaction_lock is not None:
+            compaction_lock.close()
+
+def maybe_compact(employees, filename = 'db.json', threshold = None):
+    # call with the FileLock held exclusively and employees up to date with the
+    # log, otherwise another process's entries could miss the snapshot
+    threshold = threshold or COMPACT_THRESHOLD
+    log_filename = log_name(filename)
+    old_filename = log_filename + '.old'
+    def log_full():
+        return os.path.exists(log_filename) and os.path.getsize(log_filename) >= threshold
+    leftover = os.path.exists(old_filename)
+    if not leftover and not log_full():
+        return None
+    running = _compactions.get(filename)
+    if running is not None and running.is_alive():
+        return None
+    # held by the compacting thread until it is done; unlike the .old file
+    # the lock goes away with a process that dies mid-compaction
+    compaction_lock = FileLock(filename + '.compact').try_exclusive()
+    if compaction_lock is None: # another process is compacting
+        return None
+    if leftover:
+        # a compaction died before swapping in its snapshot; the rotated log
+        # is already part of employees, so fold it into a snapshot now
+        write_to_file(list(employees), filename)
+        os.remove(old_filename)
+    if not log_full():
+        compaction_lock.close()
+        return None
+    # rotate the log and copy the records in the caller's thread, so every
+    # entry in the rotated log is already part of the snapshot
+    with lock:
+        os.replace(log_filename, old_filename)
+    snapshot = list(employees)
+    # not a daemon: the interpreter waits for it at exit instead of killing
+    # it halfway through writing the snapshot
+    thread = threading.Thread(target=compact, args=(snapshot, filename, compaction_lock))
+    _compactions[filename] = thread
+    thread.start()
+    return thread
@@ -1,42 +1,126 @@
-import db_json as db 
+from . import db_json as db
 #CRUD (Create, Read All | Read One, Update, Delete)
-#Employee App - JSON Persistent Store (DB) - dict element
+#Employee App - JSON Persistent Store (DB) - dict element, indexed by id
+#Safe to share between threads and between processes using the same file
 file_name = 'employees.json' 
-employees = db.read_from_file(file_name) #[] # [{'id':id,'name':name,'age':age,'salary':salary,'is_active':is_active}, ...]
+lock = db.RWLock() # threads of this process
+file_lock = db.FileLock(file_name) # other processes
+follower = db.LogFollower(file_name)
+employees = {} # {id: {'id':id,'name':name,'age':age,'salary':salary,'is_active':is_active}, ...}
+indexed_fields = ['is_active']
+indexes = {field: {} for field in indexed_fields} # {field: {value: {id: employee}}}
+
+def _add_to_indexes(employee):
+    for field in indexed_fields:
+        indexes[field].setdefault(employee[field], {})[employee['id']] = employee
+
+def _remove_from_indexes(employee):
+    for field in indexed_fields:
+        matches = indexes[field].get(employee[field])
+        if matches is not None:
+            matches.pop(employee['id'], None)
+            if not matches:
+                del indexes[field][employee[field]]
+
+def _apply(entry):
+    old_employee = employees.pop(entry['id'], None)
+    if old_employee is not None:
+        _remove_from_indexes(old_employee)
+    if entry['op'] != 'delete':
+        employees[entry['id']] = entry['record']
+        _add_to_indexes(entry['record'])
+
+def _load():
+    employees.clear()
+    for field in indexed_fields:
+        indexes[field].clear()
+    for loaded_employee in follower.load():
+        employees[loaded_employee['id']] = loaded_employee
+        _add_to_indexes(loaded_employee)
+
+def _catch_up():
+    # apply what other processes appended; needs lock and file_lock held
+    entries = follower.new_entries()
+    if entries is None:
+        _load()
+    else:
+        for entry in entries:
+            _apply(entry)
+
+def _refresh():
+    # a stat() when nothing changed; skipped while changes of ours are unwritten
+    if buffer.pending() or not follower.changed():
+        return
+    with lock.write_locked(), file_lock.shared():
+        _catch_up()
+
+def _write(entries):
+    with lock.write_locked(), file_lock.exclusive():
+        _catch_up()
+        for entry in entries: # ours come after anything just replayed
+            _apply(entry)
+        db.write_log_entries(entries, file_name)
+        db.maybe_compact(employees.values(), file_name)
+        follower.mark_log_end()
+
+def _discard(entries):
+    # a batch raised: its entries were only applied in memory, so load what
+    # is on disk again (other threads' open batches are applied again when
+    # they are written)
+    with lock.write_locked(), file_lock.shared():
+        _load()
+
+buffer = db.WriteBuffer(_write, lock.write_locked, _discard)
+
+with lock.write_locked(), file_lock.shared():
+    _load()
+
+def batch():
+    # with repo.batch(): ... - all changes in the block are written once, on
+    # exit, as one log line; if the block raises none of them are kept
+    return buffer.batch()
+
+def group_commit(max_entries = 1000, max_delay = 0.05):
+    buffer.group_commit(max_entries, max_delay)
+
+def _change(entry):
+    with lock.write_locked():
+        _apply(entry)
+        buffer.add(entry)
 
 def create_employee(employee):
-    global employees 
-    employees.append(employee)
-    db.write_to_file(employees, file_name)
+    _refresh()
+    with lock.write_locked():
+        if employee['id'] in employees:
+            raise ValueError(f"Employee id={employee['id']} exists already.")
+        _change(db.log_entry('create', employee))
 
 def read_all_employee():
-    return employees 
+    _refresh()
+    with lock.read_locked():
+        return list(employees.values())
 
 def read_by_id(id):
-    for employee in employees:
-        if employee['id'] == id:
-            return employee 
-    return None 
+    _refresh()
+    with lock.read_locked():
+        return employees.get(id)
+
+def read_by_field(field, value):
+    _refresh()
+    with lock.read_locked():
+        if field in indexes:
+            return list(indexes[field].get(value, {}).values())
+        return [employee for employee in employees.values() if employee[field] == value]
 
 def update(id, new_employee):#new_employee is update at id
-    global employees
-    I = 0
-    for employee in employees:
-        if employee['id'] == id:
-            employees[I] = new_employee
-            db.write_to_file(employees, file_name)
-            break 
-        I += 1
+    _refresh()
+    with lock.write_locked():
+        if id not in employees:
+            return
+        _change(db.log_entry('update', {**new_employee, 'id': id}))
     
 def delete_employee(id):
-    global employees
-    index = -1
-    I = 0
-    for employee in employees:
-        if employee['id'] == id:
-            index = I
-            break 
-        I += 1
-    if index != -1:
-        employees.pop(index)
-        db.write_to_file(employees, file_name)
\ No newline at end of file
+    _refresh()
+    with lock.write_locked():
+        if id in employees:
+            _change(db.log_entry('delete', {'id': id}))
@@ -0,0 +1,92 @@
+import os
+import pytest
+from . import db_json as db
+
+@pytest.fixture
+def filename(tmp_path):
+    return str(tmp_path / 'employees.json')
+
+def employee(id, name = 'Dravid'):
+    return {'id':id,'name':name,'age':50,'salary':1200,'is_active':True}
+
+def test_log_is_replayed_on_top_of_snapshot(filename):
+    db.write_to_file([employee(1), employee(2)], filename)
+    db.append_to_log('update', employee(1, 'Rahul'), filename)
+    db.append_to_log('delete', employee(2), filename)
+    db.write_log_entries([db.log_entry('create', employee(3)), db.log_entry('delete', employee(1))], filename)
+    assert db.read_from_file(filename) == [employee(3)]
+
+def test_torn_last_line_is_skipped(filename):
+    db.append_to_log('create', employee(1), filename)
+    with open(db.log_name(filename), 'ab') as writer:
+        writer.write(b'{"op": "create", "id": 2, "rec') # crash mid-write
+    assert db.read_from_file(filename) == [employee(1)]
+    db.append_to_log('create', employee(3), filename) # ends the torn line first
+    assert db.read_from_file(filename) == [employee(1), employee(3)]
+
+def test_log_follower_reads_only_new_entries(filename):
+    db.append_to_log('create', employee(1), filename)
+    follower = db.LogFollower(filename)
+    assert follower.load() == [employee(1)]
+    assert not follower.changed()
+    db.append_to_log('update', employee(1, 'Rahul'), filename)
+    assert follower.changed()
+    assert follower.new_entries() == [db.log_entry('update', employee(1, 'Rahul'))]
+    assert follower.new_entries() == []
+
+def test_compaction_folds_log_into_snapshot(filename):
+    employees = [employee(id) for id in range(1, 11)]
+    for record in employees:
+        db.append_to_log('create', record, filename)
+    thread = db.maybe_compact(employees, filename, threshold=1)
+    thread.join()
+    assert not os.path.exists(db.log_name(filename))
+    assert not os.path.exists(db.log_name(filename) + '.old')
+    assert db.read_from_file(filename) == employees
+
+def test_compaction_below_threshold_does_nothing(filename):
+    db.append_to_log('create', employee(1), filename)
+    assert db.maybe_compact([employee(1)], filename, threshold=1024 * 1024) is None
+    assert os.path.exists(db.log_name(filename))
+
+def test_leftover_rotated_log_is_recovered(filename):
+    # a compaction died after rotating the log, before the new snapshot
+    db.write_to_file([employee(1)], filename)
+    db.append_to_log('create', employee(2), filename)
+    os.replace(db.log_name(filename), db.log_name(filename) + '.old')
+    employees = db.read_from_file(filename)
+    assert employees == [employee(1), employee(2)]
+    assert db.maybe_compact(employees, filename, threshold=1024 * 1024) is None
+    assert not os.path.exists(db.log_name(filename) + '.old')
+    assert list(db.iter_records(filename)) == employees
+
+@pytest.mark.parametrize('codec', [
+    'json', 'ndjson',
+    pytest.param('orjson', marks=pytest.mark.skipif(db.orjson is None, reason='orjson not installed')),
+    pytest.param('msgpack', marks=pytest.mark.skipif(db.msgpack is None, reason='msgpack not installed')),
+])
+def test_snapshot_codec_round_trip(filename, codec):
+    employees = [employee(id, f'Player{id}') for id in range(3)]
+    db.write_to_file(employees, filename, codec=codec)
+    assert db.detect_format(filename) == ('json' if codec == 'orjson' else codec)
+    assert db.read_from_file(filename) == employees
+
+def test_codec_can_change_between_snapshots(filename):
+    db.write_to_file([employee(1)], filename, codec='json')
+    db.append_to_log('create', employee(2), filename)
+    db.write_to_file(db.read_from_file(filename), filename, codec='ndjson')
+    assert db.read_from_file(filename) == [employee(1), employee(2)]
+
+def test_ndjson_snapshot_is_decoded_lazily(filename):
+    db.write_to_file([employee(1), employee(2)], filename, codec='ndjson')
+    with open(filename, 'ab') as writer:
+        writer.write(b'not json\n')
+    records = db.iter_records(filename)
+    assert next(records) == employee(1) # the bad line is not read yet
+    assert next(records) == employee(2)
+
+def test_unknown_snapshot_format_is_rejected(filename):
+    with open(filename, 'wb') as writer:
+        writer.write(b'PK\x03\x04')
+    with pytest.raises(ValueError):
+        db.read_from_file(filename)
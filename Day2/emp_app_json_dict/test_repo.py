@@ -0,0 +1,58 @@
+import importlib
+import os
+import subprocess
+import sys
+import pytest
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    # the repo loads employees.json from the working directory on import
+    monkeypatch.chdir(tmp_path)
+    module = importlib.reload(importlib.import_module(__package__ + '.repo_json_dict'))
+    yield module
+    module.buffer.group_commit(None)
+
+def employee(id, name = 'Dravid', is_active = True):
+    return {'id':id,'name':name,'age':50,'salary':1200,'is_active':is_active}
+
+def reopen(repo):
+    # a fresh load from disk, as another process would see it
+    return importlib.reload(repo)
+
+def test_create_read_update_delete(repo):
+    repo.create_employee(employee(1))
+    repo.create_employee(employee(2, is_active=False))
+    repo.update(1, employee(99, 'Rahul', is_active=False)) # the record stays at id 1
+    assert repo.read_by_id(1) == employee(1, 'Rahul', is_active=False)
+    assert sorted(emp['id'] for emp in repo.read_by_field('is_active', False)) == [1, 2]
+    repo.delete_employee(2)
+    assert reopen(repo).read_all_employee() == [employee(1, 'Rahul', is_active=False)]
+
+def test_create_duplicate_id_raises(repo):
+    repo.create_employee(employee(1))
+    with pytest.raises(ValueError):
+        repo.create_employee(employee(1, 'Rahul'))
+    assert reopen(repo).read_all_employee() == [employee(1)]
+
+def test_batch_is_dropped_when_block_raises(repo):
+    repo.create_employee(employee(1))
+    with pytest.raises(RuntimeError):
+        with repo.batch():
+            repo.create_employee(employee(2))
+            repo.delete_employee(1)
+            raise RuntimeError()
+    assert repo.read_all_employee() == [employee(1)]
+    assert reopen(repo).read_all_employee() == [employee(1)]
+
+def test_processes_writing_together_lose_nothing(repo, tmp_path):
+    script = (f"from {__package__} import repo_json_dict as repo\n"
+              "import sys\n"
+              "first = int(sys.argv[1])\n"
+              "for id in range(first, first + 50):\n"
+              "    repo.create_employee({'id':id,'name':'Player','age':30,'salary':1000,'is_active':True})\n")
+    day2 = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=day2)
+    workers = [subprocess.Popen([sys.executable, '-c', script, str(first)], cwd=tmp_path, env=env)
+               for first in (0, 1000, 2000)]
+    assert [worker.wait() for worker in workers] == [0, 0, 0]
+    assert len(repo.read_all_employee()) == 150 # picked up without a reload
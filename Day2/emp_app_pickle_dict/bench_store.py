@@ -0,0 +1,79 @@
+# Compare the pickle file with the mmap record store:
+#   python -m emp_app_pickle_dict.bench_store [number of employees]   (from Day2)
+# Each measurement runs in a fresh subprocess so startup time and peak
+# RSS are not skewed by data the parent already loaded.
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+from store_common import peak_rss_kb
+
+from . import db_pickle as db
+
+OPS = 1000
+
+def make_employees(count):
+    return [{'id': i, 'name': f'Employee {i}', 'age': 20 + i % 40,
+             'salary': 30000.0 + i % 1000, 'is_active': i % 2 == 0}
+            for i in range(count)]
+
+def bench_pickle(filename, count):
+    started = time.perf_counter()
+    employees = {employee['id']: employee for employee in db.read_from_file(filename)}
+    startup = time.perf_counter() - started
+    ids = random.sample(range(count), OPS)
+    started = time.perf_counter()
+    for id in ids:
+        employees[id]
+    read = (time.perf_counter() - started) / OPS
+    started = time.perf_counter()
+    for id in ids[:OPS // 10]: # every pickle update rewrites the whole file
+        employees[id] = dict(employees[id], salary=1.0)
+        db.write_to_file(list(employees.values()), filename)
+    update = (time.perf_counter() - started) / (OPS // 10)
+    return startup, read, update
+
+def bench_store(filename, count):
+    started = time.perf_counter()
+    store = db.RecordStore(filename)
+    slots = {employee['id']: slot for slot, employee in store.scan(with_name=False)}
+    startup = time.perf_counter() - started
+    ids = random.sample(range(count), OPS)
+    started = time.perf_counter()
+    for id in ids:
+        store.read(slots[id])
+    read = (time.perf_counter() - started) / OPS
+    started = time.perf_counter()
+    for id in ids[:OPS // 10]: # each one a durable commit
+        store.write(slots[id], dict(store.read(slots[id]), salary=1.0))
+        store.commit()
+    update = (time.perf_counter() - started) / (OPS // 10)
+    store.close()
+    return startup, read, update
+
+def run_child(kind, filename, count):
+    startup, read, update = (bench_pickle if kind == 'pickle' else bench_store)(filename, count)
+    rss_kb = peak_rss_kb()
+    print(f'{kind:<8} startup {startup * 1000:9.2f} ms  read {read * 1e6:8.2f} us  '
+          f'update {update * 1e6:10.2f} us  max RSS {rss_kb / 1024:8.1f} MB')
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    with tempfile.TemporaryDirectory() as tmp:
+        pickle_file = os.path.join(tmp, 'employees.dat')
+        store_file = os.path.join(tmp, 'employees.rec')
+        db.write_to_file(make_employees(count), pickle_file)
+        db.convert_pickle(pickle_file, store_file)
+        print(f'{count} employees: pickle {os.path.getsize(pickle_file) / 1e6:.1f} MB, '
+              f'store {(os.path.getsize(store_file) + os.path.getsize(store_file + ".heap")) / 1e6:.1f} MB')
+        for kind, filename in (('pickle', pickle_file), ('store', store_file)):
+            subprocess.run([sys.executable, '-m', __spec__.name, '--child', kind, filename, str(count)], check=True)
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--child':
+        run_child(sys.argv[2], sys.argv[3], int(sys.argv[4]))
+    else:
+        main()
@@ -1,5 +1,11 @@
-import pickle 
+import mmap
 import os
+import pickle 
+import struct
+import threading
+
+# WriteBuffer, RWLock, FileLock and file_state are shared by the Day2 apps
+from store_common import FileLock, RWLock, WriteBuffer, file_state
 
 def read_from_file(filename = 'db.dat'):
     if not os.path.exists(filename):
@@ -12,4 +18,257 @@ def read_from_file(filename = 'db.dat'):
     
 def write_to_file(employees, filename = 'db.dat'):
     with open(filename, 'wb') as writer:
-        pickle.dump(employees, writer) 
\ No newline at end of file
+        pickle.dump(employees, writer) 
+
+# Fixed-width record store: '<filename>' holds a header and one fixed-size
+# record per employee, names live in an append-only string heap
+# '<filename>.heap'. Both files are accessed through mmap, so opening the
+# store does not load the data and an update rewrites one record in place.
+# Changes are staged in memory (reads see them) until commit() copies them
+# into the map. A durable commit first fsyncs the new names and writes the
+# staged records to '<filename>.journal', so a crash part way through is
+# finished from the journal on the next open or refresh(): a commit is
+# applied whole or not at all.
+MAGIC = b'EMP2'
+HEADER = struct.Struct('<4sIQQ') # magic, record size, record count, version
+COUNT_OFFSET = 8
+VERSION_OFFSET = 16
+RECORD = struct.Struct('<qid??qi') # id, age, salary, is_active, deleted, name offset, name length
+DELETED_OFFSET = struct.calcsize('<qid?')
+INITIAL_CAPACITY = 1024
+JOURNAL_MAGIC = b'EMPJ'
+JOURNAL = struct.Struct('<4sQQ') # magic, record count after the commit, staged records
+JOURNAL_SLOT = struct.Struct('<Q') # before each staged record; the magic again ends the journal
+
+class RecordStore:
+    def __init__(self, filename = 'db.rec', sync = True):
+        self.filename = filename
+        self.sync = sync # commits are durable unless commit() is told otherwise
+        self.heap_filename = filename + '.heap'
+        self.journal_filename = filename + '.journal'
+        if not os.path.exists(filename):
+            with open(filename, 'wb') as writer:
+                writer.write(HEADER.pack(MAGIC, RECORD.size, 0, 0))
+                writer.truncate(HEADER.size + INITIAL_CAPACITY * RECORD.size)
+        self._file = open(filename, 'r+b')
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        magic, record_size, self.count, _ = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or record_size != RECORD.size:
+            raise ValueError(f'{filename} is not an employee record store')
+        self._heap_file = open(self.heap_filename, 'a+b')
+        self._heap_map = None
+        self._grow_lock = threading.Lock() # flush() may run on a group-commit thread
+        self._staged = {} # {slot: packed record} not yet in the map
+        self._recover()
+
+    def capacity(self):
+        return (len(self._map) - HEADER.size) // RECORD.size
+
+    def _offset(self, slot):
+        return HEADER.size + slot * RECORD.size
+
+    def _grow(self, needed):
+        size = len(self._map)
+        while size < HEADER.size + needed * RECORD.size:
+            size = HEADER.size + 2 * (size - HEADER.size)
+        with self._grow_lock:
+            self._map.close()
+            self._file.truncate(size)
+            self._map = mmap.mmap(self._file.fileno(), 0)
+
+    def version(self):
+        # bumped on every commit, so other processes know to rescan
+        return struct.unpack_from('<Q', self._map, VERSION_OFFSET)[0]
+
+    def refresh(self):
+        # pick up records appended and growth done by other processes, and
+        # finish a commit a crashed one left in the journal. Our own staged
+        # changes mean we hold the file lock, so nothing can have changed.
+        if self._staged:
+            return
+        if os.fstat(self._file.fileno()).st_size != len(self._map):
+            with self._grow_lock:
+                self._map.close()
+                self._map = mmap.mmap(self._file.fileno(), 0)
+        if os.path.exists(self.journal_filename):
+            self._recover()
+        self.count = struct.unpack_from('<Q', self._map, COUNT_OFFSET)[0]
+
+    def _store_name(self, name):
+        # names go to the heap straight away; until a commit refers to them
+        # they are just unused bytes
+        data = name.encode('utf-8')
+        self._heap_file.seek(0, os.SEEK_END)
+        offset = self._heap_file.tell()
+        self._heap_file.write(data)
+        self._heap_file.flush()
+        return offset, len(data)
+
+    def _read_name(self, offset, length):
+        if length == 0:
+            return ''
+        heap_map = self._heap_map
+        if heap_map is None or offset + length > len(heap_map):
+            # readers may run in parallel, so an outgrown map is left for the
+            # garbage collector instead of being closed under another reader
+            heap_map = self._heap_map = mmap.mmap(self._heap_file.fileno(), 0, access=mmap.ACCESS_READ)
+        return heap_map[offset:offset + length].decode('utf-8')
+
+    def _record(self, slot):
+        record = self._staged.get(slot)
+        if record is not None:
+            return record
+        offset = self._offset(slot)
+        return self._map[offset:offset + RECORD.size]
+
+    def _pack(self, slot, employee, name_ref):
+        self._staged[slot] = RECORD.pack(employee['id'], employee['age'],
+            employee['salary'], employee['is_active'], False, *name_ref)
+
+    def append(self, employee):
+        slot = self.count
+        self._pack(slot, employee, self._store_name(employee['name']))
+        self.count += 1
+        return slot
+
+    def write(self, slot, employee):
+        # reuse the stored name unless it changed
+        name_offset, name_length = RECORD.unpack(self._record(slot))[5:]
+        if self._read_name(name_offset, name_length) == employee['name']:
+            name_ref = (name_offset, name_length)
+        else:
+            name_ref = self._store_name(employee['name'])
+        self._pack(slot, employee, name_ref)
+
+    def delete(self, slot):
+        fields = list(RECORD.unpack(self._record(slot)))
+        fields[4] = True # deleted
+        self._staged[slot] = RECORD.pack(*fields)
+
+    def read(self, slot, with_name = True):
+        id, age, salary, is_active, deleted, name_offset, name_length = \
+            RECORD.unpack(self._record(slot))
+        if deleted:
+            return None
+        employee = {'id':id, 'name':None, 'age':age, 'salary':salary, 'is_active':is_active}
+        if with_name:
+            employee['name'] = self._read_name(name_offset, name_length)
+        return employee
+
+    def scan(self, with_name = True):
+        for slot in range(self.count):
+            employee = self.read(slot, with_name)
+            if employee is not None:
+                yield slot, employee
+
+    def commit(self, durable = None):
+        # copy the staged changes into the map, with the file lock held
+        # exclusively; durable=False leaves the flush to flush()
+        if not self._staged:
+            return False
+        durable = self.sync if durable is None else durable
+        if durable:
+            self._heap_file.flush()
+            os.fsync(self._heap_file.fileno())
+            self._write_journal()
+        self._apply(self.count, self._staged)
+        self._staged = {}
+        if durable:
+            with self._grow_lock:
+                self._map.flush()
+            os.remove(self.journal_filename)
+        return True
+
+    def rollback(self):
+        # drop the staged changes, True if there were any
+        staged, self._staged = self._staged, {}
+        self.count = struct.unpack_from('<Q', self._map, COUNT_OFFSET)[0]
+        return bool(staged)
+
+    def _apply(self, count, staged):
+        if count > self.capacity():
+            self._grow(count)
+        # the version first: whoever sees part of the commit rescans
+        struct.pack_into('<Q', self._map, VERSION_OFFSET, self.version() + 1)
+        for slot, record in staged.items():
+            offset = self._offset(slot)
+            self._map[offset:offset + RECORD.size] = record
+        struct.pack_into('<Q', self._map, COUNT_OFFSET, count)
+        self.count = count
+
+    def _write_journal(self):
+        with open(self.journal_filename, 'wb') as writer:
+            writer.write(JOURNAL.pack(JOURNAL_MAGIC, self.count, len(self._staged)))
+            for slot, record in self._staged.items():
+                writer.write(JOURNAL_SLOT.pack(slot) + record)
+            writer.write(JOURNAL_MAGIC)
+            writer.flush()
+            os.fsync(writer.fileno())
+        # the journal's directory entry has to be on disk before the map
+        # is touched, or a crash could lose it with the records half applied
+        directory = os.open(os.path.dirname(os.path.abspath(self.journal_filename)), os.O_RDONLY)
+        try:
+            os.fsync(directory)
+        finally:
+            os.close(directory)
+
+    def _recover(self):
+        try:
+            with open(self.journal_filename, 'rb') as reader:
+                data = reader.read()
+        except FileNotFoundError:
+            return
+        entry_size = JOURNAL_SLOT.size + RECORD.size
+        complete = False
+        if len(data) >= JOURNAL.size:
+            magic, count, entries = JOURNAL.unpack_from(data, 0)
+            complete = (magic == JOURNAL_MAGIC and data.endswith(JOURNAL_MAGIC)
+                and len(data) == JOURNAL.size + entries * entry_size + len(JOURNAL_MAGIC))
+        if complete:
+            # the map may hold any part of it: apply it all again
+            staged = {}
+            for position in range(JOURNAL.size, len(data) - len(JOURNAL_MAGIC), entry_size):
+                slot, = JOURNAL_SLOT.unpack_from(data, position)
+                staged[slot] = data[position + JOURNAL_SLOT.size:position + entry_size]
+            self._apply(count, staged)
+            with self._grow_lock:
+                self._map.flush()
+        # an incomplete journal is a commit that never reached the map
+        try:
+            os.remove(self.journal_filename)
+        except FileNotFoundError: # another reader finished it first
+            pass
+
+    def flush(self):
+        self._heap_file.flush()
+        os.fsync(self._heap_file.fileno())
+        with self._grow_lock:
+            self._map.flush()
+
+    def close(self):
+        self.commit()
+        self._map.flush()
+        self._map.close()
+        self._file.close()
+        os.fsync(self._heap_file.fileno())
+        if self._heap_map is not None:
+            self._heap_map.close()
+        self._heap_file.close()
+
+def convert_pickle(pickle_filename = 'db.dat', store_filename = 'db.rec'):
+    # build the store under a temp name and move it into place only when it
+    # is complete and on disk, so an interrupted conversion is redone on the
+    # next start instead of leaving a half-filled store behind
+    temp_filename = store_filename + '.tmp'
+    for filename in (temp_filename, temp_filename + '.heap'): # an earlier attempt's
+        if os.path.exists(filename):
+            os.remove(filename)
+    store = RecordStore(temp_filename, sync=False)
+    for employee in read_from_file(pickle_filename):
+        store.append(employee)
+        if store.count % 10000 == 0: # keep the staged records bounded
+            store.commit()
+    store.close() # commits the rest, msyncs the records and fsyncs the heap
+    # the heap first: the store file existing is what marks the conversion done
+    os.replace(temp_filename + '.heap', store_filename + '.heap')
+    os.replace(temp_filename, store_filename)
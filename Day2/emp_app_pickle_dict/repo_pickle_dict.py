@@ -1,42 +1,144 @@
-import db_pickle as db 
+import os
+import threading
+from contextlib import contextmanager
+from . import db_pickle as db
 #CRUD (Create, Read All | Read One, Update, Delete)
-#Employee App - Pickle Binary Persisten Storage (DB) - dict element
-file_name = 'employees.dat' 
-employees = db.read_from_file(file_name) #[] # [{'id':id,'name':name,'age':age,'salary':salary,'is_active':is_active}, ...]
+#Employee App - mmap fixed-width Record Store (DB) - dict element, indexed by id
+#Safe to share between threads and between processes using the same file
+file_name = 'employees.dat' # legacy pickle file, converted once
+store_name = 'employees.rec'
+lock = db.RWLock() # threads of this process
+file_lock = db.FileLock(store_name) # other processes
+with file_lock.exclusive():
+    if not os.path.exists(store_name) and os.path.exists(file_name):
+        db.convert_pickle(file_name, store_name)
+    store = db.RecordStore(store_name)
+# under group_commit() single changes are committed without the journal
+# and the buffer flushes the store every max_entries changes or max_delay
+grouped = False
+buffer = db.WriteBuffer(lambda slots: store.flush(), lock.write_locked)
+_local = threading.local() # .in_transaction: this thread has changes staged
+slots = {} # {id: slot in store}
+loaded_version = None # store version slots and indexes were built from
+indexed_fields = ['is_active']
+indexes = {field: {} for field in indexed_fields} # {field: {value: {id: slot}}}
+
+def _add_to_indexes(employee, slot):
+    for field in indexed_fields:
+        indexes[field].setdefault(employee[field], {})[employee['id']] = slot
+
+def _remove_from_indexes(employee):
+    for field in indexed_fields:
+        matches = indexes[field].get(employee[field])
+        if matches is not None:
+            matches.pop(employee['id'], None)
+            if not matches:
+                del indexes[field][employee[field]]
+
+def _sync():
+    # rebuild slots and indexes if another process changed the store;
+    # needs lock and file_lock held. Names are not needed for this.
+    global loaded_version
+    store.refresh()
+    if store.version() == loaded_version:
+        return
+    slots.clear()
+    for field in indexed_fields:
+        indexes[field].clear()
+    for loaded_slot, loaded_employee in store.scan(with_name=False):
+        slots[loaded_employee['id']] = loaded_slot
+        _add_to_indexes(loaded_employee, loaded_slot)
+    loaded_version = store.version()
+
+def _refresh():
+    # a header read when nothing changed
+    with lock.read_locked():
+        if store.version() == loaded_version:
+            return
+    with lock.write_locked(), file_lock.shared():
+        _sync()
+
+with lock.write_locked(), file_lock.shared():
+    _sync()
+
+@contextmanager
+def _transaction(durable = True):
+    # the changes made in the block are staged in the store and committed
+    # together on exit, or dropped if it raises
+    global loaded_version
+    if getattr(_local, 'in_transaction', False):
+        yield # part of the caller's batch
+        return
+    with lock.write_locked(), file_lock.exclusive():
+        _sync()
+        _local.in_transaction = True
+        try:
+            yield
+        except BaseException:
+            if store.rollback(): # slots and indexes may hold the dropped changes
+                loaded_version = None
+                _sync()
+            raise
+        finally:
+            _local.in_transaction = False
+        if store.commit(durable):
+            loaded_version = store.version()
+            if not durable:
+                buffer.add(None)
+
+def batch():
+    # with repo.batch(): ... - all changes in the block are committed at
+    # once, on exit, or none of them if it raises. The store has one set of
+    # staged changes, so other threads and processes wait for the batch
+    return _transaction()
+
+def group_commit(max_entries = 1000, max_delay = 0.05):
+    global grouped
+    with lock.write_locked():
+        grouped = max_entries is not None
+        buffer.group_commit(max_entries, max_delay)
 
 def create_employee(employee):
-    global employees 
-    employees.append(employee)
-    db.write_to_file(employees, file_name)
+    with _transaction(not grouped):
+        if employee['id'] in slots:
+            raise ValueError(f"Employee id={employee['id']} exists already.")
+        slot = store.append(employee)
+        slots[employee['id']] = slot
+        _add_to_indexes(employee, slot)
 
 def read_all_employee():
-    return employees 
+    _refresh()
+    with lock.read_locked(), file_lock.shared():
+        return [store.read(slot) for slot in slots.values()]
 
 def read_by_id(id):
-    for employee in employees:
-        if employee['id'] == id:
-            return employee 
-    return None 
+    _refresh()
+    with lock.read_locked(), file_lock.shared():
+        slot = slots.get(id)
+        if slot is None:
+            return None
+        return store.read(slot)
+
+def read_by_field(field, value):
+    _refresh()
+    with lock.read_locked(), file_lock.shared():
+        if field in indexes:
+            return [store.read(slot) for slot in indexes[field].get(value, {}).values()]
+        return [employee for _, employee in store.scan() if employee[field] == value]
 
 def update(id, new_employee):#new_employee is update at id
-    global employees
-    I = 0
-    for employee in employees:
-        if employee['id'] == id:
-            employees[I] = new_employee
-            db.write_to_file(employees, file_name)
-            break 
-        I += 1
+    with _transaction(not grouped):
+        slot = slots.get(id)
+        if slot is None:
+            return
+        new_employee = {**new_employee, 'id': id} # the record stays at id
+        _remove_from_indexes(store.read(slot, with_name=False))
+        store.write(slot, new_employee)
+        _add_to_indexes(new_employee, slot)
     
 def delete_employee(id):
-    global employees
-    index = -1
-    I = 0
-    for employee in employees:
-        if employee['id'] == id:
-            index = I
-            break 
-        I += 1
-    if index != -1:
-        employees.pop(index)
-        db.write_to_file(employees, file_name)
\ No newline at end of file
+    with _transaction(not grouped):
+        slot = slots.pop(id, None)
+        if slot is not None:
+            _remove_from_indexes(store.read(slot, with_name=False))
+            store.delete(slot)
@@ -0,0 +1,72 @@
+import os
+import pytest
+from . import db_pickle as db
+
+@pytest.fixture
+def filename(tmp_path):
+    return str(tmp_path / 'employees.rec')
+
+def employee(id, name = 'Dravid'):
+    return {'id':id,'name':name,'age':50,'salary':1200.0,'is_active':True}
+
+def test_record_store_round_trip(filename):
+    store = db.RecordStore(filename)
+    slots = [store.append(employee(id, f'Player{id}')) for id in range(3)]
+    store.commit()
+    store.write(slots[1], employee(1, 'Rahul'))
+    store.write(slots[2], employee(2, 'Player2')) # same name: heap not grown
+    store.delete(slots[0])
+    store.close()
+    reopened = db.RecordStore(filename)
+    assert list(reopened.scan()) == [(1, employee(1, 'Rahul')), (2, employee(2, 'Player2'))]
+    assert reopened.read(1, with_name=False)['name'] is None
+    heap_size = sum(len(f'Player{id}') for id in range(3)) + len('Rahul')
+    assert os.path.getsize(filename + '.heap') == heap_size
+
+def test_record_store_grows_past_initial_capacity(filename):
+    store = db.RecordStore(filename, sync=False)
+    for id in range(db.INITIAL_CAPACITY + 1):
+        store.append(employee(id, ''))
+    store.close()
+    reopened = db.RecordStore(filename)
+    assert reopened.count == db.INITIAL_CAPACITY + 1
+    assert reopened.capacity() == 2 * db.INITIAL_CAPACITY
+    assert reopened.read(db.INITIAL_CAPACITY) == employee(db.INITIAL_CAPACITY, '')
+
+def test_staged_changes_are_invisible_until_commit(filename):
+    writer = db.RecordStore(filename)
+    reader = db.RecordStore(filename)
+    writer.append(employee(1))
+    version = reader.version()
+    reader.refresh()
+    assert reader.count == 0
+    writer.commit()
+    reader.refresh()
+    assert reader.version() == version + 1
+    assert reader.read(0) == employee(1)
+
+def test_rollback_drops_staged_changes(filename):
+    store = db.RecordStore(filename)
+    store.append(employee(1))
+    store.commit()
+    store.append(employee(2))
+    store.delete(0)
+    assert store.rollback()
+    assert list(store.scan()) == [(0, employee(1))]
+    assert not store.rollback()
+
+def test_other_file_is_rejected(filename):
+    with open(filename, 'wb') as writer:
+        writer.write(b'not a record store' * 10)
+    with pytest.raises(ValueError):
+        db.RecordStore(filename)
+
+def test_convert_pickle(tmp_path):
+    pickle_filename = str(tmp_path / 'employees.dat')
+    store_filename = str(tmp_path / 'employees.rec')
+    employees = [employee(id, f'Player{id}') for id in range(5)]
+    db.write_to_file(employees, pickle_filename)
+    db.convert_pickle(pickle_filename, store_filename)
+    store = db.RecordStore(store_filename)
+    assert [emp for _, emp in store.scan()] == employees
+    assert not os.path.exists(store_filename + '.tmp')
@@ -0,0 +1,83 @@
+import importlib
+import os
+import pytest
+from . import db_pickle as db
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    # the repo opens employees.rec in the working directory on import
+    monkeypatch.chdir(tmp_path)
+    module = importlib.reload(importlib.import_module(__package__ + '.repo_pickle_dict'))
+    yield module
+    module.buffer.group_commit(None)
+
+def employee(id, name = 'Dravid', is_active = True):
+    return {'id':id,'name':name,'age':50,'salary':1200.0,'is_active':is_active}
+
+def test_create_read_update_delete(repo):
+    repo.create_employee(employee(1))
+    repo.create_employee(employee(2, is_active=False))
+    repo.update(1, employee(99, 'Rahul', is_active=False)) # the record stays at id 1
+    assert repo.read_by_id(1) == employee(1, 'Rahul', is_active=False)
+    assert sorted(emp['id'] for emp in repo.read_by_field('is_active', False)) == [1, 2]
+    repo.delete_employee(2)
+    assert repo.read_by_id(2) is None
+    assert repo.read_all_employee() == [employee(1, 'Rahul', is_active=False)]
+
+def test_create_duplicate_id_raises(repo):
+    repo.create_employee(employee(1))
+    with pytest.raises(ValueError):
+        repo.create_employee(employee(1, 'Rahul'))
+    assert repo.read_all_employee() == [employee(1)]
+    assert db.RecordStore('employees.rec').count == 1
+
+def test_batch_commits_all_changes_on_exit(repo):
+    repo.create_employee(employee(1))
+    with repo.batch():
+        repo.create_employee(employee(2, 'Kumble'))
+        repo.update(1, employee(1, 'Rahul', is_active=False))
+        assert repo.read_by_id(2)['name'] == 'Kumble'
+    store = db.RecordStore('employees.rec') # what another process sees
+    assert sorted(emp['name'] for _, emp in store.scan()) == ['Kumble', 'Rahul']
+    assert [emp['id'] for emp in repo.read_by_field('is_active', True)] == [2]
+
+def test_batch_is_dropped_when_block_raises(repo):
+    repo.create_employee(employee(1))
+    with pytest.raises(RuntimeError):
+        with repo.batch():
+            repo.create_employee(employee(2))
+            repo.update(1, employee(1, 'Rahul', is_active=False))
+            raise RuntimeError()
+    assert repo.read_all_employee() == [employee(1)]
+    assert repo.read_by_field('is_active', False) == []
+    store = db.RecordStore('employees.rec')
+    assert [emp for _, emp in store.scan()] == [employee(1)]
+
+def test_commit_is_finished_from_journal_after_crash(repo):
+    repo.create_employee(employee(1))
+    store = repo.store
+    store.append(employee(2))
+    store.delete(0)
+    store._write_journal() # crash before the map is touched
+    store.rollback()
+    reopened = db.RecordStore('employees.rec')
+    assert [emp for _, emp in reopened.scan()] == [employee(2)]
+    assert not os.path.exists('employees.rec.journal')
+    assert repo.read_all_employee() == [employee(2)]
+
+def test_torn_journal_is_ignored(repo):
+    repo.create_employee(employee(1))
+    with open('employees.rec.journal', 'wb') as writer:
+        writer.write(db.JOURNAL.pack(db.JOURNAL_MAGIC, 5, 4)) # no records, no trailer
+    reopened = db.RecordStore('employees.rec')
+    assert reopened.count == 1
+    assert not os.path.exists('employees.rec.journal')
+
+def test_group_commit(repo):
+    repo.group_commit(max_entries=5, max_delay=60)
+    for id in range(1, 8):
+        repo.create_employee(employee(id))
+    assert repo.buffer.pending() == 2
+    repo.group_commit(None)
+    assert repo.buffer.pending() == 0
+    assert db.RecordStore('employees.rec').count == 7
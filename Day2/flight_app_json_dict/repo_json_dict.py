@@ -1,42 +1,135 @@
-import db_json as db 
+from . import db_json as db
 #CRUD (Create, Read All | Read One, Update, Delete)
-#Flight App - JSON Persistent Store (DB) - dict element
+#Flight App - JSON Persistent Store (DB) - dict element, indexed by id
+#Safe to share between threads and between processes using the same file
 file_name = 'flights.json' 
-flights = db.read_from_file(file_name) #[] # [{id, number, airline_name, seats, price, source, destination}, ...]
+lock = db.RWLock() # threads of this process
+file_lock = db.FileLock(file_name) # other processes
+follower = db.LogFollower(file_name)
+flights = {} # {id: {id, number, airline_name, seats, price, source, destination}, ...}
+indexed_fields = ['source', 'destination']
+indexes = {field: {} for field in indexed_fields} # {field: {value: {id: flight}}}
+
+def _add_to_indexes(flight):
+    for field in indexed_fields:
+        indexes[field].setdefault(flight[field], {})[flight['id']] = flight
+
+def _remove_from_indexes(flight):
+    for field in indexed_fields:
+        matches = indexes[field].get(flight[field])
+        if matches is not None:
+            matches.pop(flight['id'], None)
+            if not matches:
+                del indexes[field][flight[field]]
+
+def _apply(entry):
+    old_flight = flights.pop(entry['id'], None)
+    if old_flight is not None:
+        _remove_from_indexes(old_flight)
+    if entry['op'] != 'delete':
+        flights[entry['id']] = entry['record']
+        _add_to_indexes(entry['record'])
+
+def _load():
+    flights.clear()
+    for field in indexed_fields:
+        indexes[field].clear()
+    for loaded_flight in follower.load():
+        flights[loaded_flight['id']] = loaded_flight
+        _add_to_indexes(loaded_flight)
+
+def _catch_up():
+    # apply what other processes appended; needs lock and file_lock held
+    entries = follower.new_entries()
+    if entries is None:
+        _load()
+    else:
+        for entry in entries:
+            _apply(entry)
+
+def _refresh():
+    # a stat() when nothing changed; skipped while changes of ours are unwritten
+    if buffer.pending() or not follower.changed():
+        return
+    with lock.write_locked(), file_lock.shared():
+        _catch_up()
+
+def _write(entries):
+    with lock.write_locked(), file_lock.exclusive():
+        _catch_up()
+        for entry in entries: # ours come after anything just replayed
+            _apply(entry)
+        db.write_log_entries(entries, file_name)
+        db.maybe_compact(flights.values(), file_name)
+        follower.mark_log_end()
+
+def _discard(entries):
+    # a batch raised: its entries were only applied in memory, so load what
+    # is on disk again (other threads' open batches are applied again when
+    # they are written)
+    with lock.write_locked(), file_lock.shared():
+        _load()
+
+buffer = db.WriteBuffer(_write, lock.write_locked, _discard)
+
+with lock.write_locked(), file_lock.shared():
+    _load()
+
+def batch():
+    # with repo.batch(): ... - all changes in the block are written once, on
+    # exit, as one log line; if the block raises none of them are kept
+    return buffer.batch()
+
+def group_commit(max_entries = 1000, max_delay = 0.05):
+    buffer.group_commit(max_entries, max_delay)
+
+def _change(entry):
+    with lock.write_locked():
+        _apply(entry)
+        buffer.add(entry)
 
 def create_flight(flight):
-    global flights 
-    flights.append(flight)
-    db.write_to_file(flights, file_name)
+    _refresh()
+    with lock.write_locked():
+        if flight['id'] in flights:
+            raise ValueError(f"Flight id={flight['id']} exists already.")
+        _change(db.log_entry('create', flight))
 
 def read_all_flight():
-    return flights 
+    _refresh()
+    with lock.read_locked():
+        return list(flights.values())
 
 def read_by_id(id):
-    for flight in flights:
-        if flight['id'] == id:
-            return flight 
-    return None 
+    _refresh()
+    with lock.read_locked():
+        return flights.get(id)
+
+def read_by_field(field, value):
+    _refresh()
+    with lock.read_locked():
+        if field in indexes:
+            return list(indexes[field].get(value, {}).values())
+        return [flight for flight in flights.values() if flight[field] == value]
+
+def read_by_route(source, destination):
+    _refresh()
+    with lock.read_locked():
+        by_source = indexes['source'].get(source, {})
+        by_destination = indexes['destination'].get(destination, {})
+        if len(by_destination) < len(by_source):
+            return [flight for flight in by_destination.values() if flight['source'] == source]
+        return [flight for flight in by_source.values() if flight['destination'] == destination]
 
 def update(id, new_flight):#new_flight is update at id
-    global flights
-    I = 0
-    for flight in flights:
-        if flight['id'] == id:
-            flights[I] = new_flight
-            db.write_to_file(flights, file_name)
-            break 
-        I += 1
+    _refresh()
+    with lock.write_locked():
+        if id not in flights:
+            return
+        _change(db.log_entry('update', {**new_flight, 'id': id}))
     
 def delete_flight(id):
-    global flights
-    index = -1
-    I = 0
-    for flight in flights:
-        if flight['id'] == id:
-            index = I
-            break 
-        I += 1
-    if index != -1:
-        flights.pop(index)
-        db.write_to_file(flights, file_name)
\ No newline at end of file
+    _refresh()
+    with lock.write_locked():
+        if id in flights:
+            _change(db.log_entry('delete', {'id': id}))
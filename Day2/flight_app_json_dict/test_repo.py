@@ -0,0 +1,44 @@
+import importlib
+import pytest
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    # the repo loads its flights file from the working directory on import
+    monkeypatch.chdir(tmp_path)
+    module = importlib.reload(importlib.import_module(__package__ + '.repo_json_dict'))
+    yield module
+    module.buffer.group_commit(None)
+
+def flight(id, source = 'BLR', destination = 'DEL', price = 5000.0):
+    return {'id':id,'number':f'AI{id}','airline_name':'Air India','seats':180,
+            'price':price,'source':source,'destination':destination}
+
+def reopen(repo):
+    # a fresh load from disk, as another process would see it
+    return importlib.reload(repo)
+
+def test_create_read_update_delete(repo):
+    repo.create_flight(flight(1))
+    repo.create_flight(flight(2, destination='BOM'))
+    repo.update(1, flight(99, price=4000.0)) # the record stays at id 1
+    assert repo.read_by_id(1) == dict(flight(99, price=4000.0), id=1)
+    assert [f['id'] for f in repo.read_by_route('BLR', 'BOM')] == [2]
+    assert sorted(f['id'] for f in repo.read_by_field('source', 'BLR')) == [1, 2]
+    repo.delete_flight(2)
+    assert reopen(repo).read_all_flight() == [dict(flight(99, price=4000.0), id=1)]
+
+def test_create_duplicate_id_raises(repo):
+    repo.create_flight(flight(1))
+    with pytest.raises(ValueError):
+        repo.create_flight(flight(1, source='MAA'))
+    assert reopen(repo).read_all_flight() == [flight(1)]
+
+def test_batch_is_dropped_when_block_raises(repo):
+    repo.create_flight(flight(1))
+    with pytest.raises(RuntimeError):
+        with repo.batch():
+            repo.create_flight(flight(2))
+            repo.delete_flight(1)
+            raise RuntimeError()
+    assert repo.read_all_flight() == [flight(1)]
+    assert reopen(repo).read_all_flight() == [flight(1)]
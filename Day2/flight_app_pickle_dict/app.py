@@ -1,4 +1,5 @@
-import repo_pickle_dict as repo
+# run from Day2 as a module: python -m flight_app_pickle_dict.app
+from . import repo_pickle_dict as repo
 
 def menu():
     message = '''
@@ -23,9 +24,11 @@ Your Option:'''
         flight = {'id':id, 'number':number, 'airline_name':airline_name, 
                     'capacity':capacity, 'price':price, 'source': source, 'destination': destination}
 
-        repo.create_flight(flight)
-
-        print('Flight Created Successfully.')
+        try:
+            repo.create_flight(flight)
+            print('Flight Created Successfully.')
+        except ValueError as ex:
+            print(ex)
     elif choice == 2:
         print('List of Employees:')
         for flight in repo.read_all_flight():
@@ -1,15 +1,50 @@
-import pickle 
 import os
+import pickle 
 
-def read_from_file(filename = 'db1.dat'):
+# WriteBuffer, RWLock, FileLock and file_state are shared by the Day2 apps
+from store_common import FileLock, RWLock, WriteBuffer, file_state
+
+# Snapshot codecs:
+#   'pickle' - the whole list as one pickle
+#   'stream' - STREAM_MAGIC followed by one pickle per flight, so the file
+#              can be read back one record at a time
+# The format of an existing file is detected from its first bytes.
+CODEC = 'stream'
+STREAM_MAGIC = b'PKSTREAM'
+
+def iter_records(filename = 'db1.dat'):
     if not os.path.exists(filename):
-        flights = []
-        return flights 
-    
+        return
     with open(filename, 'rb') as reader:
-        flights = pickle.load(reader)
-        return flights 
+        if reader.read(len(STREAM_MAGIC)) != STREAM_MAGIC:
+            reader.seek(0)
+            yield from pickle.load(reader)
+            return
+        while True:
+            try:
+                yield pickle.load(reader)
+            except EOFError:
+                return
+
+def read_from_file(filename = 'db1.dat'):
+    return list(iter_records(filename))
+
+def _write_pickle(flights, writer):
+    pickle.dump(list(flights), writer)
+
+def _write_stream(flights, writer):
+    writer.write(STREAM_MAGIC)
+    for flight in flights:
+        pickle.dump(flight, writer)
+
+WRITERS = {'pickle': _write_pickle, 'stream': _write_stream}
     
-def write_to_file(flights, filename = 'db.dat'):
-    with open(filename, 'wb') as writer:
-        pickle.dump(flights, writer) 
\ No newline at end of file
+def write_to_file(flights, filename = 'db.dat', codec = None):
+    write = WRITERS[codec or CODEC]
+    # write to a temp file, fsync, then atomically rename over the old file
+    temp_filename = filename + '.tmp'
+    with open(temp_filename, 'wb') as writer:
+        write(flights, writer)
+        writer.flush()
+        os.fsync(writer.fileno())
+    os.replace(temp_filename, filename)
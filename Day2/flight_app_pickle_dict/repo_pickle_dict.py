@@ -1,42 +1,129 @@
-import db_pickle as db 
+from . import db_pickle as db
 #CRUD (Create, Read All | Read One, Update, Delete)
-#Flight App - Pickle Persistent Store (DB) - dict element
+#Flight App - Pickle Persistent Store (DB) - dict element, indexed by id
+#Safe to share between threads and between processes using the same file
 file_name = 'flights.dat' 
-flights = db.read_from_file(file_name) #[] # [{id, number, airline_name, seats, price, source, destination}, ...]
+lock = db.RWLock() # threads of this process
+file_lock = db.FileLock(file_name) # other processes
+flights = {} # {id: {id, number, airline_name, seats, price, source, destination}, ...}
+loaded_state = None # file_state() of the file flights was loaded from
+indexed_fields = ['source', 'destination']
+indexes = {field: {} for field in indexed_fields} # {field: {value: {id: flight}}}
+
+def _add_to_indexes(flight):
+    for field in indexed_fields:
+        indexes[field].setdefault(flight[field], {})[flight['id']] = flight
+
+def _remove_from_indexes(flight):
+    for field in indexed_fields:
+        matches = indexes[field].get(flight[field])
+        if matches is not None:
+            matches.pop(flight['id'], None)
+            if not matches:
+                del indexes[field][flight[field]]
+
+def _set(id, flight):
+    # flight None deletes
+    old_flight = flights.pop(id, None)
+    if old_flight is not None:
+        _remove_from_indexes(old_flight)
+    if flight is not None:
+        flights[id] = flight
+        _add_to_indexes(flight)
+
+def _load():
+    # needs lock and file_lock held
+    global loaded_state
+    flights.clear()
+    for field in indexed_fields:
+        indexes[field].clear()
+    for loaded_flight in db.read_from_file(file_name):
+        _set(loaded_flight['id'], loaded_flight)
+    loaded_state = db.file_state(file_name)
+
+def _refresh():
+    # a stat() when nothing changed; skipped while changes of ours are unwritten
+    if buffer.pending() or db.file_state(file_name) == loaded_state:
+        return
+    with lock.write_locked(), file_lock.shared():
+        _load()
+
+def _write(changes):
+    # changes are (id, flight or None) in order; every write saves the whole dict
+    global loaded_state
+    with lock.write_locked(), file_lock.exclusive():
+        if db.file_state(file_name) != loaded_state:
+            _load() # another process saved in the meantime
+        for id, flight in changes: # ours go on top of what was just loaded
+            _set(id, flight)
+        db.write_to_file(list(flights.values()), file_name)
+        loaded_state = db.file_state(file_name)
+
+def _discard(changes):
+    # a batch raised: its changes were only made in memory, so load what is
+    # on disk again (other threads' open batches are redone when written)
+    with lock.write_locked(), file_lock.shared():
+        _load()
+
+buffer = db.WriteBuffer(_write, lock.write_locked, _discard)
+
+with lock.write_locked(), file_lock.shared():
+    _load()
+
+def batch():
+    # with repo.batch(): ... - all changes in the block are written once, on
+    # exit; if the block raises none of them are kept
+    return buffer.batch()
+
+def group_commit(max_entries = 1000, max_delay = 0.05):
+    buffer.group_commit(max_entries, max_delay)
 
 def create_flight(flight):
-    global flights 
-    flights.append(flight)
-    db.write_to_file(flights, file_name)
+    _refresh()
+    with lock.write_locked():
+        if flight['id'] in flights:
+            raise ValueError(f"Flight id={flight['id']} exists already.")
+        _set(flight['id'], flight)
+        buffer.add((flight['id'], flight))
 
 def read_all_flight():
-    return flights 
+    _refresh()
+    with lock.read_locked():
+        return list(flights.values())
 
 def read_by_id(id):
-    for flight in flights:
-        if flight['id'] == id:
-            return flight 
-    return None 
+    _refresh()
+    with lock.read_locked():
+        return flights.get(id)
+
+def read_by_field(field, value):
+    _refresh()
+    with lock.read_locked():
+        if field in indexes:
+            return list(indexes[field].get(value, {}).values())
+        return [flight for flight in flights.values() if flight[field] == value]
+
+def read_by_route(source, destination):
+    _refresh()
+    with lock.read_locked():
+        by_source = indexes['source'].get(source, {})
+        by_destination = indexes['destination'].get(destination, {})
+        if len(by_destination) < len(by_source):
+            return [flight for flight in by_destination.values() if flight['source'] == source]
+        return [flight for flight in by_source.values() if flight['destination'] == destination]
 
 def update(id, new_flight):#new_flight is update at id
-    global flights
-    I = 0
-    for flight in flights:
-        if flight['id'] == id:
-            flights[I] = new_flight
-            db.write_to_file(flights, file_name)
-            break 
-        I += 1
+    _refresh()
+    with lock.write_locked():
+        if id not in flights:
+            return
+        new_flight = {**new_flight, 'id': id} # the record stays at id
+        _set(id, new_flight)
+        buffer.add((id, new_flight))
     
 def delete_flight(id):
-    global flights
-    index = -1
-    I = 0
-    for flight in flights:
-        if flight['id'] == id:
-            index = I
-            break 
-        I += 1
-    if index != -1:
-        flights.pop(index)
-        db.write_to_file(flights, file_name)
\ No newline at end of file
+    _refresh()
+    with lock.write_locked():
+        if id in flights:
+            _set(id, None)
+            buffer.add((id, None))
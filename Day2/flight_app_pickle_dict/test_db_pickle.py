@@ -0,0 +1,18 @@
+import pytest
+from . import db_pickle as db
+
+def flight(id):
+    return {'id':id,'number':f'AI{id}','airline_name':'Air India','seats':180,
+            'price':5000.0,'source':'BLR','destination':'DEL'}
+
+@pytest.mark.parametrize('codec', ['pickle', 'stream'])
+def test_snapshot_codec_round_trip(tmp_path, codec):
+    filename = str(tmp_path / 'flights.dat')
+    flights = [flight(id) for id in range(3)]
+    db.write_to_file(flights, filename, codec=codec)
+    with open(filename, 'rb') as reader:
+        assert (reader.read(len(db.STREAM_MAGIC)) == db.STREAM_MAGIC) == (codec == 'stream')
+    assert db.read_from_file(filename) == flights
+
+def test_missing_file_reads_as_empty(tmp_path):
+    assert db.read_from_file(str(tmp_path / 'flights.dat')) == []
@@ -0,0 +1,224 @@
+# Helpers shared by the Day2 file-backed apps (db_json.py and db_pickle.py
+# in each app folder, and their benchmarks). The app folders are packages
+# run from Day2 (python -m emp_app_json_dict.app), so this module is on the
+# import path; their db modules re-export what the repos use, so
+# 'db.RWLock()' keeps working.
+import atexit
+import os
+import threading
+from contextlib import contextmanager, nullcontext
+
+try:
+    import fcntl
+except ImportError: # not available on Windows, file locks are skipped there
+    fcntl = None
+try:
+    import resource
+except ImportError: # not available on Windows, only needed by peak_rss_kb()
+    resource = None
+
+# Write batching: mutations are handed to a WriteBuffer, which normally
+# writes each one straight away. Inside 'with buffer.batch():' a thread's
+# mutations are held until its outermost batch exits and then written
+# once; if the block raises they are dropped and discard() is called with
+# them, so the repo can undo what it applied in memory. Batches are per
+# thread: one thread's batch never holds back another thread's writes.
+# group_commit() keeps buffering on and writes every max_entries mutations
+# or max_delay seconds, so a crash loses at most the last max_delay seconds
+# of changes.
+class WriteBuffer:
+    def __init__(self, write, guard = nullcontext, discard = None):
+        self._write = write # called with the list of buffered items
+        self._guard = guard # e.g. RWLock.write_locked, always taken before the buffer lock
+        self._discard = discard # called with the items of a batch that raised
+        self._lock = threading.RLock()
+        self._items = [] # waiting for the next group commit
+        self._local = threading.local() # .items: this thread's open batch
+        self._batched = 0 # items in open batches, all threads
+        self._max_entries = None
+        self._stop = None
+        self._flush_at_exit = False
+
+    def add(self, item):
+        batch_items = getattr(self._local, 'items', None)
+        with self._guard(), self._lock:
+            if batch_items is not None:
+                batch_items.append(item)
+                self._batched += 1
+                return
+            if self._max_entries is None:
+                self._write([item])
+                return
+            self._items.append(item)
+            if len(self._items) >= self._max_entries:
+                self.flush()
+
+    def pending(self):
+        return len(self._items) + self._batched
+
+    def flush(self):
+        with self._guard(), self._lock:
+            if self._items:
+                items, self._items = self._items, []
+                self._write(items)
+
+    @contextmanager
+    def batch(self):
+        if getattr(self._local, 'items', None) is not None:
+            yield # nested: part of the outermost batch
+            return
+        self._local.items = []
+        try:
+            yield
+        except BaseException:
+            items, self._local.items = self._local.items, None
+            with self._guard(), self._lock:
+                self._batched -= len(items)
+                if items and self._discard is not None:
+                    self.flush() # group-committed items stay, discard() may reload
+                    self._discard(items)
+            raise
+        items, self._local.items = self._local.items, None
+        with self._guard(), self._lock:
+            self._batched -= len(items)
+            self._items.extend(items)
+            self.flush()
+
+    def group_commit(self, max_entries = 1000, max_delay = 0.05):
+        # max_entries=None switches group commit off again
+        with self._guard(), self._lock:
+            if self._stop is not None:
+                self._stop.set()
+                self._stop = None
+            self._max_entries = max_entries
+            if max_entries is None:
+                self.flush()
+                return
+            self._stop = threading.Event()
+            thread = threading.Thread(target=self._run, args=(self._stop, max_delay), daemon=True)
+            thread.start()
+            if not self._flush_at_exit:
+                atexit.register(self.flush)
+                self._flush_at_exit = True
+
+    def _run(self, stop, max_delay):
+        while not stop.wait(max_delay):
+            self.flush()
+
+# Concurrency: RWLock lets the threads of one process read together while a
+# writer has the data to itself. FileLock is an fcntl advisory lock on
+# '<filename>.lock' for writers in other processes; it opens its own
+# descriptor for every acquisition, so threads holding it exclude each other
+# too, while a thread that already holds it can take it again (an exclusive
+# hold covers nested shared ones). file_state() is the cheap (inode, mtime, size) check used to notice
+# that another process changed a file.
+class RWLock:
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._readers = 0
+        self._writer = None
+        self._depth = 0
+        self._waiting_writers = 0
+
+    @contextmanager
+    def read_locked(self):
+        me = threading.get_ident()
+        with self._condition:
+            if self._writer == me: # the writer may read its own data
+                reading = False
+            else:
+                while self._writer is not None or self._waiting_writers:
+                    self._condition.wait()
+                self._readers += 1
+                reading = True
+        try:
+            yield
+        finally:
+            if reading:
+                with self._condition:
+                    self._readers -= 1
+                    self._condition.notify_all()
+
+    @contextmanager
+    def write_locked(self):
+        me = threading.get_ident()
+        with self._condition:
+            if self._writer == me:
+                self._depth += 1
+            else:
+                self._waiting_writers += 1
+                while self._writer is not None or self._readers:
+                    self._condition.wait()
+                self._waiting_writers -= 1
+                self._writer = me
+                self._depth = 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._writer = None
+                    self._condition.notify_all()
+
+class FileLock:
+    def __init__(self, filename):
+        self.lock_filename = filename + '.lock'
+        self._held = threading.local() # .exclusive: the mode this thread holds
+
+    @contextmanager
+    def _locked(self, exclusive):
+        held = getattr(self._held, 'exclusive', None)
+        if held is not None:
+            # nested in this thread's own hold, e.g. a read inside a batch
+            if exclusive and not held:
+                raise RuntimeError('a shared file lock cannot be upgraded to exclusive')
+            yield
+            return
+        with open(self.lock_filename, 'a') as handle:
+            if fcntl is not None:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            self._held.exclusive = exclusive
+            try:
+                yield # closing the descriptor releases the lock
+            finally:
+                self._held.exclusive = None
+
+    def shared(self):
+        return self._locked(False)
+
+    def exclusive(self):
+        return self._locked(True)
+
+    def try_exclusive(self):
+        # the exclusive lock without waiting: the open handle (closing it
+        # releases the lock), or None if another process holds it
+        handle = open(self.lock_filename, 'a')
+        if fcntl is not None:
+            try:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                handle.close()
+                return None
+        return handle
+
+def file_state(filename):
+    try:
+        stat = os.stat(filename)
+    except FileNotFoundError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+def peak_rss_kb():
+    # ru_maxrss survives exec on Linux, so a child would report the parent's
+    # peak; VmHWM is reset for the new process image
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    if resource is None:
+        return 0
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
@@ -0,0 +1,134 @@
+import threading
+import pytest
+import store_common
+from store_common import FileLock, RWLock, WriteBuffer, file_state
+
+def make_buffer():
+    written, discarded = [], []
+    buffer = WriteBuffer(written.append, discard=discarded.append)
+    return buffer, written, discarded
+
+def test_write_buffer_writes_each_item_without_batch():
+    buffer, written, _ = make_buffer()
+    buffer.add(1)
+    buffer.add(2)
+    assert written == [[1], [2]]
+
+def test_write_buffer_batch_writes_once_on_exit():
+    buffer, written, _ = make_buffer()
+    with buffer.batch():
+        buffer.add(1)
+        with buffer.batch(): # nested: part of the outer batch
+            buffer.add(2)
+        assert written == []
+        assert buffer.pending() == 2
+    assert written == [[1, 2]]
+    assert buffer.pending() == 0
+
+def test_write_buffer_batch_discards_when_block_raises():
+    buffer, written, discarded = make_buffer()
+    with pytest.raises(RuntimeError):
+        with buffer.batch():
+            buffer.add(1)
+            raise RuntimeError()
+    assert written == []
+    assert discarded == [[1]]
+    assert buffer.pending() == 0
+
+def test_write_buffer_batch_is_per_thread():
+    buffer, written, _ = make_buffer()
+    with buffer.batch():
+        buffer.add(1)
+        thread = threading.Thread(target=buffer.add, args=(2,))
+        thread.start()
+        thread.join()
+        assert written == [[2]] # not held back by this thread's batch
+    assert written == [[2], [1]]
+
+def test_write_buffer_group_commit(monkeypatch):
+    registered = []
+    monkeypatch.setattr(store_common.atexit, 'register', registered.append)
+    buffer, written, _ = make_buffer()
+    buffer.group_commit(max_entries=3, max_delay=60)
+    buffer.add(1)
+    buffer.add(2)
+    assert written == []
+    buffer.add(3)
+    assert written == [[1, 2, 3]]
+    buffer.add(4)
+    buffer.group_commit(max_entries=2, max_delay=60) # restarted: one atexit hook
+    buffer.group_commit(None) # switching it off flushes
+    assert written == [[1, 2, 3], [4]]
+    assert registered == [buffer.flush]
+
+def test_write_buffer_group_commit_flushes_after_max_delay(monkeypatch):
+    monkeypatch.setattr(store_common.atexit, 'register', lambda function: None)
+    flushed = threading.Event()
+    buffer = WriteBuffer(lambda items: flushed.set())
+    buffer.group_commit(max_entries=1000, max_delay=0.01)
+    buffer.add(1)
+    assert flushed.wait(5)
+    buffer.group_commit(None)
+
+def hold_in_thread(locked):
+    # take locked() on another thread; the event is set once it is held
+    acquired = threading.Event()
+    def hold():
+        with locked():
+            acquired.set()
+    thread = threading.Thread(target=hold)
+    thread.start()
+    return thread, acquired
+
+def test_rwlock_readers_share_and_writer_excludes():
+    lock = RWLock()
+    with lock.read_locked():
+        thread, acquired = hold_in_thread(lock.read_locked)
+        assert acquired.wait(5) # a second reader does not wait
+        thread.join()
+        thread, acquired = hold_in_thread(lock.write_locked)
+        assert not acquired.wait(0.1) # a writer waits for the readers
+    assert acquired.wait(5)
+    thread.join()
+    with lock.write_locked():
+        thread, acquired = hold_in_thread(lock.read_locked)
+        assert not acquired.wait(0.1)
+        with lock.read_locked(), lock.write_locked(): # the writer may read and nest
+            pass
+    assert acquired.wait(5)
+    thread.join()
+
+def test_file_lock_excludes_other_holders(tmp_path):
+    filename = str(tmp_path / 'employees.json')
+    lock = FileLock(filename)
+    with lock.shared():
+        with lock.shared(): # nested in this thread's own hold
+            pass
+        with pytest.raises(RuntimeError):
+            with lock.exclusive():
+                pass
+        assert FileLock(filename).try_exclusive() is None # as another process would
+        thread, acquired = hold_in_thread(lock.shared)
+        assert acquired.wait(5) # readers share
+        thread.join()
+    with lock.exclusive():
+        with lock.shared(): # covered by the exclusive hold
+            pass
+        assert FileLock(filename).try_exclusive() is None
+        thread, acquired = hold_in_thread(lock.shared)
+        assert not acquired.wait(0.1) # another thread waits too
+    assert acquired.wait(5)
+    thread.join()
+    handle = FileLock(filename).try_exclusive()
+    assert handle is not None
+    handle.close()
+
+def test_file_state_changes_with_the_file(tmp_path):
+    filename = str(tmp_path / 'employees.json')
+    assert file_state(filename) is None
+    with open(filename, 'w') as writer:
+        writer.write('[]')
+    state = file_state(filename)
+    with open(filename, 'a') as writer:
+        writer.write(' ')
+    assert file_state(filename) != state
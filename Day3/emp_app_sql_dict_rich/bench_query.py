@@ -0,0 +1,80 @@
+"""
+Compare index-backed query_employees() plans with full table scans:
+    python bench_query.py [number of employees]
+Runs against a temporary SQLite file, never the app database.
+"""
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+tmp_dir = tempfile.mkdtemp()
+os.environ["EMPLOYEE_DB_URL"] = f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}"
+
+from sqlalchemy import insert, text
+from db import db_setup
+from db import repo_sql_dict as repo
+
+INDEX_NAME = "ix_employees_is_active_salary"
+CHUNK_SIZE = 50000
+REPEAT = 20
+
+def seed(count):
+    rows = ({'id':i,'name':f'Employee{i}','age':random.randint(20, 60),
+        'salary':random.randint(1000, 200000),'is_active':random.random() < 0.8} for i in range(1, count + 1))
+    with db_setup.engine.begin() as connection:
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) == CHUNK_SIZE:
+                connection.execute(insert(db_setup.Employee), chunk)
+                chunk = []
+        if chunk:
+            connection.execute(insert(db_setup.Employee), chunk)
+        connection.execute(text("ANALYZE"))
+
+QUERIES = {
+    "active, salary range, top 100 by salary": dict(is_active=True, min_salary=50000, max_salary=60000, order_by='salary', limit=100),
+    "inactive, 100 highest salaries": dict(is_active=False, order_by='salary', descending=True, limit=100),
+}
+
+def plan(kwargs):
+    # the SQL query_employees builds, without the keyset/limit parameters bound
+    where = ["is_active = :is_active"]
+    if 'min_salary' in kwargs:
+        where.append("salary BETWEEN :min_salary AND :max_salary")
+    order = "salary DESC, id DESC" if kwargs.get('descending') else "salary, id"
+    sql = f"EXPLAIN QUERY PLAN SELECT * FROM employees WHERE {' AND '.join(where)} ORDER BY {order} LIMIT 100"
+    with db_setup.engine.connect() as connection:
+        return "; ".join(row[-1] for row in connection.execute(text(sql), kwargs))
+
+def timed(kwargs):
+    started = time.perf_counter()
+    for _ in range(REPEAT):
+        page = repo.query_employees(**kwargs)
+    repo.query_employees(**kwargs, after=page[-1]) # keyset: next page must work too
+    return (time.perf_counter() - started) / REPEAT * 1000
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    started = time.perf_counter()
+    seed(count)
+    print(f"seeded {count} employees in {time.perf_counter() - started:.1f}s")
+    results = {name: [timed(kwargs), plan(kwargs)] for name, kwargs in QUERIES.items()}
+    with db_setup.engine.begin() as connection:
+        connection.execute(text(f"DROP INDEX {INDEX_NAME}"))
+    db_setup.engine.dispose() # pooled connections keep statements prepared against the index
+    for name, kwargs in QUERIES.items():
+        results[name] += [timed(kwargs), plan(kwargs)]
+    for name, (indexed_ms, indexed_plan, scan_ms, scan_plan) in results.items():
+        print(f"{name}:\n  indexed {indexed_ms:8.2f} ms  [{indexed_plan}]\n"
+              f"  no index {scan_ms:7.2f} ms  [{scan_plan}]\n  speedup {scan_ms / indexed_ms:.0f}x")
+
+if __name__ == "__main__":
+    try:
+        main()
+    finally:
+        db_setup.engine.dispose()
+        shutil.rmtree(tmp_dir)
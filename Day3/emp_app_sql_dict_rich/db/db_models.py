@@ -1,11 +1,15 @@
 from sqlalchemy.orm import declarative_base
-from sqlalchemy import Column, String, Integer, Float, Boolean
+from sqlalchemy import Column, String, Integer, Float, Boolean, Index
 
 Base = declarative_base() # model base class
 
 # models
 class Employee(Base): # our model class defined from ORM
     __tablename__ = "employees"
+    __table_args__ = (
+        # active/inactive filter + salary range or salary ordering (query_employees)
+        Index("ix_employees_is_active_salary", "is_active", "salary"),
+    )
     id = Column(Integer, primary_key = True)
     name = Column(String(255), nullable = False)
     age = Column(Integer, nullable = False)
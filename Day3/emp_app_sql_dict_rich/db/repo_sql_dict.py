@@ -1,68 +1,112 @@
-from .db_setup import session, Employee 
+from .db_setup import session_scope, Employee 
 from .log import logging 
+from sqlalchemy import select, tuple_
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 from .exc import EmployeeNotFoundError, EmployeeAlreadyExistError, DatabaseError
 #CRUD (Create, Read All | Read One, Update, Delete)
 #Employee App - SQL DB - dict element
+#Every call uses its own short-lived session, so the repo can be used from many threads
 def create_employee(employee):
     try:
-        employee_model = Employee(id = employee['id'],
-            name = employee['name'],
-            age = employee['age'],
-            salary = employee['salary'],
-            is_active = employee['is_active'] )
-        session.add(employee_model) #INSERT stmt db 
-        session.commit() 
+        with session_scope() as session:
+            employee_model = Employee(id = employee['id'],
+                name = employee['name'],
+                age = employee['age'],
+                salary = employee['salary'],
+                is_active = employee['is_active'] )
+            session.add(employee_model) #INSERT stmt db 
         logging.info("employee created.")
     except IntegrityError as ex:
-        session.rollback()
         logging.error("Duplicate employee id:%s",ex)
         raise EmployeeAlreadyExistError(f"Employee id={employee['id']} exists already.")
     except SQLAlchemyError as ex:
-        session.rollback()
         logging.error("Database error in creating employee:%s",ex)
         raise DatabaseError("Error in creating employee.")
+# reads select these columns with Core and build dicts straight from the
+# cursor rows, skipping ORM objects; writes still go through the ORM
+EMPLOYEE_COLUMNS = (Employee.id, Employee.name, Employee.age, Employee.salary, Employee.is_active)
+
+def _employee_dicts(session, statement):
+    result = session.execute(statement)
+    keys = tuple(result.keys())
+    return [dict(zip(keys, row)) for row in result]
+
 def read_all_employee():
-    employees = session.query(Employee).all()
-    dict_employees = []
-    for employee in employees:
-        employee_dict = {'id':employee.id, 
-            'name':employee.name,
-            'age':employee.age, 'salary':employee.salary,'is_active':employee.is_active}
-        dict_employees.append(employee_dict)
+    with session_scope() as session:
+        dict_employees = _employee_dicts(session, select(*EMPLOYEE_COLUMNS))
     logging.info("read all employees.")
     return dict_employees 
+SORT_COLUMNS = {'id': Employee.id, 'name': Employee.name, 'age': Employee.age, 'salary': Employee.salary}
+
+def query_employees(is_active = None, min_salary = None, max_salary = None,
+        order_by = 'id', descending = False, limit = 100, after = None):
+    """
+    Filter, sort and page employees inside the database.
+
+    Pages use keyset pagination: pass the last employee of the previous
+    page as `after` and the next page starts right behind it, without the
+    growing OFFSET scan. Filtering on is_active plus a salary range or
+    order is served by the (is_active, salary) index.
+    """
+    if order_by not in SORT_COLUMNS:
+        raise ValueError(f"Cannot sort employees by {order_by!r}, expected one of {sorted(SORT_COLUMNS)}")
+    column = SORT_COLUMNS[order_by]
+    # id breaks ties so that every row has a unique position
+    sort_key = [column] if order_by == 'id' else [column, Employee.id]
+    try:
+        with session_scope() as session:
+            query = select(*EMPLOYEE_COLUMNS)
+            if is_active is not None:
+                query = query.where(Employee.is_active == is_active)
+            if min_salary is not None:
+                query = query.where(Employee.salary >= min_salary)
+            if max_salary is not None:
+                query = query.where(Employee.salary <= max_salary)
+            if after is not None:
+                last = tuple_(*[after[column.key] for column in sort_key])
+                query = query.where(tuple_(*sort_key) < last if descending else tuple_(*sort_key) > last)
+            query = query.order_by(*[column.desc() if descending else column for column in sort_key])
+            if limit is not None:
+                query = query.limit(limit)
+            employees = _employee_dicts(session, query)
+    except SQLAlchemyError as ex:
+        logging.error("Database error in querying employees:%s",ex)
+        raise DatabaseError("Error in querying employees.")
+    logging.info("queried employees.")
+    return employees
+
 def read_model_by_id(id):
-    employee = session.query(Employee).filter_by(id = id).first()
+    # the returned model is detached; change it through update()
+    with session_scope() as session:
+        employee = session.get(Employee, id)
     logging.info("read employee model.")
     return employee
 
 def read_by_id(id):
-    employee = read_model_by_id(id)
-    if not employee: #if employee == None:
+    with session_scope() as session:
+        employees = _employee_dicts(session, select(*EMPLOYEE_COLUMNS).where(Employee.id == id))
+    if not employees:
         logging.info(f"employee not found {id}.")
         return None
-    employee_dict = {'id':employee.id,
-        'name':employee.name,
-        'age':employee.age,'salary':employee.salary,'is_active':employee.is_active} 
+    employee_dict = employees[0]
     logging.info("read employee for given id.")
     return employee_dict 
 
 def update(id, new_employee):
-    employee = read_model_by_id(id)
-    if not employee:
-        logging.info(f"employee not found {id}.")
-        return 
-    employee.salary = new_employee['salary']
-    session.commit()
+    with session_scope() as session:
+        employee = session.get(Employee, id)
+        if not employee:
+            logging.info(f"employee not found {id}.")
+            return 
+        employee.salary = new_employee['salary']
     logging.info("employee salary updated.")
     
 def delete_employee(id):
-    employee = read_model_by_id(id)
-    if not employee:
-        logging.info(f"employee not found {id}.")
-        return
-    session.delete(employee)
-    session.commit()
+    with session_scope() as session:
+        employee = session.get(Employee, id)
+        if not employee:
+            logging.info(f"employee not found {id}.")
+            return
+        session.delete(employee)
     logging.info("employee deleted.")
-    
\ No newline at end of file
+    
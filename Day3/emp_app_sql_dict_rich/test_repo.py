@@ -1,4 +1,10 @@
+import os
+import shutil
+import tempfile
 import pytest 
+# a throwaway database, set before db_setup creates its engine
+test_dir = tempfile.mkdtemp()
+os.environ["EMPLOYEE_DB_URL"] = "sqlite:///" + os.path.join(test_dir, "employee_app_db.db")
 from db import db_setup
 from db import repo_sql_dict as repo
 
@@ -9,6 +15,10 @@ def setup():
     db_setup.Base.metadata.create_all(db_setup.engine)
     yield 
     db_setup.Base.metadata.drop_all(db_setup.engine)
+
+def teardown_module():
+    db_setup.engine.dispose()
+    shutil.rmtree(test_dir, ignore_errors=True)
     
 def test_create_employee():
     emp = {'id':110,'name':'Dravid','age':50,'salary':1200,'is_active':True}
@@ -18,4 +28,22 @@ def test_create_employee():
     assert (savedEmp != None)
     assert (savedEmp['id'] == 110)
     assert (savedEmp['name'] == 'Dravid')
-    assert (savedEmp['salary'] == 1200)
\ No newline at end of file
+    assert (savedEmp['salary'] == 1200)
+def test_create_employee_from_thread_pool():
+    from concurrent.futures import ThreadPoolExecutor
+    employees = [{'id':i,'name':f'Player{i}','age':30,'salary':1000 + i,'is_active':True} for i in range(1, 101)]
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        list(pool.map(repo.create_employee, employees))
+        saved = list(pool.map(repo.read_by_id, range(1, 101)))
+    assert [emp['salary'] for emp in saved] == [1000 + i for i in range(1, 101)]
+    assert len(repo.read_all_employee()) == 100
+
+def test_query_employees_filters_sorts_and_pages():
+    for i in range(1, 21):
+        repo.create_employee({'id':i,'name':f'Player{i}','age':20 + i,'salary':100 * (i % 5),'is_active':i % 2 == 0})
+    page = repo.query_employees(is_active=True, min_salary=100, order_by='salary', limit=3)
+    assert [(emp['salary'], emp['id']) for emp in page] == [(100, 6), (100, 16), (200, 2)]
+    next_page = repo.query_employees(is_active=True, min_salary=100, order_by='salary', limit=3, after=page[-1])
+    assert [(emp['salary'], emp['id']) for emp in next_page] == [(200, 12), (300, 8), (300, 18)]
+    top = repo.query_employees(order_by='salary', descending=True, limit=2)
+    assert [emp['id'] for emp in top] == [19, 14]
@@ -0,0 +1,80 @@
+"""
+Compare index-backed query_flights() plans with full table scans:
+    python bench_query.py [number of flights]
+Runs against a temporary SQLite file, never the app database.
+"""
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+tmp_dir = tempfile.mkdtemp()
+os.environ["FLIGHT_DB_URL"] = f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}"
+
+from sqlalchemy import insert, text
+from db import db_setup
+from db import repo_sql_dict as repo
+
+INDEX_NAME = "ix_flights_source_destination_price"
+CITIES = ["Delhi", "Mumbai", "Kanpur", "Hyderabad", "Chennai", "Kolkata", "Pune", "Jaipur",
+    "Lucknow", "Goa", "Patna", "Indore", "Bhopal", "Nagpur", "Surat", "Kochi"]
+CHUNK_SIZE = 50000
+REPEAT = 20
+
+def seed(count):
+    def flight(i):
+        source, destination = random.sample(CITIES, 2)
+        return {'id':i,'number':i,'airline_name':random.choice(['Indigo', 'Vistara', 'SpiceJet']),
+            'capacity':180,'price':random.randint(2000, 20000),'source':source,'destination':destination}
+    with db_setup.engine.begin() as connection:
+        for start in range(1, count + 1, CHUNK_SIZE):
+            chunk = [flight(i) for i in range(start, min(start + CHUNK_SIZE, count + 1))]
+            connection.execute(insert(db_setup.Flight), chunk)
+        connection.execute(text("ANALYZE"))
+
+QUERIES = {
+    "Kanpur -> Hyderabad under 5000, cheapest first": dict(source='Kanpur', destination='Hyderabad', max_price=5000, limit=100),
+    "from Delhi, 100 cheapest": dict(source='Delhi', limit=100),
+}
+
+def plan(kwargs):
+    # the SQL query_flights builds, without the keyset/limit parameters bound
+    where = ["source = :source"]
+    if 'destination' in kwargs:
+        where.append("destination = :destination")
+    if 'max_price' in kwargs:
+        where.append("price <= :max_price")
+    sql = f'EXPLAIN QUERY PLAN SELECT * FROM "Fights" WHERE {" AND ".join(where)} ORDER BY price, id LIMIT 100'
+    with db_setup.engine.connect() as connection:
+        return "; ".join(row[-1] for row in connection.execute(text(sql), kwargs))
+
+def timed(kwargs):
+    started = time.perf_counter()
+    for _ in range(REPEAT):
+        page = repo.query_flights(**kwargs)
+    repo.query_flights(**kwargs, after=page[-1]) # keyset: next page must work too
+    return (time.perf_counter() - started) / REPEAT * 1000
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    started = time.perf_counter()
+    seed(count)
+    print(f"seeded {count} flights in {time.perf_counter() - started:.1f}s")
+    results = {name: [timed(kwargs), plan(kwargs)] for name, kwargs in QUERIES.items()}
+    with db_setup.engine.begin() as connection:
+        connection.execute(text(f"DROP INDEX {INDEX_NAME}"))
+    db_setup.engine.dispose() # pooled connections keep statements prepared against the index
+    for name, kwargs in QUERIES.items():
+        results[name] += [timed(kwargs), plan(kwargs)]
+    for name, (indexed_ms, indexed_plan, scan_ms, scan_plan) in results.items():
+        print(f"{name}:\n  indexed {indexed_ms:8.2f} ms  [{indexed_plan}]\n"
+              f"  no index {scan_ms:7.2f} ms  [{scan_plan}]\n  speedup {scan_ms / indexed_ms:.0f}x")
+
+if __name__ == "__main__":
+    try:
+        main()
+    finally:
+        db_setup.engine.dispose()
+        shutil.rmtree(tmp_dir)
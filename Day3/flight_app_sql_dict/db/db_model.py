@@ -1,11 +1,15 @@
 from sqlalchemy.orm import declarative_base
-from sqlalchemy import Column, String, Integer, Float, Boolean
+from sqlalchemy import Column, String, Integer, Float, Boolean, Index
 
 Base = declarative_base() # model base class
 
 # models
 class Flight(Base): # our model class defined from ORM
     __tablename__ = "Fights"
+    __table_args__ = (
+        # route lookup + price range or price ordering (query_flights)
+        Index("ix_flights_source_destination_price", "source", "destination", "price"),
+    )
     id = Column(Integer, primary_key = True)
     number = Column(Integer, nullable = False)
     airline_name = Column(String(25), nullable = False)
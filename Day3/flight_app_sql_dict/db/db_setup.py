@@ -1,10 +1,63 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker 
+import os
+from contextlib import contextmanager
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
 from .db_model import Base, Flight 
 
+# settings, can be overridden through environment variables
+DB_URL = os.environ.get("FLIGHT_DB_URL", "sqlite:///flight_app_db.db")
+SQL_ECHO = os.environ.get("SQL_ECHO", "").lower() in ("1", "true", "yes")
+POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "10"))
+MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", "20"))
+POOL_TIMEOUT = 30 # seconds to wait for a free connection
+POOL_RECYCLE = 1800 # seconds before a connection is replaced
+# WAL lets readers run while one writer commits; busy_timeout makes a
+# writer wait for the lock instead of failing with "database is locked"
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,
+    "cache_size": -64000, # KiB
+    "foreign_keys": "ON",
+}
+
+def _engine_options(url):
+    options = {"echo": SQL_ECHO, "pool_pre_ping": True}
+    if url in ("sqlite://", "sqlite:///:memory:"): # one shared in-memory connection, no pool to size
+        return options
+    options.update(pool_size = POOL_SIZE, max_overflow = MAX_OVERFLOW,
+        pool_timeout = POOL_TIMEOUT, pool_recycle = POOL_RECYCLE)
+    return options
+
 # db setup
-engine = create_engine("sqlite:///flight_app_db.db", echo = True)
+engine = create_engine(DB_URL, **_engine_options(DB_URL))
+
+@event.listens_for(engine, "connect")
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    if engine.dialect.name != "sqlite":
+        return
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
 Base.metadata.create_all(engine) # creates tables
-# session for sql operations 
-SessionLocal = sessionmaker(bind=engine)
-session = SessionLocal() # for sql ops
\ No newline at end of file
+for table in Base.metadata.sorted_tables: # indexes added to tables that already existed
+    for index in table.indexes:
+        index.create(engine, checkfirst = True)
+# sessions for sql operations: expire_on_commit=False keeps loaded
+# attributes readable after the session that loaded them is closed
+SessionLocal = sessionmaker(bind=engine, expire_on_commit = False)
+
+@contextmanager
+def session_scope():
+    """Short-lived session: commits on success, rolls back on error, always closes."""
+    new_session = SessionLocal()
+    try:
+        yield new_session
+        new_session.commit()
+    except Exception:
+        new_session.rollback()
+        raise
+    finally:
+        new_session.close()
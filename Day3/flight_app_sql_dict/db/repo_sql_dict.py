@@ -1,72 +1,204 @@
-from .db_setup import session, Flight 
+from .db_setup import engine, session_scope, Flight 
 from .log import logging 
+from sqlalchemy import select, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 from .exc import FlightNotFoundError, FlightAlreadyExistError, DatabaseError
 #CRUD (Create, Read All | Read One, Update, Delete)
 #Flight App - SQL DB - dict element
+#Every call uses its own short-lived session, so the repo can be used from many threads
 def create_flight(flight):
     try:
-        flight_model = Flight (id = flight['id'],
-            number = flight['number'],
-            airline_name = flight['airline_name'],
-            capacity = flight['capacity'],
-            price = flight['price'],
-            source = flight['source'],
-            destination = flight['destination'] )
-        session.add(flight_model) #INSERT stmt db 
-        session.commit() 
+        with session_scope() as session:
+            flight_model = Flight (id = flight['id'],
+                number = flight['number'],
+                airline_name = flight['airline_name'],
+                capacity = flight['capacity'],
+                price = flight['price'],
+                source = flight['source'],
+                destination = flight['destination'] )
+            session.add(flight_model) #INSERT stmt db 
         logging.info("flight created.")
     except IntegrityError as ex:
-        session.rollback()
         logging.error("Duplicate flight id:%s",ex)
         raise FlightAlreadyExistError(f"Flight id={flight['id']} exists already.")
     except SQLAlchemyError as ex:
-        session.rollback()
         logging.error("Database error in creating flight:%s",ex)
         raise DatabaseError("Error in creating flight.")
+# reads select these columns with Core and build dicts straight from the
+# cursor rows, skipping ORM objects; writes still go through the ORM
+FLIGHT_COLUMNS = (Flight.id, Flight.number, Flight.airline_name, Flight.capacity,
+    Flight.price, Flight.source, Flight.destination)
+
+def _flight_dicts(session, statement):
+    result = session.execute(statement)
+    keys = tuple(result.keys())
+    return [dict(zip(keys, row)) for row in result]
+
 def read_all_employee():
-    flights = session.query(Flight).all()
-    dict_flight = []
-    for flight in flights:
-        flight_dict = {'id':flight.id, 
-            'number':flight.number,
-            'airline_name':flight.airline_name,
-            'capacity':flight.capacity, 'price':flight.price,'source':flight.source, 'destination':flight.destination}
-        dict_flight.append(flight_dict)
+    with session_scope() as session:
+        dict_flight = _flight_dicts(session, select(*FLIGHT_COLUMNS))
     logging.info("read all employees.")
     return dict_flight 
+SORT_COLUMNS = {'id': Flight.id, 'number': Flight.number, 'airline_name': Flight.airline_name,
+    'capacity': Flight.capacity, 'price': Flight.price}
+
+def query_flights(source = None, destination = None, min_price = None, max_price = None,
+        order_by = 'price', descending = False, limit = 100, after = None):
+    """
+    Filter, sort and page flights inside the database.
+
+    Pages use keyset pagination: pass the last flight of the previous page
+    as `after` and the next page starts right behind it, without the
+    growing OFFSET scan. A route plus a price range or order is served by
+    the (source, destination, price) index.
+    """
+    if order_by not in SORT_COLUMNS:
+        raise ValueError(f"Cannot sort flights by {order_by!r}, expected one of {sorted(SORT_COLUMNS)}")
+    column = SORT_COLUMNS[order_by]
+    # id breaks ties so that every row has a unique position
+    sort_key = [column] if order_by == 'id' else [column, Flight.id]
+    try:
+        with session_scope() as session:
+            query = select(*FLIGHT_COLUMNS)
+            if source is not None:
+                query = query.where(Flight.source == source)
+            if destination is not None:
+                query = query.where(Flight.destination == destination)
+            if min_price is not None:
+                query = query.where(Flight.price >= min_price)
+            if max_price is not None:
+                query = query.where(Flight.price <= max_price)
+            if after is not None:
+                last = tuple_(*[after[column.key] for column in sort_key])
+                query = query.where(tuple_(*sort_key) < last if descending else tuple_(*sort_key) > last)
+            query = query.order_by(*[column.desc() if descending else column for column in sort_key])
+            if limit is not None:
+                query = query.limit(limit)
+            flights = _flight_dicts(session, query)
+    except SQLAlchemyError as ex:
+        logging.error("Database error in querying flights:%s",ex)
+        raise DatabaseError("Error in querying flights.")
+    logging.info("queried flights.")
+    return flights
+
 def read_model_by_id(id):
-    flight = session.query(Flight).filter_by(id = id).first()
+    # the returned model is detached; change it through update()
+    with session_scope() as session:
+        flight = session.get(Flight, id)
     logging.info("read flight model.")
     return flight
 
 def read_by_id(id):
-    flight = read_model_by_id(id)
-    if not flight:
+    with session_scope() as session:
+        flights = _flight_dicts(session, select(*FLIGHT_COLUMNS).where(Flight.id == id))
+    if not flights:
         logging.info(f"flight not found {id}.")
         return None
-    flight_dict = {'id':flight.id,
-        'number':flight.number,
-        'airline_name':flight.airline_name,
-        'capacity':flight.capacity, 'price':flight.price,'source':flight.source, 'destination':flight.destination} 
+    flight_dict = flights[0]
     logging.info("read employee for given id.")
     return flight_dict 
 
 def update(id, new_flight):
-    flight = read_model_by_id(id)
-    if not flight:
-        logging.info(f"flight not found {id}.")
-        return 
-    flight.salary = new_flight['salary']
-    session.commit()
+    with session_scope() as session:
+        flight = session.get(Flight, id)
+        if not flight:
+            logging.info(f"flight not found {id}.")
+            return 
+        flight.salary = new_flight['salary']
     logging.info("flight salary updated.")
     
 def delete_flight(id):
-    flight = read_model_by_id(id)
-    if not flight:
-        logging.info(f"flight not found {id}.")
-        return
-    session.delete(flight)
-    session.commit()
+    with session_scope() as session:
+        flight = session.get(Flight, id)
+        if not flight:
+            logging.info(f"flight not found {id}.")
+            return
+        session.delete(flight)
     logging.info("flight deleted.")
-    
\ No newline at end of file
+
+UPSERT_CHUNK_SIZE = 1000
+
+def _upsert_statements(dialect_name):
+    # (INSERT ... ON CONFLICT DO NOTHING RETURNING id, INSERT ... ON CONFLICT
+    # DO UPDATE) where the database supports it; None means the portable
+    # path (session.merge, a SELECT then INSERT or UPDATE)
+    dialects = {'sqlite': sqlite, 'postgresql': postgresql}
+    if dialect_name not in dialects:
+        return None
+    statement = dialects[dialect_name].insert(Flight)
+    insert_new = statement.on_conflict_do_nothing(index_elements = [Flight.id]).returning(Flight.id)
+    update_rest = statement.on_conflict_do_update(index_elements = [Flight.id],
+        set_ = {column.key: statement.excluded[column.key] for column in FLIGHT_COLUMNS if column.key != 'id'})
+    return insert_new, update_rest
+
+def _upsert_rows(session, statements, rows, counts):
+    # inserts and updates are counted from what the statements did, so a row
+    # another session adds at the same time is not counted as ours
+    if statements is None:
+        for row in rows:
+            if session.merge(Flight(**row)) in session.new:
+                counts['inserted'] += 1
+            else:
+                counts['updated'] += 1
+        return
+    insert_new, update_rest = statements
+    inserted = set(session.scalars(insert_new, rows)) # one executemany for the chunk
+    rest = []
+    for row in rows: # a repeated id inside the chunk counts as an update
+        if row['id'] in inserted:
+            inserted.discard(row['id'])
+            counts['inserted'] += 1
+        else:
+            rest.append(row)
+    if rest:
+        session.execute(update_rest, rest) # the rows that conflicted
+        counts['updated'] += len(rest)
+
+def _upsert_chunk(statements, rows, counts):
+    try:
+        with session_scope() as session:
+            chunk_counts = {'inserted': 0, 'updated': 0}
+            _upsert_rows(session, statements, rows, chunk_counts)
+        counts['inserted'] += chunk_counts['inserted']
+        counts['updated'] += chunk_counts['updated']
+        return
+    except SQLAlchemyError as ex:
+        logging.error("Upsert of %s flights failed, retrying one by one:%s", len(rows), ex)
+    for row in rows: # only the bad rows fail, the rest of the chunk still lands
+        try:
+            with session_scope() as session:
+                row_counts = {'inserted': 0, 'updated': 0}
+                _upsert_rows(session, statements, [row], row_counts)
+            counts['inserted'] += row_counts['inserted']
+            counts['updated'] += row_counts['updated']
+        except SQLAlchemyError as ex:
+            counts['failed'] += 1
+            logging.error("Upsert of flight id=%s failed:%s", row['id'], ex)
+
+def upsert_flights(flights, chunk_size = UPSERT_CHUNK_SIZE):
+    """
+    Insert new flights and update existing ones (matched on id) from any
+    iterable, e.g. a schedule feed read lazily from a file.
+
+    Rows are written chunk_size at a time, one transaction per chunk. A
+    chunk that fails is retried row by row, so one bad record does not
+    stop the feed. Returns {'inserted': n, 'updated': n, 'failed': n}.
+    """
+    statements = _upsert_statements(engine.dialect.name)
+    counts = {'inserted': 0, 'updated': 0, 'failed': 0}
+    chunk = []
+    for flight in flights:
+        try:
+            chunk.append({column.key: flight[column.key] for column in FLIGHT_COLUMNS})
+        except (KeyError, TypeError) as ex:
+            counts['failed'] += 1
+            logging.error("Invalid flight record %r:%s", flight, ex)
+            continue
+        if len(chunk) == chunk_size:
+            _upsert_chunk(statements, chunk, counts)
+            chunk = []
+    if chunk:
+        _upsert_chunk(statements, chunk, counts)
+    logging.info("upserted flights: %s", counts)
+    return counts
@@ -1,4 +1,10 @@
+import os
+import shutil
+import tempfile
 import pytest 
+# a throwaway database, set before db_setup creates its engine
+test_dir = tempfile.mkdtemp()
+os.environ["FLIGHT_DB_URL"] = "sqlite:///" + os.path.join(test_dir, "flight_app_db.db")
 from db import db_setup
 from db import repo_sql_dict as repo
 
@@ -9,6 +15,10 @@ def setup():
     db_setup.Base.metadata.create_all(db_setup.engine)
     yield 
     db_setup.Base.metadata.drop_all(db_setup.engine)
+
+def teardown_module():
+    db_setup.engine.dispose()
+    shutil.rmtree(test_dir, ignore_errors=True)
     
 def test_create_employee():
     flight = {'id':1001,'number':'I007','airline_name':'Indigo','capacity':250,'price':5000,'source':'Kanpur','destination':'Hyderabad'}
@@ -22,4 +32,35 @@ def test_create_employee():
     assert (savedflight['capacity'] == 250)
     assert (savedflight['price'] == 5000)
     assert (savedflight['source'] == 'Kanpur')
-    assert (savedflight['destination'] == 'Hyderabad')
\ No newline at end of file
+    assert (savedflight['destination'] == 'Hyderabad')
+def test_query_flights_by_route_under_price():
+    routes = [('Kanpur','Hyderabad'), ('Kanpur','Delhi')]
+    for i in range(1, 13):
+        source, destination = routes[i % 2]
+        repo.create_flight({'id':i,'number':i,'airline_name':'Indigo','capacity':180,'price':1000 * (i % 4),'source':source,'destination':destination})
+    page = repo.query_flights(source='Kanpur', destination='Hyderabad', max_price=2000, limit=2)
+    assert [(flight['price'], flight['id']) for flight in page] == [(0, 4), (0, 8)]
+    next_page = repo.query_flights(source='Kanpur', destination='Hyderabad', max_price=2000, after=page[-1])
+    assert [(flight['price'], flight['id']) for flight in next_page] == [(0, 12), (2000, 2), (2000, 6), (2000, 10)]
+
+def test_upsert_flights_counts_inserted_updated_failed():
+    def flight(i, price):
+        return {'id':i,'number':i,'airline_name':'Indigo','capacity':180,'price':price,'source':'Kanpur','destination':'Delhi'}
+    assert repo.upsert_flights([flight(i, 1000) for i in range(1, 6)], chunk_size=2) == {'inserted':5,'updated':0,'failed':0}
+    feed = [flight(2, 1500), flight(6, 900), {'id':7}, flight(8, None), flight(4, 1200)]
+    assert repo.upsert_flights(feed, chunk_size=10) == {'inserted':1,'updated':2,'failed':2}
+    assert repo.read_by_id(2)['price'] == 1500
+    assert repo.read_by_id(4)['price'] == 1200
+    assert repo.read_by_id(8) is None
+    assert len(repo.read_all_employee()) == 6
+
+@pytest.mark.parametrize('portable', [False, True])
+def test_upsert_flights_counts_from_the_statements(monkeypatch, portable):
+    def flight(i, price):
+        return {'id':i,'number':i,'airline_name':'Indigo','capacity':180,'price':price,'source':'Kanpur','destination':'Delhi'}
+    if portable: # a database without INSERT ... ON CONFLICT
+        monkeypatch.setattr(repo, '_upsert_statements', lambda dialect_name: None)
+    repo.create_flight(flight(1, 1000))
+    feed = [flight(1, 1100), flight(2, 900), flight(2, 950), flight(3, 800)]
+    assert repo.upsert_flights(feed) == {'inserted':2,'updated':2,'failed':0}
+    assert [(f['id'], f['price']) for f in repo.read_all_employee()] == [(1, 1100), (2, 950), (3, 800)]
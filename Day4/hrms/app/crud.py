@@ -1,4 +1,5 @@
-from Project.hms.app.models import db, Employee
+from sqlalchemy import select
+from .models import db, Employee
 
 def create_employee(employee):
     employee_model = Employee(id = employee['id'],
@@ -10,11 +11,12 @@ def create_employee(employee):
     db.session.commit() 
 
 def read_all_employee():
-    employees = db.session.query(Employee).all()
-    dict_employees = []
-    for employee in employees:
-        employee_dict = employee.to_dict()
-        dict_employees.append(employee_dict)
+    # Core select of the columns, dicts built straight from the cursor rows
+    # instead of hydrating Employee objects; writes still use the ORM
+    result = db.session.execute(select(Employee.id, Employee.name, Employee.age,
+        Employee.salary, Employee.is_active))
+    keys = tuple(result.keys())
+    dict_employees = [dict(zip(keys, row)) for row in result]
     return dict_employees 
 
 def read_model_by_id(id):
@@ -0,0 +1,90 @@
+
+# Crawl the local fixture site at a few concurrency levels:
+#   python bench_crawler.py --pages 300 --latency 0.05 --fail-rate 0.02
+import argparse
+import asyncio
+import contextlib
+import io
+import multiprocessing
+import os
+import tempfile
+import time
+
+import aiohttp
+
+import fixture_server
+from crawler import Crawler
+from http_cache import HttpCache
+from scrap_concurrent_coroutine import parse_books_page, parse_quotes_page
+
+
+async def wait_for_server(url):
+    async with aiohttp.ClientSession() as session:
+        for _ in range(100):
+            try:
+                async with session.get(url):
+                    return
+            except aiohttp.ClientError:
+                await asyncio.sleep(0.05)
+    raise RuntimeError(f"fixture server did not start at {url}")
+
+
+async def bench(base_url, concurrency, pages, seeded):
+    # "next" links form one chain per site, so following them fetches one page
+    # per site at a time; seeding every page URL (as from a sitemap) shows how
+    # far the worker pool scales
+    crawler = Crawler(concurrency=concurrency, limit_per_host=concurrency, rate_per_host=None,
+                      backoff=0.05)
+    quote_urls = [f"{base_url}/page/{page}/" for page in range(1, (pages if seeded else 1) + 1)]
+    book_urls = [f"{base_url}/catalogue/page-{page}.html" for page in range(1, (pages if seeded else 1) + 1)]
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()): # the per-page prints
+        quotes, books = await asyncio.gather(crawler.run(quote_urls, parse_quotes_page),
+                                             crawler.run(book_urls, parse_books_page))
+    elapsed = time.perf_counter() - started
+    print(f"{'seeded' if seeded else 'next  '} concurrency={concurrency:<4} pages={crawler.stats['pages']:<5} "
+          f"retries={crawler.stats['retries']:<4} failed={crawler.stats['failed']:<3} "
+          f"items={len(quotes) + len(books):<6} {elapsed:7.2f}s {crawler.stats['pages'] / elapsed:8.1f} pages/s")
+
+
+async def bench_cache(base_url, pages):
+    # the fixture sends ETags with max-age=0, so a repeat crawl is all 304s
+    with tempfile.TemporaryDirectory() as directory:
+        for run in ("cold", "warm"):
+            cache = HttpCache(os.path.join(directory, "cache.db"))
+            crawler = Crawler(concurrency=16, limit_per_host=16, rate_per_host=None, cache=cache)
+            started = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                await crawler.run([f"{base_url}/page/{page}/" for page in range(1, pages + 1)],
+                                  parse_quotes_page)
+            elapsed = time.perf_counter() - started
+            print(f"cache {run}  pages={crawler.stats['pages']:<5} 304s={crawler.stats['not_modified']:<5} "
+                  f"downloaded={crawler.stats['bytes'] / 1024:8.1f} KB {elapsed:7.2f}s")
+            cache.close()
+
+
+async def main(args):
+    base_url = f"http://127.0.0.1:{args.port}"
+    await wait_for_server(f"{base_url}/page/1/")
+    for seeded in (False, True):
+        for concurrency in args.concurrency:
+            await bench(base_url, concurrency, args.pages, seeded)
+    await bench_cache(base_url, args.pages)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    args = parser.parse_args()
+
+    server = multiprocessing.Process(target=fixture_server.serve, daemon=True,
+                                     args=(args.port, args.pages, args.latency, args.fail_rate))
+    server.start()
+    try:
+        asyncio.run(main(args))
+    finally:
+        server.terminate()
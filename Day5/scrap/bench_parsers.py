@@ -0,0 +1,59 @@
+
+# Parse throughput per backend, inline on the event loop and in a process pool,
+# crawling every page of the local fixture site:
+#   python bench_parsers.py --pages 300 --latency 0.01
+import argparse
+import asyncio
+import functools
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import fixture_server
+import parsers
+from bench_crawler import wait_for_server
+from crawler import Crawler
+
+
+async def bench(base_url, pages, concurrency, backend, executor):
+    crawler = Crawler(concurrency=concurrency, limit_per_host=concurrency, rate_per_host=None,
+                      executor=executor)
+    started = time.perf_counter()
+    quotes, books = await asyncio.gather(
+        crawler.run([f"{base_url}/page/{page}/" for page in range(1, pages + 1)],
+                    functools.partial(parsers.parse_quotes_page, backend=backend)),
+        crawler.run([f"{base_url}/catalogue/page-{page}.html" for page in range(1, pages + 1)],
+                    functools.partial(parsers.parse_books_page, backend=backend)))
+    elapsed = time.perf_counter() - started
+    mode = "inline" if executor is None else "process pool"
+    print(f"{backend:<12} {mode:<13} pages={crawler.stats['pages']:<5} items={len(quotes) + len(books):<6} "
+          f"{elapsed:6.2f}s {crawler.stats['pages'] / elapsed:8.1f} pages/s "
+          f"{crawler.stats['bytes'] / elapsed / 2**20:6.2f} MB/s")
+
+
+async def main(args):
+    base_url = f"http://127.0.0.1:{args.port}"
+    await wait_for_server(f"{base_url}/page/1/")
+    with ProcessPoolExecutor(args.workers) as pool:
+        for backend in parsers.BACKENDS:
+            for executor in (None, pool):
+                await bench(base_url, args.pages, args.concurrency, backend, executor)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--latency", type=float, default=0.01)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    server = multiprocessing.Process(target=fixture_server.serve, daemon=True,
+                                     args=(args.port, args.pages, args.latency))
+    server.start()
+    try:
+        asyncio.run(main(args))
+    finally:
+        server.terminate()
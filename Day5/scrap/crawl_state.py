@@ -0,0 +1,162 @@
+
+# Resumable crawl state. A SQLite file keeps the URL frontier (pending, done
+# or failed per URL) and a content hash per scraped record; the records go
+# to a sink (see sinks.py) as each page is checkpointed. A checkpoint writes
+# the page's new or changed records and marks the page done in one
+# transaction, and the sink's position is stored with it, so after a crash
+# the output is cut back to the last checkpoint and nothing is written
+# twice. A sink that can't be rewound (position() None) is refused.
+#
+#   state = CrawlState("quotes_state.db", open_sink("quotes.ndjson"), key_fields=("quote", "author"))
+#   urls = state.start(["http://quotes.toscrape.com/page/1/"]) # pending URLs, or a new pass
+#   new_records = state.checkpoint(url, next_urls, records)
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS frontier (
+    url TEXT PRIMARY KEY,
+    state TEXT NOT NULL DEFAULT 'pending'
+);
+CREATE TABLE IF NOT EXISTS records (
+    key TEXT PRIMARY KEY,
+    hash TEXT NOT NULL,
+    url TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value NOT NULL
+);
+"""
+
+
+def record_hash(record):
+    return hashlib.sha256(json.dumps(record, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class CrawlState:
+    def __init__(self, path="crawl_state.db", sink=None, key_fields=None):
+        if sink is not None and sink.position() is None:
+            raise ValueError(f"{type(sink).__name__} can't be rewound, so a crawl into it can't be resumed")
+        self.path = path
+        self.sink = sink
+        self.key_fields = key_fields # fields naming a record; None = the whole record
+        self._connection = None
+        self._pid = None # a forked worker process opens its own connection
+        self._lock = threading.Lock()
+
+    def _db(self):
+        if self._connection is None or self._pid != os.getpid():
+            self._pid = os.getpid()
+            # autocommit mode, transactions are opened explicitly below
+            self._connection = sqlite3.connect(self.path, timeout=60, isolation_level=None,
+                                               check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.executescript(SCHEMA)
+        return self._connection
+
+    def _key(self, record):
+        if self.key_fields is None:
+            return record_hash(record)
+        return json.dumps([record.get(field) for field in self.key_fields], ensure_ascii=False)
+
+    def _sink_position(self, db):
+        # stored as JSON: a byte offset, or a (parts, rows) pair for the columnar sinks
+        row = db.execute("SELECT value FROM meta WHERE name = 'sink_position'").fetchone()
+        if row is None:
+            return None
+        position = json.loads(row[0]) if isinstance(row[0], str) else row[0]
+        return tuple(position) if isinstance(position, list) else position
+
+    def _write_sink(self, db, records):
+        self.sink.write(records)
+        position = self.sink.position() # makes the records durable
+        if position is not None:
+            db.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('sink_position', ?)",
+                       (json.dumps(position),))
+
+    def start(self, start_urls):
+        """
+        Return the URLs to crawl: the unfinished ones of an interrupted run,
+        or start_urls for a new pass (records already seen are kept, so a new
+        pass only emits new or changed records).
+        """
+        with self._lock:
+            db = self._db()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                position = self._sink_position(db)
+                current = self.sink.position() if self.sink is not None else None
+                if position is not None and current is not None:
+                    # drop what a crashed run wrote after its last checkpoint; never
+                    # extend the file if it lost data the state had counted on
+                    self.sink.rewind(min(position, current))
+                pending = [url for (url,) in db.execute("SELECT url FROM frontier WHERE state != 'done'")]
+                if not pending:
+                    db.execute("DELETE FROM frontier")
+                    db.executemany("INSERT OR IGNORE INTO frontier (url) VALUES (?)",
+                                   [(url,) for url in start_urls])
+                    pending = list(dict.fromkeys(start_urls))
+                else:
+                    db.execute("UPDATE frontier SET state = 'pending' WHERE state = 'failed'")
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        return pending
+
+    def done_urls(self):
+        with self._lock:
+            return {url for (url,) in self._db().execute("SELECT url FROM frontier WHERE state = 'done'")}
+
+    def checkpoint(self, url, links, records):
+        """
+        Record that url was scraped: store the records' hashes, write the new
+        or changed ones to the output, mark url done and links pending.
+        Returns the new or changed records.
+        """
+        with self._lock:
+            db = self._db()
+            db.execute("BEGIN IMMEDIATE") # also orders writers from other processes
+            try:
+                fresh = []
+                for record in records:
+                    key, digest = self._key(record), record_hash(record)
+                    row = db.execute("SELECT hash FROM records WHERE key = ?", (key,)).fetchone()
+                    if row is None or row[0] != digest:
+                        fresh.append(record)
+                        db.execute("INSERT OR REPLACE INTO records (key, hash, url) VALUES (?, ?, ?)",
+                                   (key, digest, url))
+                if fresh and self.sink is not None:
+                    self._write_sink(db, fresh)
+                db.execute("INSERT OR REPLACE INTO frontier (url, state) VALUES (?, 'done')", (url,))
+                db.executemany("INSERT OR IGNORE INTO frontier (url) VALUES (?)", [(link,) for link in links])
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        return fresh
+
+    def failed(self, url):
+        # retried when the crawl is resumed
+        with self._lock:
+            self._db().execute("INSERT OR REPLACE INTO frontier (url, state) VALUES (?, 'failed')", (url,))
+
+    def stats(self):
+        with self._lock:
+            db = self._db()
+            frontier = dict(db.execute("SELECT state, COUNT(*) FROM frontier GROUP BY state").fetchall())
+            records = db.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+        return {**frontier, "records": records}
+
+    def close(self):
+        with self._lock:
+            if self.sink is not None:
+                self.sink.close()
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
@@ -0,0 +1,220 @@
+
+import asyncio
+import random
+import time
+from urllib.parse import urljoin, urldefrag, urlsplit
+
+import aiohttp # pip install aiohttp
+
+# Statuses worth another try: rate limited or the server is having a bad moment
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+DONE = object()
+
+
+class _Frontier(asyncio.Queue):
+    # one crawl's queue of URLs to fetch; queued counts the URLs put on it
+    # this run, which is what max_pages limits (a resumed crawl's seen set
+    # also holds the pages done by earlier runs)
+    def __init__(self):
+        super().__init__()
+        self.queued = 0
+
+
+# ------------------------------
+# Per-host politeness
+# ------------------------------
+class HostRateLimiter:
+    # hands out request slots at most 'rate' per second for each host;
+    # everything runs on one event loop, so no lock is needed
+    def __init__(self, rate=None):
+        self.rate = rate # requests per second per host, None = no limit
+        self.next_slot = {}
+
+    async def wait(self, host):
+        if not self.rate:
+            return
+        now = time.monotonic()
+        slot = max(now, self.next_slot.get(host, now))
+        self.next_slot[host] = slot + 1 / self.rate
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+# ------------------------------
+# Crawler engine
+# ------------------------------
+class Crawler:
+    """
+    Crawl pages with a fixed pool of worker tasks sharing one keep-alive
+    connection pool.
+
+    parse(url, body) gets the raw page bytes and returns (items, links);
+    links (e.g. the "next" page) are resolved against url and crawled once
+    each. crawl() yields (url, items) as pages finish, in completion order.
+
+    With an executor (e.g. a ProcessPoolExecutor) parse runs there and must
+    be picklable; the workers go back to downloading while pages are parsed.
+    At most parse_ahead downloaded pages wait for a parser at a time.
+
+    With a state every parsed page is checkpointed; a crawl started again
+    picks up the unfinished pages, and only new or changed items are yielded.
+    """
+
+    def __init__(self, concurrency=10, limit_per_host=4, rate_per_host=10.0,
+                 retries=3, backoff=0.5, timeout=10.0, max_pages=None, headers=None,
+                 executor=None, parse_ahead=None, cache=None, state=None):
+        self.concurrency = concurrency
+        self.cache = cache # http_cache.HttpCache: conditional GETs, offline replay
+        self.state = state # crawl_state.CrawlState: resume, only new or changed items
+        self.executor = executor
+        self.parse_ahead = parse_ahead or concurrency * 2
+        self.limit_per_host = limit_per_host # open connections per host
+        self.rate_limiter = HostRateLimiter(rate_per_host)
+        self.retries = retries
+        self.backoff = backoff # first retry delay in seconds, doubled each time
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.max_pages = max_pages
+        self.headers = headers or {"User-Agent": "cisco-learning-crawler/1.0"}
+        self.stats = {"pages": 0, "failed": 0, "retries": 0, "bytes": 0, "cached": 0, "not_modified": 0}
+
+    def _backoff_delay(self, attempt):
+        # full jitter keeps retrying workers from hitting the host in lockstep
+        return self.backoff * 2 ** attempt * random.uniform(0.5, 1.5)
+
+    async def fetch(self, session, url):
+        """Return the page body, or None once the retries are used up."""
+        # the cache is a SQLite file; its calls run in a thread so a slow
+        # disk doesn't stall every other download on the loop
+        entry = None
+        if self.cache is not None:
+            entry = await asyncio.to_thread(self.cache.lookup, url)
+            if self.cache.usable(entry):
+                self.stats["cached"] += 1
+                return entry.content
+            if self.cache.offline:
+                print(f" Not in the offline cache: {url}")
+                return None
+        headers = self.cache.conditional_headers(entry) if self.cache is not None else None
+        host = urlsplit(url).netloc
+        for attempt in range(self.retries + 1):
+            await self.rate_limiter.wait(host)
+            try:
+                async with session.get(url, headers=headers) as response:
+                    status, response_headers = response.status, response.headers
+                    body = await response.read() if status == 200 else None
+                # the connection is back in the pool before the cache is written
+                if status == 304 and entry is not None:
+                    self.stats["not_modified"] += 1
+                    await asyncio.to_thread(self.cache.refresh, url, response_headers)
+                    return entry.content
+                if status == 200:
+                    self.stats["bytes"] += len(body)
+                    if self.cache is not None:
+                        await asyncio.to_thread(self.cache.store, url, response_headers, body)
+                    return body
+                if status not in RETRY_STATUSES:
+                    print(f" Failed to fetch {url}: status {status}")
+                    return None
+                error = f"status {status}"
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = repr(e)
+            if attempt < self.retries:
+                self.stats["retries"] += 1
+                await asyncio.sleep(self._backoff_delay(attempt))
+        print(f" Giving up on {url} after {self.retries + 1} attempts: {error}")
+        return None
+
+    def _enqueue(self, frontier, seen, url):
+        url = urldefrag(url)[0]
+        if url in seen:
+            return
+        if self.max_pages is not None and frontier.queued >= self.max_pages:
+            return
+        seen.add(url)
+        frontier.queued += 1
+        frontier.put_nowait(url)
+
+    async def _worker(self, session, frontier, results, seen, parse, parse_slots, parsing):
+        while True:
+            url = await frontier.get()
+            try:
+                body = await self.fetch(session, url)
+            except Exception as e:
+                print(f" Error scraping {url}: {e}")
+                body = None
+            if body is None:
+                self.stats["failed"] += 1
+                if self.state is not None:
+                    await asyncio.to_thread(self.state.failed, url)
+                frontier.task_done()
+                continue
+            await parse_slots.acquire()
+            task = asyncio.create_task(self._parse(url, body, frontier, results, seen, parse, parse_slots))
+            parsing.add(task)
+            task.add_done_callback(parsing.discard)
+
+    async def _parse(self, url, body, frontier, results, seen, parse, parse_slots):
+        try:
+            if self.executor is None:
+                items, links = parse(url, body)
+            else:
+                items, links = await asyncio.get_running_loop().run_in_executor(
+                    self.executor, parse, url, body)
+            links = [urldefrag(urljoin(url, link))[0] for link in links]
+            if self.state is not None:
+                # SQLite commit and sink write, kept off the loop like the cache
+                items = await asyncio.to_thread(self.state.checkpoint, url, links, items)
+            # queue the links before task_done() so join() can't finish early
+            for link in links:
+                self._enqueue(frontier, seen, link)
+            self.stats["pages"] += 1
+            await results.put((url, items))
+        except Exception as e:
+            self.stats["failed"] += 1
+            print(f" Error scraping {url}: {e}")
+        finally:
+            parse_slots.release()
+            frontier.task_done()
+
+    async def _finish(self, frontier, results):
+        await frontier.join()
+        await results.put(DONE)
+
+    async def crawl(self, start_urls, parse):
+        frontier = _Frontier()
+        results = asyncio.Queue(maxsize=self.concurrency * 2) # workers wait for a slow consumer
+        seen = set()
+        if self.state is not None:
+            start_urls = await asyncio.to_thread(self.state.start, start_urls)
+            seen = await asyncio.to_thread(self.state.done_urls)
+        parse_slots = asyncio.Semaphore(self.parse_ahead)
+        parsing = set() # parse tasks in flight
+        for url in start_urls:
+            self._enqueue(frontier, seen, url)
+
+        connector = aiohttp.TCPConnector(limit=self.concurrency, limit_per_host=self.limit_per_host,
+                                         ttl_dns_cache=300)
+        async with aiohttp.ClientSession(connector=connector, timeout=self.timeout,
+                                         headers=self.headers) as session:
+            tasks = [asyncio.create_task(self._worker(session, frontier, results, seen, parse,
+                                                      parse_slots, parsing))
+                     for _ in range(self.concurrency)]
+            tasks.append(asyncio.create_task(self._finish(frontier, results)))
+            try:
+                while True:
+                    result = await results.get()
+                    if result is DONE:
+                        break
+                    yield result
+            finally:
+                tasks.extend(parsing)
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def run(self, start_urls, parse):
+        """Crawl everything and return all items as one list."""
+        items = []
+        async for _, page_items in self.crawl(start_urls, parse):
+            items.extend(page_items)
+        return items
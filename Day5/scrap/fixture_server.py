@@ -0,0 +1,75 @@
+
+# Local stand-in for quotes.toscrape.com and books.toscrape.com, so the
+# crawlers can be benchmarked without touching the real sites:
+#   python fixture_server.py --pages 500 --latency 0.05 --fail-rate 0.02
+# quotes start at http://127.0.0.1:8765/page/1/
+# books start at  http://127.0.0.1:8765/catalogue/page-1.html
+import argparse
+import asyncio
+import random
+
+from aiohttp import web # pip install aiohttp
+
+QUOTES_PER_PAGE = 10
+BOOKS_PER_PAGE = 20
+
+
+def quotes_html(page, pages):
+    quotes = "".join(
+        f'<div class="quote"><span class="text">Quote {page}-{i}</span>'
+        f'<span>by <small class="author">Author {i}</small></span>'
+        f'<div class="tags"><a class="tag" href="/tag/a/">a</a><a class="tag" href="/tag/b/">b</a></div></div>'
+        for i in range(QUOTES_PER_PAGE))
+    pager = f'<li class="next"><a href="/page/{page + 1}/">Next</a></li>' if page < pages else ""
+    return f"<html><head><meta charset=\"utf-8\"></head><body>{quotes}<ul class=\"pager\">{pager}</ul></body></html>"
+
+
+def books_html(page, pages):
+    books = "".join(
+        f'<article class="product_pod"><h3><a href="b.html" title="Book {page}-{i}">Book</a></h3>'
+        f'<p class="price_color">£{10 + i}.99</p></article>'
+        for i in range(BOOKS_PER_PAGE))
+    pager = f'<li class="next"><a href="page-{page + 1}.html">next</a></li>' if page < pages else ""
+    return f"<html><head><meta charset=\"utf-8\"></head><body><ol>{books}</ol><ul class=\"pager\">{pager}</ul></body></html>"
+
+
+def make_app(pages=100, latency=0.0, fail_rate=0.0, max_age=0):
+    async def respond(request, render, page):
+        if latency:
+            await asyncio.sleep(latency)
+        if page < 1 or page > pages:
+            raise web.HTTPNotFound()
+        if fail_rate and random.random() < fail_rate:
+            raise web.HTTPServiceUnavailable()
+        # pages never change, so the page number is a valid ETag
+        headers = {"ETag": f'"{page}"', "Cache-Control": f"max-age={max_age}"}
+        if request.headers.get("If-None-Match") == headers["ETag"]:
+            return web.Response(status=304, headers=headers)
+        return web.Response(text=render(page, pages), content_type="text/html", headers=headers)
+
+    async def quotes(request):
+        return await respond(request, quotes_html, int(request.match_info["page"]))
+
+    async def books(request):
+        return await respond(request, books_html, int(request.match_info["page"]))
+
+    app = web.Application()
+    app.router.add_get(r"/page/{page:\d+}/", quotes)
+    app.router.add_get(r"/catalogue/page-{page:\d+}.html", books)
+    return app
+
+
+def serve(port=8765, pages=100, latency=0.0, fail_rate=0.0, max_age=0):
+    web.run_app(make_app(pages, latency, fail_rate, max_age), host="127.0.0.1", port=port,
+                print=None, access_log=None)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to each response")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fraction of 503 responses")
+    parser.add_argument("--max-age", type=int, default=0, help="Cache-Control max-age of the pages")
+    args = parser.parse_args()
+    serve(args.port, args.pages, args.latency, args.fail_rate, args.max_age)
@@ -0,0 +1,261 @@
+
+# On-disk HTTP cache shared by the scrapers and the HMS app (which loads this
+# file from Project/hms/app/http_cache.py). Responses live in a SQLite file:
+# one row per URL with its validators (ETag, Last-Modified) and expiry time
+# from Cache-Control max-age, and the bodies zlib-compressed in a separate
+# table keyed by their SHA-256 digest, so identical pages are stored once.
+# A fresh entry is served without a request, a stale one is revalidated with
+# a conditional GET (a 304 only refreshes its metadata), and the least
+# recently used entries are evicted once the bodies exceed max_bytes.
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import namedtuple
+
+import requests # pip install requests
+
+
+logger = logging.getLogger(__name__)
+
+CacheEntry = namedtuple("CacheEntry", "etag last_modified expires_at content")
+CachedResponse = namedtuple("CachedResponse", "status_code content from_cache")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    url TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT,
+    expires_at REAL NOT NULL,
+    digest TEXT NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_responses_accessed_at ON responses (accessed_at);
+CREATE TABLE IF NOT EXISTS bodies (
+    digest TEXT PRIMARY KEY,
+    data BLOB NOT NULL,
+    size INTEGER NOT NULL
+);
+"""
+
+
+def _expires_at(headers, now):
+    """Return when a response goes stale, or None if it must not be stored."""
+    directives = {}
+    for part in headers.get("Cache-Control", "").lower().split(","):
+        name, _, value = part.strip().partition("=")
+        directives[name] = value.strip('"')
+    if "no-store" in directives:
+        return None
+    if "no-cache" in directives:
+        return now
+    try:
+        return now + int(directives["max-age"])
+    except (KeyError, ValueError):
+        return now  # no lifetime given: revalidate on every use
+
+
+class HttpCache:
+    """
+    Thread-safe SQLite-backed HTTP cache with conditional revalidation.
+
+    Attributes:
+        path (str): SQLite file holding the cache.
+        max_bytes (int): Cap on the total compressed body size.
+        offline (bool): Never touch the network; misses return status 504.
+        hits, revalidated, misses (int): Fresh hits, 304s and downloads.
+
+    Lookups don't write to the file: their access times are kept in memory
+    and written in batches of touch_batch, or before the next eviction, so
+    a hit costs one read.
+    """
+
+    touch_batch = 100
+
+    def __init__(self, path="http_cache.db", max_bytes=100 * 2**20, offline=False):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self._connection = None
+        self._pid = None # a forked worker process opens its own connection
+        self._lock = threading.Lock()
+        self._touched = {} # url: access time not written yet
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+
+    def _db(self):
+        if self._connection is None or self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._connection = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.executescript(SCHEMA)
+        return self._connection
+
+    def lookup(self, url):
+        """
+        Return the cached entry for url, or None.
+
+        Returns:
+            CacheEntry | None: Validators, expiry time and the body.
+        """
+        with self._lock:
+            db = self._db()
+            row = db.execute(
+                "SELECT r.etag, r.last_modified, r.expires_at, b.data FROM responses r "
+                "JOIN bodies b ON b.digest = r.digest WHERE r.url = ?", (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._touched[url] = time.time()
+            if len(self._touched) >= self.touch_batch:
+                with db:
+                    self._write_touched(db)
+        etag, last_modified, expires_at, data = row
+        return CacheEntry(etag, last_modified, expires_at, zlib.decompress(data))
+
+    def usable(self, entry):
+        """True if entry can be served without asking the server."""
+        return entry is not None and (self.offline or entry.expires_at > time.time())
+
+    @staticmethod
+    def conditional_headers(entry):
+        """Return If-None-Match / If-Modified-Since headers for revalidating entry."""
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def store(self, url, headers, content):
+        """Cache a 200 response unless it is marked no-store."""
+        now = time.time()
+        expires_at = _expires_at(headers, now)
+        if expires_at is None:
+            return
+        digest = hashlib.sha256(content).hexdigest()
+        data = zlib.compress(content)
+        with self._lock:
+            db = self._db()
+            with db:
+                self._touched.pop(url, None)
+                self._write_touched(db) # so eviction sees the real access order
+                old = db.execute("SELECT digest FROM responses WHERE url = ?", (url,)).fetchone()
+                db.execute("INSERT OR IGNORE INTO bodies (digest, data, size) VALUES (?, ?, ?)",
+                           (digest, data, len(data)))
+                db.execute(
+                    "INSERT OR REPLACE INTO responses "
+                    "(url, etag, last_modified, expires_at, digest, accessed_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    (url, headers.get("ETag"), headers.get("Last-Modified"), expires_at, digest, now),
+                )
+                if old is not None and old[0] != digest:
+                    self._drop_orphan(db, old[0])
+                self._evict(db)
+
+    def _write_touched(self, db):
+        # call inside a transaction
+        if self._touched:
+            db.executemany("UPDATE responses SET accessed_at = ? WHERE url = ?",
+                           [(accessed_at, url) for url, accessed_at in self._touched.items()])
+            self._touched.clear()
+
+    def _drop_orphan(self, db, digest):
+        # returns the size freed, 0 if another URL still uses the body
+        if db.execute("SELECT 1 FROM responses WHERE digest = ?", (digest,)).fetchone() is not None:
+            return 0
+        size = db.execute("SELECT size FROM bodies WHERE digest = ?", (digest,)).fetchone()[0]
+        db.execute("DELETE FROM bodies WHERE digest = ?", (digest,))
+        return size
+
+    def refresh(self, url, headers):
+        """Apply the headers of a 304 to the cached entry."""
+        now = time.time()
+        expires_at = _expires_at(headers, now)
+        with self._lock:
+            db = self._db()
+            with db:
+                self._touched.pop(url, None)
+                if expires_at is None:
+                    old = db.execute("SELECT digest FROM responses WHERE url = ?", (url,)).fetchone()
+                    db.execute("DELETE FROM responses WHERE url = ?", (url,))
+                    if old is not None:
+                        self._drop_orphan(db, old[0])
+                    return
+                db.execute(
+                    "UPDATE responses SET etag = COALESCE(?, etag), "
+                    "last_modified = COALESCE(?, last_modified), expires_at = ?, accessed_at = ? "
+                    "WHERE url = ?",
+                    (headers.get("ETag"), headers.get("Last-Modified"), expires_at, now, url),
+                )
+
+    def _evict(self, db):
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM bodies").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        oldest = db.execute("SELECT url, digest FROM responses ORDER BY accessed_at").fetchall()
+        for url, digest in oldest:
+            db.execute("DELETE FROM responses WHERE url = ?", (url,))
+            total -= self._drop_orphan(db, digest)
+            if total <= self.max_bytes:
+                break
+        logger.info("HTTP cache trimmed to %d bytes", total)
+
+    def get(self, url, session=None, timeout=10):
+        """
+        GET url through the cache.
+
+        Args:
+            url (str): Page to fetch.
+            session: requests.Session (or the requests module) to use.
+            timeout (float): Request timeout in seconds.
+
+        Returns:
+            CachedResponse: status_code, content (bytes) and from_cache.
+        """
+        entry = self.lookup(url)
+        if self.usable(entry):
+            self.hits += 1
+            return CachedResponse(200, entry.content, True)
+        if self.offline:
+            self.misses += 1
+            return CachedResponse(504, b"", True)
+
+        response = (session or requests).get(url, headers=self.conditional_headers(entry),
+                                             timeout=timeout)
+        if response.status_code == 304 and entry is not None:
+            self.revalidated += 1
+            self.refresh(url, response.headers)
+            return CachedResponse(200, entry.content, True)
+        self.misses += 1
+        if response.status_code == 200:
+            self.store(url, response.headers, response.content)
+        return CachedResponse(response.status_code, response.content, False)
+
+    def stats(self):
+        """Return the usage counters and stored size as a dictionary."""
+        with self._lock:
+            entries, size = self._db().execute(
+                "SELECT (SELECT COUNT(*) FROM responses), (SELECT COALESCE(SUM(size), 0) FROM bodies)"
+            ).fetchone()
+        return {"hits": self.hits, "revalidated": self.revalidated, "misses": self.misses,
+                "entries": entries, "bytes": size}
+
+    def close(self):
+        """Write pending access times and close the SQLite connection."""
+        with self._lock:
+            if self._connection is not None:
+                if self._pid == os.getpid():
+                    with self._connection:
+                        self._write_touched(self._connection)
+                self._connection.close()
+                self._connection = None
+
+
+# HTTP_CACHE_OFFLINE=1 replays an earlier crawl without touching the network
+http_cache = HttpCache(os.environ.get("HTTP_CACHE_PATH", "http_cache.db"),
+                       offline=os.environ.get("HTTP_CACHE_OFFLINE") == "1")
@@ -0,0 +1,97 @@
+
+# HTML parsing for the quotes and books pages, with three interchangeable
+# backends: selectolax (fastest), lxml, and BeautifulSoup's html.parser
+# (pure Python, always there). The functions are plain module-level
+# functions taking bytes, so they can run in a ProcessPoolExecutor.
+from bs4 import BeautifulSoup
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as HTMLParser # pip install selectolax
+except ImportError:
+    try:
+        from selectolax.parser import HTMLParser # selectolax < 0.3.17, no lexbor
+    except ImportError:
+        HTMLParser = None
+
+try:
+    import lxml.html # pip install lxml
+except ImportError:
+    lxml = None
+
+BACKENDS = [name for name, module in (("selectolax", HTMLParser), ("lxml", lxml)) if module is not None]
+BACKENDS.append("html.parser")
+DEFAULT_BACKEND = BACKENDS[0]
+
+
+def _has_class(name):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+def _text(node):
+    return " ".join(node.text_content().split())
+
+
+# ------------------------------
+# Quotes pages
+# ------------------------------
+def parse_quotes(body, backend=DEFAULT_BACKEND):
+    """Return (quotes, next links) for one quotes page."""
+    quotes = []
+    if backend == "selectolax":
+        tree = HTMLParser(body)
+        for q in tree.css("div.quote"):
+            quotes.append({"quote": q.css_first("span.text").text(strip=True),
+                           "author": q.css_first("small.author").text(strip=True),
+                           "tags": [tag.text(strip=True) for tag in q.css("a.tag")]})
+        links = [a.attributes["href"] for a in tree.css("li.next > a")]
+    elif backend == "lxml":
+        tree = lxml.html.fromstring(body)
+        for q in tree.xpath(f"//div[{_has_class('quote')}]"):
+            quotes.append({"quote": _text(q.xpath(f".//span[{_has_class('text')}]")[0]),
+                           "author": _text(q.xpath(f".//small[{_has_class('author')}]")[0]),
+                           "tags": [_text(tag) for tag in q.xpath(f".//a[{_has_class('tag')}]")]})
+        links = tree.xpath(f"//li[{_has_class('next')}]/a/@href")
+    else:
+        soup = BeautifulSoup(body, "html.parser")
+        for q in soup.find_all("div", class_="quote"):
+            quotes.append({"quote": q.find("span", class_="text").get_text(strip=True),
+                           "author": q.find("small", class_="author").get_text(strip=True),
+                           "tags": [tag.get_text(strip=True) for tag in q.find_all("a", class_="tag")]})
+        links = [a["href"] for a in soup.select("li.next > a")]
+    return quotes, links
+
+
+# ------------------------------
+# Books pages
+# ------------------------------
+def parse_books(body, backend=DEFAULT_BACKEND):
+    """Return (books, next links) for one catalogue page."""
+    books = []
+    if backend == "selectolax":
+        tree = HTMLParser(body)
+        for book in tree.css("article.product_pod"):
+            books.append({"title": book.css_first("h3 > a").attributes["title"],
+                          "price": book.css_first("p.price_color").text(strip=True)})
+        links = [a.attributes["href"] for a in tree.css("li.next > a")]
+    elif backend == "lxml":
+        tree = lxml.html.fromstring(body)
+        for book in tree.xpath(f"//article[{_has_class('product_pod')}]"):
+            books.append({"title": book.xpath(".//h3/a/@title")[0],
+                          "price": _text(book.xpath(f".//p[{_has_class('price_color')}]")[0])})
+        links = tree.xpath(f"//li[{_has_class('next')}]/a/@href")
+    else:
+        soup = BeautifulSoup(body, "html.parser")
+        for book in soup.find_all("article", class_="product_pod"):
+            books.append({"title": book.h3.a["title"],
+                          "price": book.find("p", class_="price_color").get_text(strip=True)})
+        links = [a["href"] for a in soup.select("li.next > a")]
+    return books, links
+
+
+# Crawler.parse signature, parse(url, body); use functools.partial to pick a backend
+def parse_quotes_page(url, body, backend=DEFAULT_BACKEND):
+    return parse_quotes(body, backend)
+
+
+def parse_books_page(url, body, backend=DEFAULT_BACKEND):
+    return parse_books(body, backend)
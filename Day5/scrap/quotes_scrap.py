@@ -1,43 +1,54 @@
 
-import requests
+from http_cache import http_cache
 from bs4 import BeautifulSoup # pip install bs4
-import json
+import sys
 
-def scrape_quotes(base_url, pages=5):
-    all_quotes = []
+from sinks import open_sink
 
+def iter_quote_pages(base_url, pages=5):
+    # yields each page's quotes as soon as it is parsed
     for page in range(1, pages + 1):#1 2 3 4 5
         url = f"{base_url}/page/{page}/"
         print(f"Scraping {url} ...")
 
-        response = requests.get(url)
+        response = http_cache.get(url)
         if response.status_code != 200:
             print(f" Failed to fetch {url}")
             continue
 
-        soup = BeautifulSoup(response.text, "html.parser")
+        soup = BeautifulSoup(response.content, "html.parser")
         #
+        page_quotes = []
         quotes = soup.find_all("div", class_="quote")
         for quote in quotes:
             text = quote.find("span", class_="text").get_text(strip=True)
             author = quote.find("small", class_="author").get_text(strip=True)
             tags = [tag.get_text(strip=True) for tag in quote.find_all("a", class_="tag")]
 
-            all_quotes.append({
+            page_quotes.append({
                 "quote": text,
                 "author": author,
                 "tags": tags
             })
+        yield page_quotes
+
 
+def scrape_quotes(base_url, pages=5):
+    all_quotes = []
+    for page_quotes in iter_quote_pages(base_url, pages):
+        all_quotes.extend(page_quotes)
     return all_quotes
 
 
 if __name__ == "__main__":
     base_url = "http://quotes.toscrape.com"
-    all_quotes = scrape_quotes(base_url, pages=3)  # scrape 3 pages
+    output = sys.argv[1] if len(sys.argv) > 1 else "quotes.ndjson" # .ndjson[.gz], .csv, .parquet, .arrow
 
-    # Save results into JSON file
-    with open("quotes.json", "w", encoding="utf-8") as f:
-        json.dump(all_quotes, f, ensure_ascii=False, indent=4)
+    # Write each page as it arrives instead of one json.dump at the end
+    saved = 0
+    with open_sink(output) as sink:
+        for page_quotes in iter_quote_pages(base_url, pages=3):  # scrape 3 pages
+            sink.write(page_quotes)
+            saved += len(page_quotes)
 
-    print(f"Scraping complete! Saved {len(all_quotes)} quotes into quotes.json")
+    print(f"Scraping complete! Saved {saved} quotes into {output}")
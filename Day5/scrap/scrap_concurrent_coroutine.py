@@ -1,92 +1,75 @@
 
 import asyncio
-import aiohttp
-from bs4 import BeautifulSoup
-import json
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import parsers
+from crawl_state import CrawlState
+from crawler import Crawler
+from http_cache import http_cache
+from sinks import open_sink
 
 
 # ------------------------------
 # Scraper for Quotes Site
 # ------------------------------
-async def scrape_quotes_page(session, url):
-    async with session.get(url) as response:
-        if response.status != 200:
-            return []
-        text = await response.text()
-        soup = BeautifulSoup(text, "html.parser")
-        quotes = []
-
-        for q in soup.find_all("div", class_="quote"):
-            text = q.find("span", class_="text").get_text(strip=True)
-            author = q.find("small", class_="author").get_text(strip=True)
-            tags = [tag.get_text(strip=True) for tag in q.find_all("a", class_="tag")]
-            quotes.append({"quote": text, "author": author, "tags": tags})
-
-        print(f" Scraped {len(quotes)} quotes from {url}")
-        return quotes
+def parse_quotes_page(url, body):
+    # runs in a worker process; parsers picks selectolax, lxml or html.parser
+    quotes, links = parsers.parse_quotes(body)
+    print(f" Scraped {len(quotes)} quotes from {url}")
+    return quotes, links
 
 
 # ------------------------------
 # Scraper for Books Site
 # ------------------------------
-async def scrape_books_page(session, url):
-    async with session.get(url) as response:
-        if response.status != 200:
-            return []
-        text = await response.text()
-        soup = BeautifulSoup(text, "html.parser")
-        books = []
-
-        for book in soup.find_all("article", class_="product_pod"):
-            title = book.h3.a["title"]
-            price = book.find("p", class_="price_color").get_text(strip=True)
-            books.append({"title": title, "price": price})
-
-        print(f" Scraped {len(books)} books from {url}")
-        return books
+def parse_books_page(url, body):
+    books, links = parsers.parse_books(body)
+    print(f" Scraped {len(books)} books from {url}")
+    return books, links
 
 
 # ------------------------------
 # Async Multi-page Scraper
 # ------------------------------
-async def scrape_site(base_url, pages, scraper_func):
-    results = []
-    if 'quotes' in base_url:
-        urls = [f"{base_url}/page/{i}/" for i in range(1, pages + 1)]
-    else:
-        urls = [f"{base_url}/page-{i}.html" for i in range(1, pages + 1)]
-
-    async with aiohttp.ClientSession() as session:
-        tasks = [scraper_func(session, url) for url in urls]
-        pages_data = await asyncio.gather(*tasks, return_exceptions=True)
-
-        for data in pages_data:
-            if isinstance(data, list):
-                results.extend(data)
-
-    return results
+async def scrape_site(start_url, parse_page, crawler=None):
+    # bounded workers, shared keep-alive connections, per-host rate limit and
+    # retries all come from the Crawler; pages are found through "next" links.
+    # Pass a Crawler(executor=ProcessPoolExecutor()) to parse off the event loop
+    # and a Crawler(state=CrawlState(...)) to make the crawl resumable.
+    # Items are streamed page by page; only the count is kept here
+    crawler = crawler or Crawler()
+    count = 0
+    async for _, items in crawler.crawl([start_url], parse_page):
+        count += len(items)
+    return count
 
 
 # ------------------------------
 # Main entry
 # ------------------------------
-async def main():
-    final_data = {}
-
-    # Scrape quotes
-    quotes_data = await scrape_site("http://quotes.toscrape.com", 4, scrape_quotes_page)
-    final_data["quotes"] = quotes_data
+async def main(output_format):
+    # Results stream into quotes.<format> / books.<format> page by page
+    # (ndjson, ndjson.gz, csv, parquet or arrow); a run that is stopped
+    # halfway picks up where it left off when started again, and a later
+    # run only adds the quotes and books that are new or changed
+    quotes_state = CrawlState("quotes_state.db", open_sink(f"quotes.{output_format}"), key_fields=("quote", "author"))
+    books_state = CrawlState("books_state.db", open_sink(f"books.{output_format}"), key_fields=("title",))
 
-    # Scrape books
-    books_data = await scrape_site("http://books.toscrape.com/catalogue", 4, scrape_books_page)
-    final_data["books"] = books_data
+    # Download on the event loop (through the HTTP cache), parse in worker processes
+    with ProcessPoolExecutor() as pool:
+        # Scrape quotes
+        crawler = Crawler(executor=pool, cache=http_cache, state=quotes_state)
+        quotes_saved = await scrape_site("http://quotes.toscrape.com/page/1/", parse_quotes_page, crawler)
+        quotes_state.close()
 
-    # Save results
-    with open("scraped_data.json", "w", encoding="utf-8") as f:
-        json.dump(final_data, f, ensure_ascii=False, indent=4)
+        # Scrape books
+        crawler = Crawler(executor=pool, cache=http_cache, state=books_state)
+        books_saved = await scrape_site("http://books.toscrape.com/catalogue/page-1.html", parse_books_page, crawler)
+        books_state.close()
 
-    print(f"\n Done! Saved {len(quotes_data)} quotes and {len(books_data)} books into scraped_data.json")
+    print(f"\n Done! Saved {quotes_saved} new quotes to quotes.{output_format} and {books_saved} new books to books.{output_format}")
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    asyncio.run(main(sys.argv[1] if len(sys.argv) > 1 else "ndjson"))
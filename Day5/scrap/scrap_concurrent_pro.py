@@ -1,100 +1,49 @@
 
-import requests
-from bs4 import BeautifulSoup
-import json
-import multiprocessing
+import asyncio
+import sys
+from concurrent.futures import ProcessPoolExecutor
 
-
-# ------------------------------
-# Scraper for Quotes Site
-# ------------------------------
-def scrape_quotes_page(url, results):
-    try:
-        response = requests.get(url)
-        response.encoding = "utf-8"
-        if response.status_code != 200:
-            return
-
-        soup = BeautifulSoup(response.text, "html.parser")
-        page_results = []
-
-        for q in soup.find_all("div", class_="quote"):
-            text = q.find("span", class_="text").get_text(strip=True)
-            author = q.find("small", class_="author").get_text(strip=True)
-            tags = [tag.get_text(strip=True) for tag in q.find_all("a", class_="tag")]
-            page_results.append({"quote": text, "author": author, "tags": tags})
-
-        results.extend(page_results)
-        print(f" Scraped {len(page_results)} quotes from {url}")
-
-    except Exception as e:
-        print(f" Error scraping {url}: {e}")
-
-
-# ------------------------------
-# Scraper for Books Site
-# ------------------------------
-def scrape_books_page(url, results):
-    try:
-        response = requests.get(url)
-        response.encoding = "utf-8"
-        if response.status_code != 200:
-            return
-
-        soup = BeautifulSoup(response.text, "html.parser")
-        page_results = []
-
-        for book in soup.find_all("article", class_="product_pod"):
-            title = book.h3.a["title"]
-            price = book.find("p", class_="price_color").get_text(strip=True)
-            page_results.append({"title": title, "price": price})
-
-        results.extend(page_results)
-        print(f" Scraped {len(page_results)} books from {url}")
-
-    except Exception as e:
-        print(f" Error scraping {url}: {e}")
+import parsers
+from crawl_state import CrawlState
+from crawler import Crawler
+from http_cache import http_cache
+from sinks import open_sink
 
 
 # ------------------------------
 # Multi-processing Scraper
 # ------------------------------
-def scrape_site(base_url, pages, scraper_func):
-    manager = multiprocessing.Manager()
-    results = manager.list()  # shared list across processes
-    processes = []
-
-    if 'quotes' in base_url:
-        urls = [f"{base_url}/page/{i}/" for i in range(1, pages + 1)]
-    else:
-        urls = [f"{base_url}/page-{i}.html" for i in range(1, pages + 1)]
-
-    # Start a process for each URL
-    for url in urls:
-        p = multiprocessing.Process(target=scraper_func, args=(url, results))
-        processes.append(p)
-        p.start()
-
-    # Wait for all processes
-    for p in processes:
-        p.join()
-
-    return list(results)
+def scrape_site(start_url, parse_page, state, processes=None, max_pages=None):
+    # the Crawler downloads on its event loop (through the HTTP cache, with
+    # per-host rate limits and retries), follows the "next" links until
+    # there are none or max_pages is reached, and checkpoints every page
+    # into the state's sink; the pages are parsed in worker processes, which
+    # send back only each page's records and links
+    async def crawl():
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            crawler = Crawler(executor=pool, cache=http_cache, state=state, max_pages=max_pages)
+            saved = 0
+            async for url, items in crawler.crawl([start_url], parse_page):
+                print(f" Scraped {len(items)} new records from {url}")
+                saved += len(items) # only new or changed
+            return saved
+    return asyncio.run(crawl())
 
 
 if __name__ == "__main__":
-    final_data = {}
+    # Results stream into quotes.<format> / books.<format> page by page
+    # (ndjson, ndjson.gz, csv, parquet or arrow); a run that is stopped
+    # halfway picks up where it left off when started again
+    output_format = sys.argv[1] if len(sys.argv) > 1 else "ndjson"
+    quotes_state = CrawlState("quotes_state.db", open_sink(f"quotes.{output_format}"), key_fields=("quote", "author"))
+    books_state = CrawlState("books_state.db", open_sink(f"books.{output_format}"), key_fields=("title",))
 
-    # Scrape quotes site
-    quotes_data = scrape_site("http://quotes.toscrape.com", 4, scrape_quotes_page)
-    final_data["quotes"] = quotes_data
+    # Scrape quotes site; parsers picks selectolax, lxml or html.parser
+    quotes_saved = scrape_site("http://quotes.toscrape.com/page/1/", parsers.parse_quotes_page, quotes_state)
+    quotes_state.close()
 
     # Scrape books site
-    books_data = scrape_site("http://books.toscrape.com/catalogue", 4, scrape_books_page)
-    final_data["books"] = books_data
-
-    # Save results
-    with open("scraped_data.json", "w", encoding="utf-8") as f:
-        json.dump(final_data, f, ensure_ascii=False, indent=4)
+    books_saved = scrape_site("http://books.toscrape.com/catalogue/page-1.html", parsers.parse_books_page, books_state)
+    books_state.close()
 
-    print(f"\n Done! Saved {len(quotes_data)} quotes and {len(books_data)} books into scraped_data.json")
+    print(f"\n Done! Saved {quotes_saved} new quotes to quotes.{output_format} and {books_saved} new books to books.{output_format}")
@@ -0,0 +1,329 @@
+
+# Output sinks for scraped records. Records are handed over page by page as
+# they are parsed, so nothing has to hold the whole crawl in memory:
+#
+#   with open_sink("quotes.ndjson.gz") as sink:
+#       sink.write(page_records)
+#
+# NdjsonSink   one JSON object per line, gzip-compressed for a .gz path
+# CsvSink      one row per record, lists joined with "|"
+# ParquetSink  a directory of Parquet part files, batch_size records each
+#              (needs pyarrow; read it with pyarrow.parquet.read_table(path))
+# ArrowSink    the same with Arrow IPC part files (needs pyarrow)
+#
+# All of them add to existing output and can be rewound to an earlier
+# position(), which CrawlState uses to drop the records of an unfinished
+# page after a crash. position() makes everything written so far durable:
+# the file sinks fsync, the columnar sinks fsync the rows waiting for the
+# next part to a staging file.
+import csv
+import gzip
+import io
+import json
+import os
+
+try:
+    import pyarrow # pip install pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+class Sink:
+    def write(self, records):
+        raise NotImplementedError
+
+    def flush(self):
+        pass
+
+    def position(self):
+        # how much output is on disk (bytes, or (parts, staged rows) for the
+        # columnar sinks), or None if the sink can't be rewound
+        return None
+
+    def rewind(self, position):
+        raise NotImplementedError(f"{type(self).__name__} can't be rewound")
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class _AppendFileSink(Sink):
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "ab")
+
+    def flush(self):
+        self._file.flush()
+
+    def position(self):
+        # on disk before CrawlState commits it as a checkpoint
+        self.flush()
+        os.fsync(self._file.fileno())
+        return os.fstat(self._file.fileno()).st_size
+
+    def rewind(self, position):
+        self.flush()
+        os.ftruncate(self._file.fileno(), position) # append mode writes go to the new end
+
+    def close(self):
+        self._file.close()
+
+
+class NdjsonSink(_AppendFileSink):
+    def __init__(self, path, compress=None):
+        super().__init__(path)
+        self.compress = path.endswith(".gz") if compress is None else compress
+        self._member = None
+
+    def write(self, records):
+        data = b"".join(json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n" for record in records)
+        if not self.compress:
+            self._file.write(data)
+            return
+        if self._member is None:
+            self._member = gzip.GzipFile(fileobj=self._file, mode="wb")
+        self._member.write(data)
+
+    def flush(self):
+        # every flush ends a complete gzip member, so the file can be cut
+        # there; concatenated members read back as one gzip stream
+        if self._member is not None:
+            self._member.close() # leaves self._file open
+            self._member = None
+        super().flush()
+
+    def close(self):
+        self.flush()
+        super().close()
+
+
+class CsvSink(_AppendFileSink):
+    def __init__(self, path, fields=None):
+        super().__init__(path)
+        self.fields = fields # taken from the first record if not given
+        self._text = io.TextIOWrapper(self._file, encoding="utf-8", newline="", write_through=True)
+        self._writer = None
+        self._needs_header = self.position() == 0
+
+    def _cell(self, value):
+        if isinstance(value, (list, tuple)):
+            return "|".join(str(item) for item in value)
+        if isinstance(value, dict):
+            return json.dumps(value, ensure_ascii=False)
+        return value
+
+    def rewind(self, position):
+        super().rewind(position)
+        self._needs_header = position == 0
+
+    def write(self, records):
+        for record in records:
+            if self._writer is None:
+                self.fields = self.fields or list(record)
+                self._writer = csv.DictWriter(self._text, self.fields, extrasaction="ignore")
+            if self._needs_header:
+                self._writer.writeheader()
+                self._needs_header = False
+            self._writer.writerow({field: self._cell(record.get(field)) for field in self.fields})
+
+    def close(self):
+        self._text.close()
+
+
+def _without_nulls(data_type):
+    if pyarrow.types.is_null(data_type):
+        return pyarrow.string()
+    if pyarrow.types.is_list(data_type):
+        return pyarrow.list_(_without_nulls(data_type.value_type))
+    if pyarrow.types.is_struct(data_type):
+        return pyarrow.struct([field.with_type(_without_nulls(field.type)) for field in data_type])
+    return data_type
+
+
+class _ColumnarSink(Sink):
+    # path is a directory of part files (path/part-00000.parquet, ...), each
+    # batch_size records (the last one of a run may be shorter). The rows of
+    # the next part are buffered in memory and, from position() on, in the
+    # staging file path/part-NNNNN.rows.ndjson, so a checkpoint costs one
+    # append instead of a part. position() is (parts written, rows
+    # buffered): a resumed crawl deletes what came after its checkpoint,
+    # splitting a part if it was written since, and a new run adds parts
+    # instead of overwriting the earlier ones.
+    #
+    # schema (a pyarrow.Schema) fixes the columns; without it each part's
+    # inferred schema is unified with the earlier parts'. A column with
+    # nothing to infer a type from (all None, or empty lists) is written
+    # as strings, which is what scraped values are, so every part reads
+    # back with one schema; declare the schema for anything else.
+    extension = None
+
+    def __init__(self, path, batch_size=10000, schema=None):
+        if pyarrow is None:
+            raise ImportError(f"{type(self).__name__} needs pyarrow (pip install pyarrow)")
+        self.path = path
+        self.batch_size = batch_size
+        self.schema = schema
+        self._declared = schema is not None
+        os.makedirs(path, exist_ok=True)
+        self._parts = 0
+        for name in os.listdir(path):
+            if name.endswith(".tmp"): # a file that was being written at a crash
+                os.remove(os.path.join(path, name))
+            elif name.startswith("part-") and name.endswith(self.extension):
+                self._parts += 1
+                if not self._declared:
+                    self._unify(self._read_schema(os.path.join(path, name)))
+        for name in os.listdir(path):
+            # rows of a part written since they were staged are in the part
+            if name.endswith(".rows.ndjson") and name != os.path.basename(self._staging_name()):
+                os.remove(os.path.join(path, name))
+        self._rows = self._read_staging()
+        self._staged = len(self._rows) # how many of _rows are in the staging file
+        if os.path.exists(self._staging_name()):
+            self._replace_staging(self._rows) # without a torn last line, so appends start clean
+
+    def _part_name(self, index):
+        return os.path.join(self.path, f"part-{index:05d}{self.extension}")
+
+    def _staging_name(self):
+        return os.path.join(self.path, f"part-{self._parts:05d}.rows.ndjson")
+
+    def _write_part(self, table, filename):
+        raise NotImplementedError
+
+    def _read_part(self, filename):
+        raise NotImplementedError
+
+    def _read_schema(self, filename):
+        raise NotImplementedError
+
+    def _unify(self, schema):
+        if self.schema is None:
+            self.schema = schema
+        else:
+            self.schema = pyarrow.unify_schemas([self.schema, schema], promote_options="permissive")
+
+    def _table(self, rows):
+        if not self._declared:
+            inferred = pyarrow.Table.from_pylist(rows).schema
+            self._unify(pyarrow.schema([field.with_type(_without_nulls(field.type)) for field in inferred]))
+        return pyarrow.Table.from_pylist(rows, schema=self.schema)
+
+    def _read_staging(self):
+        try:
+            with open(self._staging_name(), "rb") as reader:
+                # a line cut short by a crash was never part of a checkpoint
+                return [json.loads(line) for line in reader if line.endswith(b"\n")]
+        except FileNotFoundError:
+            return []
+
+    def _replace_staging(self, rows):
+        staging = self._staging_name()
+        with open(staging + ".tmp", "wb") as writer:
+            writer.write(b"".join(json.dumps(row, ensure_ascii=False).encode("utf-8") + b"\n" for row in rows))
+            writer.flush()
+            os.fsync(writer.fileno())
+        os.replace(staging + ".tmp", staging)
+        self._staged = len(rows)
+
+    def write(self, records):
+        self._rows.extend(records)
+        if len(self._rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self._rows:
+            return
+        table = self._table(self._rows)
+        filename = self._part_name(self._parts)
+        self._write_part(table, filename + ".tmp")
+        with open(filename + ".tmp", "rb") as part:
+            os.fsync(part.fileno())
+        os.replace(filename + ".tmp", filename)
+        staging = self._staging_name()
+        self._parts += 1
+        self._rows = []
+        self._staged = 0
+        if os.path.exists(staging):
+            os.remove(staging)
+
+    def position(self):
+        # the rows buffered since the last call go to the staging file
+        if self._staged < len(self._rows):
+            with open(self._staging_name(), "ab") as writer:
+                writer.write(b"".join(json.dumps(row, ensure_ascii=False).encode("utf-8") + b"\n"
+                                      for row in self._rows[self._staged:]))
+                writer.flush()
+                os.fsync(writer.fileno())
+            self._staged = len(self._rows)
+        return (self._parts, len(self._rows))
+
+    def rewind(self, position):
+        parts, rows = position
+        if parts < self._parts:
+            # the part holding the checkpoint's buffered rows was written
+            # since: drop the later parts, then move its first rows back to
+            # the staging file before the part itself goes
+            if os.path.exists(self._staging_name()):
+                os.remove(self._staging_name())
+            for index in range(self._parts - 1, parts, -1):
+                os.remove(self._part_name(index))
+            split = self._part_name(parts)
+            self._rows = self._read_part(split).slice(0, rows).to_pylist() if rows else []
+            self._parts = parts
+            self._replace_staging(self._rows)
+            os.remove(split)
+        elif rows < len(self._rows):
+            self._rows = self._rows[:rows]
+            self._replace_staging(self._rows)
+
+
+class ParquetSink(_ColumnarSink):
+    extension = ".parquet"
+
+    def _write_part(self, table, filename):
+        pyarrow.parquet.write_table(table, filename, compression="zstd")
+
+    def _read_part(self, filename):
+        return pyarrow.parquet.read_table(filename)
+
+    def _read_schema(self, filename):
+        return pyarrow.parquet.read_schema(filename)
+
+
+class ArrowSink(_ColumnarSink):
+    extension = ".arrow"
+
+    def _write_part(self, table, filename):
+        with pyarrow.ipc.new_file(filename, table.schema) as writer:
+            writer.write_table(table)
+
+    def _read_part(self, filename):
+        with pyarrow.ipc.open_file(filename) as reader:
+            return reader.read_all()
+
+    def _read_schema(self, filename):
+        with pyarrow.ipc.open_file(filename) as reader:
+            return reader.schema
+
+
+def open_sink(path, **options):
+    """Pick the sink for path by its extension (.ndjson/.jsonl[.gz], .csv, .parquet, .arrow)."""
+    name = path[:-3] if path.endswith(".gz") else path
+    if name.endswith((".ndjson", ".jsonl")):
+        return NdjsonSink(path, **options)
+    if path.endswith(".csv"):
+        return CsvSink(path, **options)
+    if path.endswith(".parquet"):
+        return ParquetSink(path, **options)
+    if path.endswith((".arrow", ".feather")):
+        return ArrowSink(path, **options)
+    raise ValueError(f"No sink for {path}")
@@ -0,0 +1,55 @@
+import json
+
+from crawl_state import CrawlState
+from sinks import NdjsonSink
+
+
+def quote(text, author="Author"):
+    return {"quote": text, "author": author}
+
+def read_quotes(path):
+    with open(path, encoding="utf-8") as reader:
+        return [json.loads(line)["quote"] for line in reader]
+
+def test_resume_picks_up_unfinished_pages(tmp_path):
+    state = CrawlState(str(tmp_path / "state.db"))
+    assert state.start(["/page/1/"]) == ["/page/1/"]
+    state.checkpoint("/page/1/", ["/page/2/", "/page/3/"], [quote("Q1")])
+    state.failed("/page/2/")
+    state.close()
+
+    state = CrawlState(str(tmp_path / "state.db"))
+    assert sorted(state.start(["/page/1/"])) == ["/page/2/", "/page/3/"]
+    assert state.done_urls() == {"/page/1/"}
+    assert state.stats() == {"done": 1, "pending": 2, "records": 1}
+    state.close()
+
+def test_finished_crawl_starts_a_new_pass(tmp_path):
+    state = CrawlState(str(tmp_path / "state.db"))
+    state.start(["/page/1/"])
+    state.checkpoint("/page/1/", [], [quote("Q1")])
+    assert state.start(["/page/1/"]) == ["/page/1/"]
+    assert state.done_urls() == set()
+    state.close()
+
+def test_checkpoint_returns_only_new_or_changed_records(tmp_path):
+    state = CrawlState(str(tmp_path / "state.db"), key_fields=("quote",))
+    state.start(["/page/1/"])
+    assert state.checkpoint("/page/1/", [], [quote("Q1"), quote("Q2")]) == [quote("Q1"), quote("Q2")]
+    assert state.checkpoint("/page/1/", [], [quote("Q1"), quote("Q2", "Other")]) == [quote("Q2", "Other")]
+    assert state.stats()["records"] == 2
+    state.close()
+
+def test_resume_drops_output_written_after_the_last_checkpoint(tmp_path):
+    output = str(tmp_path / "quotes.ndjson")
+    state = CrawlState(str(tmp_path / "state.db"), NdjsonSink(output))
+    state.start(["/page/1/"])
+    state.checkpoint("/page/1/", ["/page/2/"], [quote("Q1")])
+    state.sink.write([quote("Q2")]) # page 2 was being written when the crawl died
+    state.close()
+
+    state = CrawlState(str(tmp_path / "state.db"), NdjsonSink(output))
+    assert state.start(["/page/1/"]) == ["/page/2/"]
+    state.checkpoint("/page/2/", [], [quote("Q2")])
+    state.close()
+    assert read_quotes(output) == ["Q1", "Q2"]
@@ -0,0 +1,85 @@
+import asyncio
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+import fixture_server
+from crawl_state import CrawlState
+from crawler import Crawler
+
+
+def parse_page(url, body):
+    # the fixture's pages in a few lines, so these tests don't depend on a parser library
+    text = body.decode("utf-8")
+    items = [{"quote": part.split("<", 1)[0]} for part in text.split('<span class="text">')[1:]]
+    links = [text.split('<li class="next"><a href="', 1)[1].split('"', 1)[0]] if 'class="next"' in text else []
+    return items, links
+
+def crawl(app, start_paths, **options):
+    async def run():
+        async with TestServer(app) as server:
+            crawler = Crawler(rate_per_host=None, backoff=0.001, **options)
+            items = await crawler.run([str(server.make_url(path)) for path in start_paths], parse_page)
+            return crawler, items
+    return asyncio.run(run())
+
+def test_follows_next_links_once_each():
+    crawler, items = crawl(fixture_server.make_app(pages=5), ["/page/1/", "/page/3/"], concurrency=4)
+    assert crawler.stats["pages"] == 5
+    assert len(items) == 5 * fixture_server.QUOTES_PER_PAGE
+    assert len({item["quote"] for item in items}) == len(items)
+
+def flaky_app(failures):
+    # answers 503 to the first 'failures' requests for each page
+    attempts = {}
+
+    async def page(request):
+        attempts[request.path] = attempts.get(request.path, 0) + 1
+        if attempts[request.path] <= failures:
+            raise web.HTTPServiceUnavailable()
+        return web.Response(text=fixture_server.quotes_html(1, 1), content_type="text/html")
+
+    app = web.Application()
+    app.router.add_get("/{name}", page)
+    return app
+
+def test_retries_then_gives_up():
+    crawler, items = crawl(flaky_app(failures=2), ["/a", "/b"], retries=2)
+    assert crawler.stats["retries"] == 4 and crawler.stats["failed"] == 0
+    assert len(items) == 2 * fixture_server.QUOTES_PER_PAGE
+
+    crawler, items = crawl(flaky_app(failures=3), ["/a"], retries=2)
+    assert crawler.stats["failed"] == 1 and items == []
+
+def test_resumed_crawl_skips_done_pages_and_repeats_no_items(tmp_path):
+    state = CrawlState(str(tmp_path / "state.db"))
+
+    async def run():
+        async with TestServer(fixture_server.make_app(pages=4)) as server:
+            start_urls = [str(server.make_url("/page/1/"))]
+            # max_pages stands in for an interrupted crawl: pages 1 and 2 are
+            # done, the link to page 3 is left pending
+            first = Crawler(rate_per_host=None, max_pages=2, state=state)
+            first_items = await first.run(start_urls, parse_page)
+            second = Crawler(rate_per_host=None, state=state)
+            return first_items, second, await second.run(start_urls, parse_page)
+    first_items, crawler, items = asyncio.run(run())
+    state.close()
+    assert len(first_items) == 2 * fixture_server.QUOTES_PER_PAGE
+    assert crawler.stats["pages"] == 2 # pages 3 and 4
+    assert {item["quote"].split("-")[0] for item in items} == {"Quote 3", "Quote 4"}
+
+def test_max_pages_counts_only_this_run(tmp_path):
+    state = CrawlState(str(tmp_path / "state.db"))
+
+    async def run():
+        async with TestServer(fixture_server.make_app(pages=6)) as server:
+            start_urls = [str(server.make_url("/page/1/"))]
+            await Crawler(rate_per_host=None, max_pages=2, state=state).run(start_urls, parse_page)
+            # two pages are done already, this run still gets two of its own
+            second = Crawler(rate_per_host=None, max_pages=2, state=state)
+            return second, await second.run(start_urls, parse_page)
+    crawler, items = asyncio.run(run())
+    state.close()
+    assert crawler.stats["pages"] == 2
+    assert {item["quote"].split("-")[0] for item in items} == {"Quote 3", "Quote 4"}
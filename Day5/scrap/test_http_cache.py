@@ -0,0 +1,110 @@
+import sqlite3
+import zlib
+from types import SimpleNamespace
+
+from http_cache import HttpCache
+
+
+class FakeSession:
+    """Serves fixed pages and answers conditional GETs like a real server."""
+
+    def __init__(self, pages, cache_control="max-age=0"):
+        self.pages = pages
+        self.cache_control = cache_control
+        self.requests = []
+
+    def get(self, url, headers=None, timeout=None):
+        self.requests.append((url, dict(headers or {})))
+        body = self.pages[url]
+        etag = f'"{len(body)}-{hash(body)}"'
+        response_headers = {"ETag": etag, "Cache-Control": self.cache_control}
+        if (headers or {}).get("If-None-Match") == etag:
+            return SimpleNamespace(status_code=304, headers=response_headers, content=b"")
+        return SimpleNamespace(status_code=200, headers=response_headers, content=body)
+
+
+def test_fresh_response_served_without_request(tmp_path):
+    cache = HttpCache(str(tmp_path / "cache.db"))
+    session = FakeSession({"http://x/1": b"<html>one</html>"}, cache_control="max-age=3600")
+
+    assert cache.get("http://x/1", session).content == b"<html>one</html>"
+    response = cache.get("http://x/1", session)
+
+    assert response.from_cache
+    assert len(session.requests) == 1
+    assert cache.stats()["hits"] == 1
+
+def test_stale_response_revalidated_with_etag(tmp_path):
+    cache = HttpCache(str(tmp_path / "cache.db"))
+    session = FakeSession({"http://x/1": b"<html>one</html>"})
+
+    cache.get("http://x/1", session)
+    response = cache.get("http://x/1", session)
+
+    assert response.status_code == 200
+    assert response.content == b"<html>one</html>"
+    assert "If-None-Match" in session.requests[1][1]
+    assert cache.stats()["revalidated"] == 1
+
+def test_changed_page_replaces_body(tmp_path):
+    cache = HttpCache(str(tmp_path / "cache.db"))
+    session = FakeSession({"http://x/1": b"old"})
+    cache.get("http://x/1", session)
+
+    session.pages["http://x/1"] = b"new"
+    assert cache.get("http://x/1", session).content == b"new"
+    assert cache.stats()["entries"] == 1
+    assert cache.stats()["bytes"] == len(zlib.compress(b"new"))
+
+def test_no_store_is_not_cached(tmp_path):
+    cache = HttpCache(str(tmp_path / "cache.db"))
+    session = FakeSession({"http://x/1": b"secret"}, cache_control="no-store")
+
+    cache.get("http://x/1", session)
+    assert cache.stats()["entries"] == 0
+
+def test_lru_size_cap_evicts_oldest(tmp_path):
+    pages = {f"http://x/{i}": bytes(range(256)) * 4 + bytes([i]) for i in range(3)}
+    cache = HttpCache(str(tmp_path / "cache.db"), max_bytes=700)
+    session = FakeSession(pages)
+
+    cache.get("http://x/0", session)
+    cache.get("http://x/1", session)
+    cache.lookup("http://x/0")  # 0 is now more recently used than 1
+    cache.get("http://x/2", session)
+
+    assert cache.lookup("http://x/1") is None
+    assert cache.lookup("http://x/0") is not None
+    assert cache.stats()["bytes"] <= 700
+
+def test_offline_replays_cache(tmp_path):
+    path = str(tmp_path / "cache.db")
+    HttpCache(path).get("http://x/1", FakeSession({"http://x/1": b"page"}))
+
+    offline = HttpCache(path, offline=True)
+    assert offline.get("http://x/1").content == b"page"
+    assert offline.get("http://x/2").status_code == 504
+
+def test_lookup_access_times_written_in_batches(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = HttpCache(path)
+    cache.get("http://x/1", FakeSession({"http://x/1": b"page"}))
+
+    def accessed_at():
+        with sqlite3.connect(path) as connection:
+            return connection.execute("SELECT accessed_at FROM responses").fetchone()[0]
+
+    stored_at = accessed_at()
+    cache.lookup("http://x/1")
+    assert accessed_at() == stored_at
+    cache.close()
+    assert accessed_at() > stored_at
+
+def test_forked_process_opens_own_connection(tmp_path):
+    cache = HttpCache(str(tmp_path / "cache.db"))
+    cache.stats()
+    parent_connection = cache._connection
+
+    cache._pid = -1  # what a forked child sees
+    cache.stats()
+    assert cache._connection is not parent_connection
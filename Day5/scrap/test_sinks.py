@@ -0,0 +1,154 @@
+import csv
+import gzip
+import json
+import os
+
+import pytest
+
+from crawl_state import CrawlState
+from sinks import CsvSink, NdjsonSink, Sink, open_sink
+
+
+def quotes(*numbers):
+    return [{"quote": f"Quote {n}", "author": "Author", "tags": ["a", "b"]} for n in numbers]
+
+def read_ndjson(path):
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as reader:
+        return [json.loads(line)["quote"] for line in reader]
+
+@pytest.mark.parametrize("name", ["quotes.ndjson", "quotes.ndjson.gz"])
+def test_ndjson_rewind_drops_unfinished_page(tmp_path, name):
+    path = str(tmp_path / name)
+    with NdjsonSink(path) as sink:
+        sink.write(quotes(1, 2))
+        checkpoint = sink.position()
+        sink.write(quotes(3)) # the page a crash interrupted
+        sink.flush()
+
+    with NdjsonSink(path) as sink:
+        sink.rewind(checkpoint)
+        sink.write(quotes(4))
+
+    assert read_ndjson(path) == ["Quote 1", "Quote 2", "Quote 4"]
+
+def test_csv_header_written_once_across_runs(tmp_path):
+    path = str(tmp_path / "quotes.csv")
+    with CsvSink(path) as sink:
+        sink.write(quotes(1))
+    with CsvSink(path) as sink:
+        sink.write(quotes(2))
+
+    with open(path, newline="", encoding="utf-8") as reader:
+        rows = list(csv.DictReader(reader))
+    assert [row["quote"] for row in rows] == ["Quote 1", "Quote 2"]
+    assert rows[0]["tags"] == "a|b"
+
+def test_csv_rewind_to_start_writes_header_again(tmp_path):
+    path = str(tmp_path / "quotes.csv")
+    with CsvSink(path) as sink:
+        sink.write(quotes(1))
+    with CsvSink(path) as sink:
+        sink.rewind(0)
+        sink.write(quotes(2))
+
+    with open(path, newline="", encoding="utf-8") as reader:
+        assert [row["quote"] for row in csv.DictReader(reader)] == ["Quote 2"]
+
+COLUMNAR = ["quotes.parquet", "quotes.arrow"]
+
+def read_columnar(path):
+    import pyarrow.dataset
+    dataset = pyarrow.dataset.dataset(path, format="parquet" if path.endswith(".parquet") else "arrow")
+    return dataset.to_table()
+
+def part_files(path):
+    return sorted(name for name in os.listdir(path) if not name.endswith(".rows.ndjson"))
+
+@pytest.mark.parametrize("name", COLUMNAR)
+def test_columnar_checkpoints_keep_batch_size(tmp_path, name):
+    pytest.importorskip("pyarrow")
+    path = str(tmp_path / name)
+    with open_sink(path, batch_size=4) as sink:
+        positions = []
+        for n in range(1, 7):
+            sink.write(quotes(n))
+            positions.append(sink.position()) # no part of its own
+        assert positions == [(0, 1), (0, 2), (0, 3), (1, 0), (1, 1), (1, 2)]
+        assert len(part_files(path)) == 1
+    assert [len(read_columnar(os.path.join(path, part))) for part in part_files(path)] == [4, 2]
+
+@pytest.mark.parametrize("name", COLUMNAR)
+def test_columnar_staged_rows_survive_a_crash(tmp_path, name):
+    pytest.importorskip("pyarrow")
+    path = str(tmp_path / name)
+    sink = open_sink(path)
+    sink.write(quotes(1, 2))
+    checkpoint = sink.position()
+    sink.write(quotes(3)) # not checkpointed; the process dies without close()
+    with open(os.path.join(path, "part-00000.rows.ndjson"), "ab") as staging:
+        staging.write(b'{"quote": "Quo') # torn by the crash
+
+    with open_sink(path) as sink:
+        assert sink.position() == checkpoint
+        sink.write(quotes(4))
+        sink.position()
+    assert read_columnar(path).column("quote").to_pylist() == ["Quote 1", "Quote 2", "Quote 4"]
+
+@pytest.mark.parametrize("name", COLUMNAR)
+def test_columnar_rewind_splits_a_part_and_appends(tmp_path, name):
+    pytest.importorskip("pyarrow")
+    path = str(tmp_path / name)
+    with open_sink(path, batch_size=3) as sink:
+        sink.write(quotes(1, 2))
+        checkpoint = sink.position()
+        sink.write(quotes(3, 4, 5, 6)) # a part and more, after the checkpoint
+    assert checkpoint == (0, 2)
+
+    with open_sink(path, batch_size=3) as sink:
+        sink.rewind(checkpoint)
+        assert sink.position() == checkpoint
+        sink.write(quotes(7))
+    assert sorted(read_columnar(path).column("quote").to_pylist()) == ["Quote 1", "Quote 2", "Quote 7"]
+
+@pytest.mark.parametrize("name", COLUMNAR)
+def test_columnar_schema_unified_across_parts_and_runs(tmp_path, name):
+    pyarrow = pytest.importorskip("pyarrow")
+    path = str(tmp_path / name)
+    with open_sink(path, batch_size=1) as sink:
+        sink.write([{"quote": "Quote 1", "author": None, "tags": []}]) # nothing to infer a type from
+        sink.write([{"quote": "Quote 2", "author": "Author", "tags": ["a"]}])
+    with open_sink(path, batch_size=1) as sink:
+        assert sink.schema.field("tags").type == pyarrow.list_(pyarrow.string())
+        sink.write([{"quote": "Quote 3", "author": None, "tags": [], "year": 1999}])
+        assert sink.schema.field("year").type == pyarrow.int64()
+    table = read_columnar(path)
+    assert table.schema.field("tags").type == pyarrow.list_(pyarrow.string())
+    assert table.column("author").to_pylist() == [None, "Author", None]
+
+def test_columnar_declared_schema(tmp_path):
+    pyarrow = pytest.importorskip("pyarrow")
+    schema = pyarrow.schema([("quote", pyarrow.string()), ("tags", pyarrow.list_(pyarrow.string()))])
+    path = str(tmp_path / "quotes.parquet")
+    with open_sink(path, schema=schema) as sink:
+        sink.write([{"quote": "Quote 1", "tags": [], "author": "dropped"}])
+    assert read_columnar(path).schema == schema
+
+def test_crawl_state_resumes_into_columnar_sink(tmp_path):
+    pytest.importorskip("pyarrow")
+    path = str(tmp_path / "quotes.parquet")
+    state = CrawlState(str(tmp_path / "state.db"), open_sink(path), key_fields=("quote",))
+    state.start(["/page/1/"])
+    state.checkpoint("/page/1/", ["/page/2/"], quotes(1, 2))
+    state.sink.write(quotes(3)) # page 2 was being written when the crawl died
+    state.close() # writes all three rows as a part
+
+    state = CrawlState(str(tmp_path / "state.db"), open_sink(path), key_fields=("quote",))
+    assert state.start(["/page/1/"]) == ["/page/2/"]
+    state.checkpoint("/page/2/", [], quotes(3, 4))
+    state.close()
+    assert read_columnar(path).column("quote").to_pylist() == ["Quote 1", "Quote 2", "Quote 3", "Quote 4"]
+
+def test_crawl_state_refuses_sink_that_cannot_rewind(tmp_path):
+    with pytest.raises(ValueError):
+        CrawlState(str(tmp_path / "state.db"), Sink())
@@ -1,51 +1,261 @@
 
-from concurrent.futures import ThreadPoolExecutor
 import asyncio
+import json
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from sqlalchemy import create_engine, func, select
+
+from app.models import Patient
+
+
+def _ages(patients):
+    """Helper to collect patient ages into a NumPy array"""
+    return np.fromiter((p['age'] for p in patients), dtype=np.float64, count=len(patients))
+
 
 def _average_age(patients):
     """Helper to compute average age of a list of patients"""
     if not patients:
         return 0
-    return sum(p['age'] for p in patients) / len(patients)
+    return float(_ages(patients).mean())
+
 
 def calculate_average_age_threaded(patients, batch_size=10):
     """
-    Calculate average patient age in batches using ThreadPoolExecutor.
-    
+    Calculate the true mean patient age.
+
+    The ages are averaged in one vectorized pass; splitting CPU-bound work
+    across threads only adds overhead under the GIL. For patients stored in
+    the database use ``app.stats``, which reads the column straight from SQL.
+
     :param patients: list of dicts with 'age' key
-    :param batch_size: number of patients per batch
-    :return: list of batch averages
+    :param batch_size: kept for backwards compatibility, ignored
+    :return: mean age, 0 for an empty list
     """
-    batch_averages = []
+    return _average_age(patients)
 
-    # Split patients into batches
-    batches = [patients[i:i+batch_size] for i in range(0, len(patients), batch_size)]
 
-    with ThreadPoolExecutor() as executor:
-        results = executor.map(_average_age, batches)
-        batch_averages.extend(results)
+# ----------- Async version -----------
+async def calculate_average_age_async(patients, batch_size=10):
+    """
+    Calculate the true mean patient age from a coroutine.
 
-    return batch_averages
+    The computation is CPU-bound, so it runs once instead of being spread
+    over ``asyncio.gather`` tasks that would execute serially anyway.
 
+    :param patients: list of dicts with 'age' key
+    :param batch_size: kept for backwards compatibility, ignored
+    :return: mean age, 0 for an empty list
+    """
+    await asyncio.sleep(0)  # yield to the event loop once
+    return _average_age(patients)
 
-# ----------- Async version -----------
-async def _async_average_age(batch):
-    await asyncio.sleep(0)  # simulate async operation
-    return _average_age(batch)
 
-async def calculate_average_age_async(patients, batch_size=10):
+# ----------- Streaming, process-pool version -----------
+class PartialAggregate:
     """
-    Calculate average patient age in batches using asyncio coroutines.
-    
-    :param patients: list of dicts with 'age' key
-    :param batch_size: number of patients per batch
-    :return: list of batch averages
+    Mergeable partial statistics for one chunk of values.
+
+    Holds count, sum, sum of squared deviations (M2), min and max. Partials
+    from different chunks or processes are combined with merge() into the
+    exact global result, so no worker ever needs the full data set.
     """
-    batch_averages = []
 
-    batches = [patients[i:i+batch_size] for i in range(0, len(patients), batch_size)]
-    tasks = [_async_average_age(batch) for batch in batches]
-    results = await asyncio.gather(*tasks)
-    batch_averages.extend(results)
+    __slots__ = ("count", "total", "m2", "minimum", "maximum")
+
+    def __init__(self, count=0, total=0.0, m2=0.0, minimum=math.inf, maximum=-math.inf):
+        self.count = count
+        self.total = total
+        self.m2 = m2
+        self.minimum = minimum
+        self.maximum = maximum
+
+    @classmethod
+    def from_array(cls, values):
+        """Build a partial aggregate from a NumPy array of values"""
+        if values.size == 0:
+            return cls()
+        mean = values.mean()
+        return cls(
+            count=int(values.size),
+            total=float(values.sum()),
+            m2=float(((values - mean) ** 2).sum()),
+            minimum=float(values.min()),
+            maximum=float(values.max()),
+        )
+
+    def merge(self, other):
+        """Fold another partial aggregate into this one and return self"""
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            self.count, self.total, self.m2 = other.count, other.total, other.m2
+            self.minimum, self.maximum = other.minimum, other.maximum
+            return self
+        count = self.count + other.count
+        delta = other.total / other.count - self.total / self.count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.total += other.total
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+        return self
+
+    def result(self):
+        """Return count, mean, std, min and max as a dictionary"""
+        if self.count == 0:
+            return {"count": 0, "mean": None, "std": None, "min": None, "max": None}
+        return {
+            "count": self.count,
+            "mean": self.total / self.count,
+            "std": math.sqrt(self.m2 / self.count),
+            "min": self.minimum,
+            "max": self.maximum,
+        }
+
+
+def _aggregate_chunks(chunks):
+    """Merge the partial aggregates of an iterable of NumPy arrays"""
+    partial = PartialAggregate()
+    for values in chunks:
+        partial.merge(PartialAggregate.from_array(values))
+    return partial
+
+
+def _ndjson_ranges(path, parts):
+    """Split a file into about ``parts`` byte ranges that end on line breaks"""
+    size = os.path.getsize(path)
+    step = max(1, size // parts)
+    ranges = []
+    with open(path, 'rb') as reader:
+        start = 0
+        while start < size:
+            reader.seek(min(start + step, size))
+            reader.readline()
+            end = min(reader.tell(), size)
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def _iter_ndjson_chunks(path, start, end, field, chunk_size):
+    """Yield arrays of ``field`` values from the lines in [start, end)"""
+    with open(path, 'rb') as reader:
+        reader.seek(start)
+        chunk = []
+        while reader.tell() < end:
+            line = reader.readline()
+            if not line:
+                break
+            if line.strip():
+                chunk.append(json.loads(line)[field])
+            if len(chunk) >= chunk_size:
+                yield np.asarray(chunk, dtype=np.float64)
+                chunk = []
+        if chunk:
+            yield np.asarray(chunk, dtype=np.float64)
+
 
-    return batch_averages
+def _aggregate_ndjson_range(path, start, end, field, chunk_size):
+    return _aggregate_chunks(_iter_ndjson_chunks(path, start, end, field, chunk_size))
+
+
+_engines = {}
+
+
+def _engine(db_url):
+    """Return a per-process engine for db_url"""
+    if db_url not in _engines:
+        _engines[db_url] = create_engine(db_url)
+    return _engines[db_url]
+
+
+def _reset_engines():
+    """
+    Process pool initializer: drop engines inherited from the parent.
+
+    A forked worker gets copies of the parent's pooled connections; they
+    are abandoned with dispose(close=False) without closing the parent's
+    sockets, and the worker opens fresh connections of its own.
+    """
+    for engine in _engines.values():
+        engine.dispose(close=False)
+    _engines.clear()
+
+
+def _iter_db_chunks(db_url, column, low, high, chunk_size):
+    """Yield arrays of ``column`` values for patient IDs in [low, high)"""
+    table = Patient.__table__
+    stmt = select(table.c[column]).where(table.c.id >= low, table.c.id < high)
+    with _engine(db_url).connect() as connection:
+        result = connection.execution_options(stream_results=True, yield_per=chunk_size).execute(stmt)
+        for rows in result.partitions():
+            yield np.fromiter((row[0] for row in rows), dtype=np.float64, count=len(rows))
+
+
+def _aggregate_db_range(db_url, column, low, high, chunk_size):
+    return _aggregate_chunks(_iter_db_chunks(db_url, column, low, high, chunk_size))
+
+
+def _run_partials(func, tasks, workers, initializer=None):
+    """Run func over tasks, in a process pool when workers > 1, and merge"""
+    total = PartialAggregate()
+    if workers == 1:
+        for task in tasks:
+            total.merge(func(*task))
+        return total
+    with ProcessPoolExecutor(max_workers=workers, initializer=initializer) as executor:
+        for partial in executor.map(func, *zip(*tasks)):
+            total.merge(partial)
+    return total
+
+
+def aggregate_ndjson(path, field='age', workers=None, chunk_size=100_000):
+    """
+    Compute exact statistics over a numeric field of an NDJSON patient file.
+
+    The file is split into byte ranges; each worker process parses its own
+    range in fixed-size chunks, so memory stays bounded and parsing scales
+    with the number of cores.
+
+    :param path: NDJSON file with one patient object per line
+    :param field: numeric key to aggregate
+    :param workers: number of processes, defaults to the CPU count
+    :param chunk_size: values held in memory at a time per worker
+    :return: dict with count, mean, std, min and max
+    """
+    workers = workers or os.cpu_count() or 1
+    tasks = [(path, start, end, field, chunk_size)
+             for start, end in _ndjson_ranges(path, workers * 4)]
+    return _run_partials(_aggregate_ndjson_range, tasks, workers).result()
+
+
+def aggregate_database(db_url, column='age', workers=None, chunk_size=100_000):
+    """
+    Compute exact statistics over a numeric patient column in the database.
+
+    The ID range is split into spans; each worker process opens its own
+    connection and streams its span in fixed-size chunks.
+
+    :param db_url: SQLAlchemy database URL
+    :param column: numeric column of the patients table
+    :param workers: number of processes, defaults to the CPU count
+    :param chunk_size: rows fetched per round trip
+    :return: dict with count, mean, std, min and max
+    """
+    table = Patient.__table__
+    if column not in table.c:
+        raise ValueError(f"Unknown column '{column}'")
+    workers = workers or os.cpu_count() or 1
+    with _engine(db_url).connect() as connection:
+        low, high = connection.execute(select(func.min(table.c.id), func.max(table.c.id))).one()
+    if low is None:
+        return PartialAggregate().result()
+    parts = workers * 4
+    step = max(1, (high - low + 1 + parts - 1) // parts)
+    tasks = [(db_url, column, start, start + step, chunk_size)
+             for start in range(low, high + 1, step)]
+    return _run_partials(_aggregate_db_range, tasks, workers, _reset_engines).result()
@@ -0,0 +1,206 @@
+"""
+cache.py
+
+Read-through cache of serialized patient records for the Hospital
+Management System. The default backend is a bounded in-process LRU with a
+per-entry TTL; a Redis-protocol backend can be selected through config so
+several worker processes share one cache.
+
+A reader that misses takes generation() before it queries the database
+and passes it to set(); every delete() moves the generation on, so a row
+read before a concurrent write committed is not stored over the
+invalidation.
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from app.config import config
+from app.logger import logger
+
+
+class LRUCache:
+    """
+    Thread-safe in-process LRU cache with a time-to-live per entry.
+
+    Attributes:
+        max_entries (int): Maximum number of entries kept before the least
+            recently used one is evicted.
+        ttl (float): Seconds an entry stays valid after it is stored.
+        hits, misses, evictions, expirations (int): Usage counters.
+    """
+
+    def __init__(self, max_entries=10000, ttl=60.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._generation = 0
+
+    def generation(self):
+        """Return the invalidation counter to pass to set()."""
+        with self._lock:
+            return self._generation
+
+    def get(self, key):
+        """Return a copy of the cached value, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(value)
+
+    def set(self, key, value, generation=None):
+        """
+        Store a copy of value, evicting the least recently used entry if full.
+
+        If generation is given and an entry was deleted since it was taken,
+        value may be stale and is not stored.
+        """
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, dict(value))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        """Drop key from the cache if present."""
+        with self._lock:
+            self._entries.pop(key, None)
+            self._generation += 1
+
+    def clear(self):
+        """Drop every entry and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+            self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def stats(self):
+        """Return the cache counters as a dictionary."""
+        with self._lock:
+            return {
+                "backend": "memory",
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+class RedisCache:
+    """
+    Cache backed by a Redis-protocol server shared between processes.
+
+    Values are stored as JSON with the configured TTL; size-based eviction
+    is left to the server's maxmemory policy, so only hits and misses are
+    counted here. The generation counter is a server key, shared by every
+    process. Requires the optional ``redis`` package.
+    """
+
+    def __init__(self, url, ttl=60.0, prefix="hms:patient:"):
+        import redis  # optional dependency, only needed for this backend
+
+        self._client = redis.Redis.from_url(url)
+        self._watch_error = redis.WatchError
+        self.ttl = ttl
+        self.prefix = prefix
+        self._generation_key = prefix + "generation"
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def generation(self):
+        """Return the invalidation counter to pass to set()."""
+        return int(self._client.get(self._generation_key) or 0)
+
+    def get(self, key):
+        """Return the cached value, or None on a miss."""
+        raw = self._client.get(self.prefix + str(key))
+        with self._lock:
+            if raw is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(raw)
+
+    def set(self, key, value, generation=None):
+        """
+        Store value with the configured TTL.
+
+        If generation is given and an entry was deleted since it was taken,
+        value may be stale and is not stored.
+        """
+        name, data, ttl = self.prefix + str(key), json.dumps(value), max(1, int(self.ttl))
+        if generation is None:
+            self._client.set(name, data, ex=ttl)
+            return
+        with self._client.pipeline() as pipe:
+            try:
+                pipe.watch(self._generation_key)
+                if int(pipe.get(self._generation_key) or 0) != generation:
+                    return
+                pipe.multi()
+                pipe.set(name, data, ex=ttl)
+                pipe.execute()
+            except self._watch_error:
+                pass  # a delete ran in between
+
+    def delete(self, key):
+        """Drop key from the cache if present."""
+        with self._client.pipeline() as pipe:
+            pipe.delete(self.prefix + str(key))
+            pipe.incr(self._generation_key)
+            pipe.execute()
+
+    def clear(self):
+        """Drop every patient entry and reset the counters."""
+        keys = [key for key in self._client.scan_iter(match=self.prefix + "*")
+                if key != self._generation_key.encode()]
+        if keys:
+            self._client.delete(*keys)
+        self._client.incr(self._generation_key)
+        with self._lock:
+            self.hits = self.misses = 0
+
+    def stats(self):
+        """Return the cache counters as a dictionary."""
+        with self._lock:
+            return {
+                "backend": "redis",
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+def build_cache():
+    """Create the patient cache selected by config['CACHE_BACKEND']."""
+    if config["CACHE_BACKEND"] == "redis":
+        try:
+            return RedisCache(config["CACHE_REDIS_URL"], ttl=config["CACHE_TTL_SECONDS"])
+        except ImportError:
+            logger.error("redis package not installed, falling back to in-memory cache")
+    return LRUCache(config["CACHE_MAX_ENTRIES"], config["CACHE_TTL_SECONDS"])
+
+
+patient_cache = build_cache()
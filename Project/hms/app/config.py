@@ -1,3 +1,106 @@
+"""
+config.py - Application settings for the Hospital Management System.
+
+The defaults below can be overridden, in order, by a JSON file named in
+the HMS_CONFIG_FILE environment variable and by HMS_<KEY> environment
+variables (e.g. HMS_DB_URL, HMS_SQLALCHEMY_ECHO=true). Dictionary
+settings are merged key by key; environment values are parsed as JSON
+when they are not plain strings.
+"""
+
+import json
+import os
+
 config = {
-    'DB_URL': 'sqlite:///hospital_app_db.db'
-}
\ No newline at end of file
+    'DB_URL': 'sqlite:///hospital_app_db.db',
+    'SQLALCHEMY_ECHO': False,
+    'SQLALCHEMY_ENGINE_OPTIONS': {
+        'pool_size': 5,
+        'max_overflow': 10,
+        'pool_pre_ping': True,
+        'pool_recycle': 1800,
+    },
+    'SQLITE_PRAGMAS': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'mmap_size': 268435456,
+        'busy_timeout': 5000,
+    },
+    'PAGE_SIZE_DEFAULT': 100,
+    'PAGE_SIZE_MAX': 1000,
+    'STREAM_BATCH_SIZE': 1000,
+    'BULK_CHUNK_SIZE': 1000,
+    'SMTP_HOST': 'smtp.gmail.com',
+    'SMTP_PORT': 587,
+    'SMTP_STARTTLS': True,
+    'SMTP_LOGIN': True,
+    'SMTP_TIMEOUT': 30,
+    'OUTBOX_BATCH_SIZE': 50,
+    'OUTBOX_POLL_INTERVAL': 2.0,
+    'OUTBOX_MAX_ATTEMPTS': 5,
+    'OUTBOX_BACKOFF_SECONDS': 30,
+    'OUTBOX_CLAIM_SECONDS': 300,
+    'CACHE_BACKEND': 'memory',
+    'CACHE_MAX_ENTRIES': 10000,
+    'CACHE_TTL_SECONDS': 60,
+    'CACHE_REDIS_URL': 'redis://localhost:6379/0',
+    'HTTP_CACHE_PATH': 'http_cache.db',
+    'HTTP_CACHE_MAX_BYTES': 104857600,
+    'HTTP_CACHE_OFFLINE': False,
+    'LOG_FILE': 'hospital_app_logs.log',
+    'LOG_FORMAT': 'json',
+    'LOG_LEVEL': 'INFO',
+    'LOG_MODULE_LEVELS': {},
+    'LOG_MAX_BYTES': 10485760,
+    'LOG_BACKUP_COUNT': 5,
+    'LOG_ROTATE_WHEN': '',
+    'LOG_INFO_SAMPLE_RATE': 1.0,
+    'PROFILE_ENABLED': False,
+    'PROFILE_SAMPLE_RATE': 0.0,
+    'PROFILE_SLOW_MS': 500,
+}
+
+
+def _parse_env_value(value, default):
+    """Convert an environment string to the type of the default value."""
+    if isinstance(default, str):
+        return value
+    if isinstance(default, bool):
+        return value.strip().lower() in ('1', 'true', 'yes', 'on')
+    try:
+        return json.loads(value)
+    except ValueError:
+        return value
+
+
+def _merge(settings, overrides):
+    for key, value in overrides.items():
+        if isinstance(settings.get(key), dict) and isinstance(value, dict):
+            settings[key] = {**settings[key], **value}
+        else:
+            settings[key] = value
+
+
+def load_overrides(settings, environ=os.environ):
+    """
+    Apply file and environment overrides to settings in place.
+
+    Args:
+        settings (dict): Settings to update.
+        environ (Mapping): Environment to read HMS_* variables from.
+
+    Returns:
+        dict: The updated settings.
+    """
+    path = environ.get('HMS_CONFIG_FILE')
+    if path:
+        with open(path, encoding='utf-8') as reader:
+            _merge(settings, json.load(reader))
+    for key, default in list(settings.items()):
+        value = environ.get(f'HMS_{key}')
+        if value is not None:
+            _merge(settings, {key: _parse_env_value(value, default)})
+    return settings
+
+
+load_overrides(config)
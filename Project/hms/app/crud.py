@@ -5,19 +5,24 @@ This module provides CRUD (Create, Read, Update, Delete) operations
 for managing patient records in the Hospital Management System.
 """
 
+from sqlalchemy import insert, select
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 
-from app.models import db, Patient
+from app.cache import patient_cache
+from app.models import db, EmailOutbox, Patient
 from app.exceptions import PatientNotFoundError, DatabaseError
 from app.logger import logger
 
 
-def create_patient(patient):
+def create_patient(patient, email=None):
     """
     Create a new patient record in the database.
 
     Args:
         patient (dict): Patient data containing 'id', 'name', 'age', 'disease'.
+        email (tuple | None): Optional (to_address, subject, body) notification
+            queued in the email outbox in the same transaction, so it is sent
+            only if the patient is saved and never lost if it is.
 
     Returns:
         dict: The newly created patient record as a dictionary.
@@ -33,8 +38,12 @@ def create_patient(patient):
             disease=patient["disease"],
         )
         db.session.add(patient_model)
+        if email is not None:
+            to_address, subject, body = email
+            db.session.add(EmailOutbox(to_address=to_address, subject=subject, body=body))
         db.session.commit()
-        logger.info("Patient created: %s", patient)
+        patient_cache.delete(patient_model.id)
+        logger.info("Patient created: %s", patient_model.id)
         return patient_model.to_dict()
     except IntegrityError as e:
         db.session.rollback()
@@ -48,6 +57,141 @@ def create_patient(patient):
         raise DatabaseError(str(e)) from e
 
 
+def create_patients_bulk(patients, chunk_size=1000):
+    """
+    Create many patient records using batched multi-row inserts.
+
+    Records are inserted ``chunk_size`` at a time with a single executemany
+    and one commit per chunk. Invalid records and duplicate IDs (already in
+    the database or repeated within the batch) are reported per row and do
+    not abort the rest of the import.
+
+    Args:
+        patients (Iterable[dict]): Patient records containing 'id', 'name',
+            'age', 'disease'. May be a lazy iterator.
+        chunk_size (int): Number of records inserted per transaction.
+
+    Returns:
+        dict: {"inserted": int, "failed": [{"index", "id", "error"}, ...]}
+
+    Raises:
+        DatabaseError: If a database error other than a duplicate ID occurs.
+    """
+    summary = {"inserted": 0, "failed": []}
+    chunk = []
+    for index, patient in enumerate(patients):
+        chunk.append((index, patient))
+        if len(chunk) >= chunk_size:
+            _insert_patient_chunk(chunk, summary)
+            chunk = []
+    if chunk:
+        _insert_patient_chunk(chunk, summary)
+    logger.info(
+        "Bulk patient import: %s inserted, %s failed",
+        summary["inserted"], len(summary["failed"]),
+    )
+    return summary
+
+
+_PATIENT_FIELDS = (("id", int), ("name", str), ("age", int), ("disease", str))
+
+
+def _patient_row(patient):
+    """
+    Validate one bulk record and return it as an insert row.
+
+    Raises:
+        KeyError: If a field is missing.
+        TypeError: If the record is not a dict or a field has the wrong type.
+    """
+    if not isinstance(patient, dict):
+        raise TypeError("record must be an object")
+    row = {}
+    for field, field_type in _PATIENT_FIELDS:
+        value = patient[field]
+        if not isinstance(value, field_type) or isinstance(value, bool):
+            raise TypeError(f"'{field}' must be {field_type.__name__}")
+        row[field] = value
+    return row
+
+
+def _duplicate_error(patient_id):
+    return f"Patient with ID {patient_id} already exists"
+
+
+def _insert_patient_chunk(chunk, summary):
+    """Validate, de-duplicate and insert one chunk of (index, patient) pairs."""
+    rows = []
+    for index, patient in chunk:
+        try:
+            rows.append((index, _patient_row(patient)))
+        except (KeyError, TypeError) as e:
+            patient_id = patient.get("id") if isinstance(patient, dict) else None
+            summary["failed"].append(
+                {"index": index, "id": patient_id, "error": f"Invalid patient record: {e}"}
+            )
+
+    to_insert = []
+    try:
+        ids = [row["id"] for _, row in rows]
+        existing = set(db.session.scalars(select(Patient.id).where(Patient.id.in_(ids))))
+        for index, row in rows:
+            if row["id"] in existing:
+                summary["failed"].append(
+                    {"index": index, "id": row["id"], "error": _duplicate_error(row["id"])}
+                )
+                continue
+            existing.add(row["id"])
+            to_insert.append((index, row))
+
+        if to_insert:
+            db.session.execute(insert(Patient), [row for _, row in to_insert])
+        db.session.commit()
+        summary["inserted"] += len(to_insert)
+    except IntegrityError as e:
+        # Another writer inserted one of these IDs after our check, or a row
+        # broke some other constraint. Retry this chunk row by row, each in
+        # its own transaction; SAVEPOINTs are avoided because the pysqlite
+        # driver does not support them without extra transaction setup.
+        db.session.rollback()
+        logger.error("Integrity error in bulk chunk, retrying per row - %s", e)
+        for index, row in to_insert:
+            _insert_patient_row(index, row, summary)
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        logger.error("Database error while bulk creating patients: %s", e)
+        raise DatabaseError(str(e)) from e
+
+
+def _insert_patient_row(index, row, summary):
+    """Insert and commit a single bulk row, reporting the constraint it broke."""
+    try:
+        db.session.execute(insert(Patient), [row])
+        db.session.commit()
+        summary["inserted"] += 1
+    except IntegrityError as e:
+        db.session.rollback()
+        if db.session.get(Patient, row["id"]) is not None:
+            error = _duplicate_error(row["id"])
+        else:
+            error = str(e.orig)
+        summary["failed"].append({"index": index, "id": row["id"], "error": error})
+
+
+def _patient_dicts(statement):
+    """
+    Execute a Core select of patient columns and yield plain dicts.
+
+    Rows come straight from the cursor as tuples and are zipped with the
+    column keys looked up once, skipping ORM hydration and per-row
+    RowMapping construction.
+    """
+    result = db.session.execute(statement)
+    keys = tuple(result.keys())
+    for row in result:
+        yield dict(zip(keys, row))
+
+
 def read_all_patients():
     """
     Retrieve all patient records from the database.
@@ -59,14 +203,73 @@ def read_all_patients():
         DatabaseError: If a database error occurs.
     """
     try:
-        patients = db.session.query(Patient).all()
+        patients = list(_patient_dicts(select(*Patient.dict_columns())))
         logger.info("Read all patients, count: %s", len(patients))
-        return [patient.to_dict() for patient in patients]
+        return patients
     except SQLAlchemyError as e:
         logger.error("Database error while reading all patients: %s", e)
         raise DatabaseError(str(e)) from e
 
 
+def read_patients_page(limit, after_id=None):
+    """
+    Retrieve one page of patient records using keyset pagination on ID.
+
+    Args:
+        limit (int): Maximum number of patients to return.
+        after_id (int | None): Only patients with an ID greater than this
+            are returned. None starts from the first patient.
+
+    Returns:
+        list[dict]: Up to ``limit`` patient records ordered by ID.
+
+    Raises:
+        DatabaseError: If a database error occurs.
+    """
+    try:
+        query = select(*Patient.dict_columns()).order_by(Patient.id)
+        if after_id is not None:
+            query = query.where(Patient.id > after_id)
+        patients = list(_patient_dicts(query.limit(limit)))
+        logger.info("Read patients page after %s, count: %s", after_id, len(patients))
+        return patients
+    except SQLAlchemyError as e:
+        logger.error("Database error while reading patients page: %s", e)
+        raise DatabaseError(str(e)) from e
+
+
+def iter_patients(batch_size=1000):
+    """
+    Lazily iterate over all patient records in ID order.
+
+    Rows are fetched from the cursor in batches of ``batch_size`` so only
+    one batch of rows is held in memory at a time.
+
+    Args:
+        batch_size (int): Number of rows fetched per round trip.
+
+    Yields:
+        dict: Patient record as a dictionary.
+
+    Raises:
+        DatabaseError: If a database error occurs.
+    """
+    try:
+        query = (
+            select(*Patient.dict_columns())
+            .order_by(Patient.id)
+            .execution_options(yield_per=batch_size)
+        )
+        count = 0
+        for patient in _patient_dicts(query):
+            count += 1
+            yield patient
+        logger.info("Streamed all patients, count: %s", count)
+    except SQLAlchemyError as e:
+        logger.error("Database error while streaming patients: %s", e)
+        raise DatabaseError(str(e)) from e
+
+
 def read_model_by_id(patient_id):
     """
     Retrieve a Patient model instance by ID.
@@ -91,6 +294,9 @@ def read_by_id(patient_id):
     """
     Retrieve a patient record by ID as a dictionary.
 
+    Results are served from the patient cache when present, so repeat
+    reads do not touch the database.
+
     Args:
         patient_id (int): The ID of the patient to fetch.
 
@@ -101,11 +307,25 @@ def read_by_id(patient_id):
         PatientNotFoundError: If no patient with the given ID exists.
         DatabaseError: If a database error occurs.
     """
-    patient = read_model_by_id(patient_id)
-    if not patient:
+    cached = patient_cache.get(patient_id)
+    if cached is not None:
+        return cached
+    # taken before the query, so a write that commits while it runs keeps
+    # the row it replaced out of the cache
+    generation = patient_cache.generation()
+    try:
+        patient_dict = next(
+            _patient_dicts(select(*Patient.dict_columns()).where(Patient.id == patient_id)),
+            None,
+        )
+    except SQLAlchemyError as e:
+        logger.error("Database error while reading patient %s: %s", patient_id, e)
+        raise DatabaseError(str(e)) from e
+    if patient_dict is None:
         logger.error("Patient %s not found", patient_id)
         raise PatientNotFoundError(patient_id)
-    return patient.to_dict()
+    patient_cache.set(patient_id, patient_dict, generation)
+    return patient_dict
 
 
 def update(patient_id, new_patient):
@@ -132,7 +352,8 @@ def update(patient_id, new_patient):
         patient.age = new_patient["age"]
         patient.disease = new_patient["disease"]
         db.session.commit()
-        logger.info("Patient %s updated: %s", patient_id, new_patient)
+        patient_cache.delete(patient_id)
+        logger.info("Patient %s updated", patient_id)
         return patient.to_dict()
     except SQLAlchemyError as e:
         db.session.rollback()
@@ -161,6 +382,7 @@ def delete_patient(patient_id):
     try:
         db.session.delete(patient)
         db.session.commit()
+        patient_cache.delete(patient_id)
         logger.info("Patient %s deleted", patient_id)
         return True
     except SQLAlchemyError as e:
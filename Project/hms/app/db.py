@@ -1,17 +1,49 @@
-
 """
 db.py - Database initialization
 """
 
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
 from app.models import db
 from app.config import config
 
 
+def _is_sqlite_memory(url):
+    url = make_url(url)
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+def engine_options(db_url):
+    """
+    Build SQLALCHEMY_ENGINE_OPTIONS for the given database URL.
+
+    Pool sizing does not apply to in-memory SQLite, which Flask-SQLAlchemy
+    serves from a single static connection.
+    """
+    options = dict(config["SQLALCHEMY_ENGINE_OPTIONS"])
+    if _is_sqlite_memory(db_url):
+        for key in ("pool_size", "max_overflow", "pool_recycle"):
+            options.pop(key, None)
+    return options
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Apply the configured PRAGMAs to every new SQLite connection."""
+    cursor = dbapi_connection.cursor()
+    for name, value in config["SQLITE_PRAGMAS"].items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+
 def init_db(application):
     """Initialize database with Flask app"""
     application.config["SQLALCHEMY_DATABASE_URI"] = config["DB_URL"]
-    application.config["SQLALCHEMY_ECHO"] = True
+    application.config["SQLALCHEMY_ECHO"] = config["SQLALCHEMY_ECHO"]
+    application.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(config["DB_URL"])
     db.init_app(application)
 
     with application.app_context():
+        if db.engine.dialect.name == "sqlite":
+            event.listen(db.engine, "connect", _set_sqlite_pragmas)
         db.create_all()
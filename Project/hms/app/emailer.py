@@ -1,9 +1,20 @@
 
 import smtplib
+import threading
+import time
+from datetime import timedelta
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+
+import click
+from sqlalchemy import and_, select, update
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.config import config
 from app.exceptions import EmailError
 from app.logger import logger
+from app.metrics import EMAIL_SEND_SECONDS
+from app.models import db, EmailOutbox, utc_now
 
 # Configs (in real-world projects, load from env vars)
 FROM_ADDRESS = "stutisharma1409@gmail.com"
@@ -11,23 +22,314 @@ APP_PASSWORD = "bervzctemfhfhaln"  # App password from Google
 TO_ADDRESS = "sharmastuti14901@gmail.com"
 
 
+def _is_permanent(error):
+    """
+    Return True for SMTP errors that retrying cannot fix.
+
+    A refused recipient or a 5xx reply to the message will be refused again;
+    authentication failures are left to retry, as they are fixed by
+    correcting the configuration rather than the message.
+    """
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return True
+    return (
+        isinstance(error, smtplib.SMTPResponseException)
+        and not isinstance(error, smtplib.SMTPAuthenticationError)
+        and 500 <= error.smtp_code < 600
+    )
+
+
+def _build_message(to_address, subject, body):
+    """Build a plain-text MIME message"""
+    msg = MIMEMultipart()
+    msg["From"] = FROM_ADDRESS
+    msg["To"] = to_address
+    msg["Subject"] = subject
+    msg.attach(MIMEText(body, "plain"))
+    return msg
+
+
 def send_email(to_address, subject, body):
-    """Send an email using Gmail SMTP"""
+    """Send an email immediately over a new SMTP connection"""
     try:
-        msg = MIMEMultipart()
-        msg["From"] = FROM_ADDRESS
-        msg["To"] = to_address
-        msg["Subject"] = subject
-        msg.attach(MIMEText(body, "plain"))
-
-        server = smtplib.SMTP("smtp.gmail.com", 587)
-        server.starttls()
-        server.login(FROM_ADDRESS, APP_PASSWORD)
-        server.send_message(msg)
-        server.quit()
+        connection = SMTPConnection()
+        connection.send(_build_message(to_address, subject, body))
+        connection.close()
 
         logger.info(f"Email sent successfully to {to_address} with subject: {subject}")
         return True
     except Exception as e:
         logger.error("Failed to send email: %s", e)
         raise EmailError(str(e))
+
+
+def enqueue_email(to_address, subject, body):
+    """
+    Queue an email in the outbox table instead of sending it inline.
+
+    The background EmailDispatcher delivers it later, so the caller never
+    waits on an SMTP handshake. Emails that belong to a database change
+    should be queued in that change's transaction instead, as
+    crud.create_patient does.
+
+    Raises:
+        EmailError: If the email could not be stored in the outbox.
+    """
+    try:
+        db.session.add(EmailOutbox(to_address=to_address, subject=subject, body=body))
+        db.session.commit()
+        logger.info("Email queued for %s with subject: %s", to_address, subject)
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        logger.error("Failed to queue email: %s", e)
+        raise EmailError(str(e)) from e
+
+
+class SMTPConnection:
+    """
+    A lazily opened, reusable, authenticated SMTP connection.
+
+    The STARTTLS and login handshake happens once on the first send and is
+    reused for following messages until close() is called or the server
+    drops the connection.
+    """
+
+    def __init__(self, host=None, port=None, starttls=None, login=None, timeout=None):
+        self.host = host or config["SMTP_HOST"]
+        self.port = port or config["SMTP_PORT"]
+        self.starttls = config["SMTP_STARTTLS"] if starttls is None else starttls
+        self.login = config["SMTP_LOGIN"] if login is None else login
+        self.timeout = timeout or config["SMTP_TIMEOUT"]
+        self._server = None
+
+    def _connect(self):
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.starttls:
+            server.starttls()
+        if self.login:
+            server.login(FROM_ADDRESS, APP_PASSWORD)
+        return server
+
+    def send(self, msg):
+        """Send one message, reconnecting once if the server hung up."""
+        if self._server is None:
+            self._server = self._connect()
+        try:
+            self._server.send_message(msg)
+        except smtplib.SMTPServerDisconnected:
+            self._server = self._connect()
+            self._server.send_message(msg)
+
+    def close(self):
+        """Close the underlying connection if it is open."""
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._server = None
+
+
+class EmailDispatcher:
+    """
+    Background worker that drains the email outbox.
+
+    Due messages are claimed in batches and sent over a single reused SMTP
+    connection, so several dispatchers can drain the same outbox without
+    sending a message twice. Failed sends are retried with exponential
+    backoff until OUTBOX_MAX_ATTEMPTS is reached, after which they are
+    marked 'failed'; permanent SMTP errors are marked 'failed' at once.
+    """
+
+    def __init__(self, application, connection=None, batch_size=None,
+                 poll_interval=None, max_attempts=None, backoff_seconds=None):
+        self.application = application
+        self.connection = SMTPConnection() if connection is None else connection
+        self.batch_size = config["OUTBOX_BATCH_SIZE"] if batch_size is None else batch_size
+        self.poll_interval = config["OUTBOX_POLL_INTERVAL"] if poll_interval is None else poll_interval
+        self.max_attempts = config["OUTBOX_MAX_ATTEMPTS"] if max_attempts is None else max_attempts
+        self.backoff_seconds = (
+            config["OUTBOX_BACKOFF_SECONDS"] if backoff_seconds is None else backoff_seconds
+        )
+        self.claim_seconds = config["OUTBOX_CLAIM_SECONDS"]
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.send_seconds = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _claim(self, now):
+        """
+        Mark up to batch_size due messages as 'sending' and return their ids.
+
+        The claim is a single UPDATE, so two dispatchers never take the same
+        message. It is also a lease: next_attempt_at moves claim_seconds
+        ahead, and if the dispatcher dies before finishing, the message is
+        due again once that time has passed.
+        """
+        due = and_(
+            EmailOutbox.status.in_(("pending", "sending")),
+            EmailOutbox.next_attempt_at <= now,
+        )
+        batch = select(EmailOutbox.id).where(due).order_by(EmailOutbox.id).limit(self.batch_size)
+        ids = db.session.scalars(
+            update(EmailOutbox)
+            .where(EmailOutbox.id.in_(batch), due)
+            .values(status="sending", next_attempt_at=now + timedelta(seconds=self.claim_seconds))
+            .returning(EmailOutbox.id)
+            .execution_options(synchronize_session=False)
+        ).all()
+        db.session.commit()
+        return ids
+
+    def _release(self, ids, now):
+        """Hand claimed but unsent messages back to the queue."""
+        db.session.rollback()
+        db.session.execute(
+            update(EmailOutbox)
+            .where(EmailOutbox.id.in_(ids), EmailOutbox.status == "sending")
+            .values(status="pending", next_attempt_at=now)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+
+    def _record_failure(self, item, error, now):
+        item.attempts += 1
+        item.last_error = str(error)
+        if _is_permanent(error) or item.attempts >= self.max_attempts:
+            item.status = "failed"
+            self.failed += 1
+            logger.error("Giving up on email %s after %s attempts: %s",
+                         item.id, item.attempts, error)
+        else:
+            # the connection may be broken; the next send opens a new one
+            self.connection.close()
+            delay = self.backoff_seconds * 2 ** (item.attempts - 1)
+            item.status = "pending"
+            item.next_attempt_at = now + timedelta(seconds=delay)
+            self.retried += 1
+            logger.error("Email %s failed, retrying in %ss: %s", item.id, delay, error)
+
+    def dispatch_once(self):
+        """
+        Claim and send one batch of due outbox messages.
+
+        Returns:
+            int: Number of messages taken from the queue in this batch.
+        """
+        with self.application.app_context():
+            now = utc_now()
+            ids = self._claim(now)
+            if not ids:
+                return 0
+            due = db.session.scalars(
+                select(EmailOutbox).where(EmailOutbox.id.in_(ids)).order_by(EmailOutbox.id)
+            ).all()
+
+            started = time.perf_counter()
+            for index, item in enumerate(due):
+                try:
+                    send_started = time.perf_counter()
+                    self.connection.send(_build_message(item.to_address, item.subject, item.body))
+                    EMAIL_SEND_SECONDS.observe(time.perf_counter() - send_started)
+                    item.status = "sent"
+                    item.sent_at = utc_now()
+                    self.sent += 1
+                except (smtplib.SMTPException, OSError) as e:
+                    self._record_failure(item, e, now)
+                except BaseException:
+                    self._release([pending.id for pending in due[index:]], now)
+                    raise
+                # commit per message so a crash later in the batch
+                # cannot cause an already delivered email to be sent again
+                db.session.commit()
+            self.send_seconds += time.perf_counter() - started
+            logger.info("Dispatched %s queued emails", len(due))
+            return len(due)
+
+    def run(self):
+        """Dispatch in the calling thread until stop() is called."""
+        while not self._stop.is_set():
+            try:
+                taken = self.dispatch_once()
+            except Exception as e:
+                # keep the worker alive; the batch is picked up again next poll
+                logger.exception("Error in email dispatcher: %s", e)
+                taken = 0
+            if taken < self.batch_size:
+                self._stop.wait(self.poll_interval)
+        self.connection.close()
+
+    def start(self):
+        """Start the dispatcher on a daemon thread."""
+        self._thread = threading.Thread(target=self.run, name="email-dispatcher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """Ask the dispatcher to stop and wait for the thread to finish."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def metrics(self):
+        """
+        Return queue and throughput counters.
+
+        Returns:
+            dict: queue_depth, sent, failed, retried and send_rate
+            (messages per second spent sending).
+        """
+        with self.application.app_context():
+            queue_depth = (
+                db.session.query(EmailOutbox)
+                .filter(EmailOutbox.status.in_(("pending", "sending")))
+                .count()
+            )
+        return {
+            "queue_depth": queue_depth,
+            "sent": self.sent,
+            "failed": self.failed,
+            "retried": self.retried,
+            "send_rate": self.sent / self.send_seconds if self.send_seconds else 0.0,
+        }
+
+
+dispatcher = None
+
+
+def start_dispatcher(application):
+    """Create and start the process-wide email dispatcher."""
+    global dispatcher
+    dispatcher = EmailDispatcher(application)
+    dispatcher.start()
+    return dispatcher
+
+
+def init_cli(application):
+    """
+    Register the ``flask dispatch-emails`` command.
+
+    It runs the dispatcher in its own process, independent of how the web
+    app is served (e.g. next to gunicorn workers):
+
+        flask --app app.routes dispatch-emails
+        flask --app app.routes dispatch-emails --once   # drain and exit
+    """
+
+    @application.cli.command("dispatch-emails")
+    @click.option("--once", is_flag=True, help="Send the due emails and exit.")
+    def dispatch_emails(once):
+        """Send the queued notification emails."""
+        worker = EmailDispatcher(application)
+        try:
+            if once:
+                while worker.dispatch_once() == worker.batch_size:
+                    pass
+            else:
+                worker.run()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            worker.connection.close()
+        click.echo(f"sent={worker.sent} failed={worker.failed} retried={worker.retried}")
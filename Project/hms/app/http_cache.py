@@ -0,0 +1,48 @@
+"""
+http_cache.py
+
+The HMS app's on-disk HTTP cache. The HttpCache class is shared with the
+Day5 scrapers and lives in Day5/scrap/http_cache.py; this module loads it
+from there and builds the instance the scraper uses from config.
+
+Settings (see config.py): HTTP_CACHE_PATH (a relative path is taken from
+the instance folder, next to the database, not from the directory the app
+was started in), HTTP_CACHE_MAX_BYTES and HTTP_CACHE_OFFLINE.
+"""
+
+import importlib.util
+import os
+import sys
+
+from app.config import config
+
+HMS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INSTANCE_DIR = os.path.join(HMS_DIR, "instance") # Flask's default instance folder for the app
+SHARED_MODULE = "scrap_http_cache"
+SHARED_PATH = os.path.normpath(os.path.join(HMS_DIR, os.pardir, os.pardir, "Day5", "scrap", "http_cache.py"))
+
+
+def _load_shared():
+    """Import Day5/scrap/http_cache.py once, however this module is imported."""
+    module = sys.modules.get(SHARED_MODULE)
+    if module is None:
+        spec = importlib.util.spec_from_file_location(SHARED_MODULE, SHARED_PATH)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        sys.modules[SHARED_MODULE] = module
+    return module
+
+
+_shared = _load_shared()
+HttpCache = _shared.HttpCache
+CacheEntry = _shared.CacheEntry
+CachedResponse = _shared.CachedResponse
+
+
+def cache_path(path):
+    """Return path, with a relative one placed in the instance folder."""
+    return path if os.path.isabs(path) else os.path.join(INSTANCE_DIR, path)
+
+
+http_cache = HttpCache(cache_path(config["HTTP_CACHE_PATH"]), config["HTTP_CACHE_MAX_BYTES"],
+                       config["HTTP_CACHE_OFFLINE"])
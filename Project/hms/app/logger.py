@@ -2,15 +2,140 @@
 logger.py
 
 This module configures application-wide logging for the Hospital Management System.
-All logs are stored in 'hospital_app_logs.log' with timestamps and log levels.
+Request threads only put records on an in-memory queue; a background
+QueueListener formats them and writes them to a rotating log file
+('hospital_app_logs.log' by default), so logging never blocks on disk I/O.
+
+Settings (see config.py):
+    LOG_FILE, LOG_FORMAT ('json' lines or 'text'), LOG_LEVEL,
+    LOG_MODULE_LEVELS ({module name: level}), LOG_MAX_BYTES and
+    LOG_BACKUP_COUNT for size-based rotation, LOG_ROTATE_WHEN (e.g.
+    'midnight') for time-based rotation, LOG_INFO_SAMPLE_RATE to keep only
+    a fraction of INFO records.
 """
 
+import atexit
+import json
 import logging
+import logging.handlers
+import queue
+import random
+from datetime import datetime, timezone
+
+from app.config import config
+
+
+class JsonFormatter(logging.Formatter):
+    """Format a record as one JSON object per line."""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "module": record.module,
+            "message": record.getMessage(),
+        }
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        elif record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def _level(level):
+    return logging.getLevelName(level.upper()) if isinstance(level, str) else level
+
+
+class ModuleLevelFilter(logging.Filter):
+    """Drop records below the level configured for the module that logged them."""
+
+    def __init__(self, default_level, module_levels=None):
+        super().__init__()
+        self.default_level = _level(default_level)
+        self.module_levels = {
+            module: _level(level) for module, level in (module_levels or {}).items()
+        }
+
+    def filter(self, record):
+        return record.levelno >= self.module_levels.get(record.module, self.default_level)
+
+
+class InfoSamplingFilter(logging.Filter):
+    """Keep only a random fraction of INFO (and lower) records."""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno > logging.INFO or self.rate >= 1 or random.random() < self.rate
+
+
+class _FastQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that only interpolates the message in the caller's thread.
+
+    The stock handler runs the full formatter before enqueueing; here the
+    formatter runs in the listener thread instead.
+    """
+
+    def prepare(self, record):
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def _file_handler():
+    if config["LOG_ROTATE_WHEN"]:
+        handler = logging.handlers.TimedRotatingFileHandler(
+            config["LOG_FILE"], when=config["LOG_ROTATE_WHEN"],
+            backupCount=config["LOG_BACKUP_COUNT"], encoding="utf-8",
+        )
+    else:
+        handler = logging.handlers.RotatingFileHandler(
+            config["LOG_FILE"], maxBytes=config["LOG_MAX_BYTES"],
+            backupCount=config["LOG_BACKUP_COUNT"], encoding="utf-8",
+        )
+    if config["LOG_FORMAT"] == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(message)s"))
+    return handler
+
+
+def setup_logging():
+    """
+    Route root logging through a queue to a background file writer.
+
+    Returns:
+        logging.handlers.QueueListener | None: The started listener, or None
+        if logging was already set up (e.g. the module was imported under
+        a second name).
+    """
+    root = logging.getLogger()
+    if any(getattr(handler, "hms_queue_handler", False) for handler in root.handlers):
+        return None
+
+    level_filter = ModuleLevelFilter(config["LOG_LEVEL"], config["LOG_MODULE_LEVELS"])
+
+    queue_handler = _FastQueueHandler(queue.SimpleQueue())
+    queue_handler.hms_queue_handler = True
+    queue_handler.addFilter(level_filter)
+    queue_handler.addFilter(InfoSamplingFilter(config["LOG_INFO_SAMPLE_RATE"]))
+
+    root.addHandler(queue_handler)
+    root.setLevel(min([level_filter.default_level, *level_filter.module_levels.values()]))
+
+    listener = logging.handlers.QueueListener(
+        queue_handler.queue, _file_handler(), respect_handler_level=True
+    )
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
 
-logging.basicConfig(
-    filename="hospital_app_logs.log",
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s"
-)
 
+listener = setup_logging()
 logger = logging.getLogger(__name__)
@@ -0,0 +1,246 @@
+"""
+metrics.py
+
+Request-level timing and hot-path instrumentation for the Hospital
+Management System.
+
+init_metrics() installs before/after-request hooks that record per-endpoint
+latency, SQL query count and time (through SQLAlchemy cursor events) and
+response size, and exposes them with email send time, outbox depth and
+cache counters on a Prometheus-text ``/metrics`` endpoint. Requests can be
+profiled with cProfile on demand (``?profile=1``) or by sampling.
+"""
+
+import bisect
+import cProfile
+import io
+import pstats
+import random
+import threading
+import time
+
+from flask import Response, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.cache import patient_cache
+from app.config import config
+from app.logger import logger
+from app.models import db, EmailOutbox
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+class Histogram:
+    """Thread-safe Prometheus-style histogram with optional labels."""
+
+    def __init__(self, name, description, buckets, labelnames=()):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(buckets)
+        self.labelnames = tuple(labelnames)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labelvalues):
+        """Record one observation for the given label values."""
+        key = tuple(zip(self.labelnames, labelvalues))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0, 0.0]
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += 1
+            series[2] += value
+
+    def render(self):
+        """Return the histogram in Prometheus text exposition format."""
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, count, total) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    labels = _format_labels(key + (("le", bound),))
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                lines.append(f"{self.name}_bucket{_format_labels(key + (('le', '+Inf'),))} {count}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {total}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return lines
+
+    def reset(self):
+        """Drop all recorded observations."""
+        with self._lock:
+            self._series.clear()
+
+
+REQUEST_SECONDS = Histogram(
+    "hms_request_duration_seconds", "Request latency by endpoint.",
+    LATENCY_BUCKETS, ("endpoint", "method", "status"),
+)
+REQUEST_QUERIES = Histogram(
+    "hms_request_db_queries", "SQL statements executed per request.",
+    COUNT_BUCKETS, ("endpoint", "method"),
+)
+REQUEST_DB_SECONDS = Histogram(
+    "hms_request_db_seconds", "Time spent in SQL per request.",
+    LATENCY_BUCKETS, ("endpoint", "method"),
+)
+RESPONSE_BYTES = Histogram(
+    "hms_response_size_bytes", "Response body size by endpoint.",
+    SIZE_BUCKETS, ("endpoint", "method"),
+)
+EMAIL_SEND_SECONDS = Histogram(
+    "hms_email_send_duration_seconds", "Time to hand one email to the SMTP server.",
+    LATENCY_BUCKETS,
+)
+HISTOGRAMS = (REQUEST_SECONDS, REQUEST_QUERIES, REQUEST_DB_SECONDS, RESPONSE_BYTES, EMAIL_SEND_SECONDS)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # the start time lives on the statement's execution context, so a query
+    # that fails (and never reaches after_cursor_execute) leaves nothing behind
+    if context is not None:
+        context.hms_query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "hms_query_start", None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    if has_request_context() and "metrics_queries" in g:
+        g.metrics_queries += 1
+        g.metrics_db_seconds += elapsed
+
+
+def _should_profile():
+    if request.args.get("profile") == "1" and config["PROFILE_ENABLED"]:
+        return True
+    rate = config["PROFILE_SAMPLE_RATE"]
+    return rate > 0 and random.random() < rate
+
+
+def _profile_text(profiler):
+    stream = io.StringIO()
+    pstats.Stats(profiler, stream=stream).sort_stats("cumulative").print_stats(30)
+    return stream.getvalue()
+
+
+def _before_request():
+    g.metrics_start = time.perf_counter()
+    g.metrics_queries = 0
+    g.metrics_db_seconds = 0.0
+    if _should_profile():
+        g.metrics_profiler = cProfile.Profile()
+        g.metrics_profiler.enable()
+
+
+def _observe(endpoint, method, status, elapsed, queries, db_seconds, size):
+    REQUEST_SECONDS.observe(elapsed, endpoint, method, status)
+    REQUEST_QUERIES.observe(queries, endpoint, method)
+    REQUEST_DB_SECONDS.observe(db_seconds, endpoint, method)
+    if size is not None:
+        RESPONSE_BYTES.observe(size, endpoint, method)
+
+
+def _measure_stream(response, endpoint):
+    """
+    Record a streamed response once the server has sent and closed it.
+
+    The body generator runs after after_request returns, so its SQL, its
+    size and the full latency are only known at close; bytes are counted
+    as the chunks are yielded.
+    """
+    metrics = g._get_current_object() # outlives the request context
+    method = request.method
+    body = response.response
+    sent = [0]
+
+    def counted():
+        try:
+            for chunk in body:
+                if isinstance(chunk, str):
+                    chunk = chunk.encode("utf-8")
+                sent[0] += len(chunk)
+                yield chunk
+        finally:
+            close = getattr(body, "close", None)
+            if close is not None:
+                close()
+
+    def finish():
+        _observe(endpoint, method, response.status_code,
+                 time.perf_counter() - metrics.metrics_start,
+                 metrics.metrics_queries, metrics.metrics_db_seconds, sent[0])
+
+    response.response = counted()
+    response.call_on_close(finish)
+
+
+def _after_request(response):
+    if "metrics_start" not in g:
+        return response
+    elapsed = time.perf_counter() - g.metrics_start
+    endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+    if response.is_streamed:
+        _measure_stream(response, endpoint)
+    else:
+        _observe(endpoint, request.method, response.status_code, elapsed,
+                 g.metrics_queries, g.metrics_db_seconds, response.content_length)
+
+    profiler = g.pop("metrics_profiler", None)
+    if profiler is not None:
+        profiler.disable()
+        text = _profile_text(profiler)
+        if request.args.get("profile") == "1" and config["PROFILE_ENABLED"]:
+            return Response(text, mimetype="text/plain")
+        if elapsed * 1000 >= config["PROFILE_SLOW_MS"]:
+            logger.info("Slow request %s %s took %.1f ms\n%s",
+                        request.method, request.path, elapsed * 1000, text)
+    return response
+
+
+def render_metrics():
+    """Return all metrics in Prometheus text exposition format."""
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+
+    queue_depth = db.session.query(EmailOutbox).filter(EmailOutbox.status == "pending").count()
+    lines.extend([
+        "# HELP hms_email_outbox_depth Emails waiting in the outbox.",
+        "# TYPE hms_email_outbox_depth gauge",
+        f"hms_email_outbox_depth {queue_depth}",
+    ])
+    for name, value in patient_cache.stats().items():
+        if name in ("hits", "misses", "evictions", "expirations"):
+            lines.extend([
+                f"# TYPE hms_patient_cache_{name}_total counter",
+                f"hms_patient_cache_{name}_total {value}",
+            ])
+    return "\n".join(lines) + "\n"
+
+
+def init_metrics(application):
+    """Install the instrumentation hooks and the /metrics endpoint."""
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    application.before_request(_before_request)
+    application.after_request(_after_request)
+
+    @application.route("/metrics", methods=["GET"])
+    def metrics():
+        """Return Prometheus-text metrics."""
+        return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
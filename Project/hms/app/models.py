@@ -2,14 +2,21 @@
 models.py
 
 Defines the SQLAlchemy models for the Hospital Management System.
-Currently includes the Patient model.
+Includes the Patient model and the EmailOutbox queue table.
 """
 
+from datetime import datetime, timezone
+
 from flask_sqlalchemy import SQLAlchemy
 
 db = SQLAlchemy()
 
 
+def utc_now():
+    """Return the current time as a timezone-aware UTC datetime."""
+    return datetime.now(timezone.utc)
+
+
 class Patient(db.Model):
     """
     Patient model representing a hospital patient.
@@ -40,3 +47,54 @@ class Patient(db.Model):
             "age": self.age,
             "disease": self.disease,
         }
+
+    @classmethod
+    def dict_columns(cls):
+        """
+        Columns selected by the read fast path.
+
+        Selecting these with Core ``select()`` yields rows with the same keys
+        as to_dict(), without building Patient objects.
+        """
+        return (cls.id, cls.name, cls.age, cls.disease)
+
+
+class EmailOutbox(db.Model):
+    """
+    Durable queue of notification emails waiting to be sent.
+
+    Rows are written by request handlers and drained by the background
+    dispatcher in ``app.emailer``.
+
+    Attributes:
+        id (int): Queue position.
+        to_address (str): Recipient address.
+        subject (str): Email subject line.
+        body (str): Plain-text email body.
+        status (str): 'pending', 'sending' (claimed by a dispatcher),
+            'sent' or 'failed'.
+        attempts (int): Number of failed send attempts so far.
+        next_attempt_at (datetime): Earliest time the next attempt may run;
+            for a 'sending' row, when the dispatcher's claim runs out.
+        last_error (str): Error message from the last failed attempt.
+        created_at (datetime): When the email was queued.
+        sent_at (datetime): When the email was delivered.
+    """
+
+    __tablename__ = "email_outbox"
+    __table_args__ = (db.Index("ix_email_outbox_due", "status", "next_attempt_at"),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    to_address = db.Column(db.String(255), nullable=False)
+    subject = db.Column(db.String(255), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(16), nullable=False, default="pending")
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime(timezone=True), nullable=False, default=utc_now)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime(timezone=True), nullable=False, default=utc_now)
+    sent_at = db.Column(db.DateTime(timezone=True))
+
+    def __repr__(self):
+        """Return a string representation of the EmailOutbox row."""
+        return f"[id={self.id}, to={self.to_address}, status={self.status}, attempts={self.attempts}]"
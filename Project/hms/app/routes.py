@@ -5,27 +5,33 @@ Handles patient creation, reading, updating, and deletion
 with proper exception handling and logging.
 """
 
+import json
 from datetime import datetime
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 
-from app import crud, emailer
+from app import crud, emailer, stats
+from app.cache import patient_cache
+from app.config import config
 from app.db import init_db
 from app.exceptions import PatientNotFoundError, DatabaseError, EmailError
 from app.logger import logger
+from app.metrics import init_metrics
 
 application = Flask(__name__)
 init_db(application)
+init_metrics(application)
+emailer.init_cli(application)
 
 
 @application.route("/patients", methods=["POST"])
 def create_patient():
-    """Create a new patient and send an email notification."""
+    """Create a new patient and queue an email notification."""
     try:
         patient_dict = request.json
-        saved_patient = crud.create_patient(patient_dict)
 
-        # Send email notification
+        # Queue the email notification in the same transaction as the patient;
+        # the background dispatcher sends it
         now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         subject = f"{now} Patient {patient_dict['name']} Created"
         body = (
@@ -35,10 +41,9 @@ def create_patient():
             f"age : {patient_dict['age']}\n"
             f"disease : {patient_dict['disease']}\n"
         )
-        try:
-            emailer.send_email(emailer.TO_ADDRESS, subject, body)
-        except EmailError as e:
-            logger.error("Email sending failed: %s",e)
+        saved_patient = crud.create_patient(
+            patient_dict, email=(emailer.TO_ADDRESS, subject, body)
+        )
 
         return jsonify(saved_patient)
 
@@ -50,12 +55,139 @@ def create_patient():
         return jsonify({"error": "Internal server error"}), 500
 
 
+def _read_bulk_patients():
+    """
+    Read the bulk import body as an iterable of patient dicts.
+
+    NDJSON bodies (``application/x-ndjson``) are decoded lazily line by line;
+    a line that is not valid JSON is passed on as None so it is reported as
+    an invalid row. Any other body must be a JSON array.
+    """
+    if request.mimetype == "application/x-ndjson":
+        def lines():
+            for line in request.stream:
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    yield None
+        return lines()
+
+    patients = request.get_json(silent=True)
+    if not isinstance(patients, list):
+        raise ValueError("Request body must be a JSON array or NDJSON")
+    return patients
+
+
+@application.route("/patients/bulk", methods=["POST"])
+def create_patients_bulk():
+    """Create many patients in one request and queue one summary email."""
+    try:
+        summary = crud.create_patients_bulk(
+            _read_bulk_patients(), chunk_size=config["BULK_CHUNK_SIZE"]
+        )
+
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        subject = f"{now} Bulk import: {summary['inserted']} Patients Created"
+        body = (
+            f"Bulk patient import finished.\n\n"
+            f"inserted : {summary['inserted']}\n"
+            f"failed : {len(summary['failed'])}\n"
+        )
+        try:
+            emailer.enqueue_email(emailer.TO_ADDRESS, subject, body)
+        except EmailError as e:
+            logger.error("Email queueing failed: %s",e)
+
+        return jsonify(summary)
+
+    except ValueError as e:
+        logger.error("Invalid bulk import body: %s",e)
+        return jsonify({"error": str(e)}), 400
+    except DatabaseError as e:
+        logger.error("Database error in create_patients_bulk: %s",e)
+        return jsonify({"error": str(e)}), 500
+    except Exception as e:
+        logger.error("Unexpected error in create_patients_bulk: %s",e)
+        return jsonify({"error": "Internal server error"}), 500
+
+
+def _int_arg(name, default=None):
+    """Read an integer query parameter, raising ValueError if malformed."""
+    value = request.args.get(name)
+    if value is None:
+        return default
+    return int(value)
+
+
+def _stream_patients(encode, prefix="", separator="", suffix=""):
+    """
+    Stream all patients as text chunks, one chunk per fetched batch.
+
+    Args:
+        encode (callable): Serializes one patient dict to a string.
+        prefix (str): Text sent before the first record.
+        separator (str): Text placed between two records.
+        suffix (str): Text sent after the last record; left off if the
+            query fails part-way through.
+
+    Yields:
+        str: Encoded chunk of the response body.
+    """
+    batch_size = config["STREAM_BATCH_SIZE"]
+    chunk = [prefix]
+    first = True
+    try:
+        for patient in crud.iter_patients(batch_size=batch_size):
+            if not first:
+                chunk.append(separator)
+            chunk.append(encode(patient))
+            first = False
+            if len(chunk) >= 2 * batch_size:
+                yield "".join(chunk)
+                chunk = []
+    except DatabaseError as e:
+        # Headers are already sent, so the stream can only be cut short;
+        # the suffix is left off so a client can't take it for a full list.
+        logger.error("Database error while streaming patients: %s", e)
+        yield "".join(chunk)
+        return
+    chunk.append(suffix)
+    yield "".join(chunk)
+
+
 @application.route("/patients", methods=["GET"])
 def read_all_patients():
-    """Return a list of all patients."""
+    """
+    Return patients without loading the whole table into memory.
+
+    Query parameters:
+        limit / after_id: return one keyset page as
+            {"patients": [...], "next_after_id": <id or null>}.
+        format=ndjson: stream one JSON object per line.
+
+    Without parameters the full list is streamed as a chunked JSON array.
+    """
     try:
-        patients = crud.read_all_patients()
-        return jsonify(patients)
+        if "limit" in request.args or "after_id" in request.args:
+            limit = _int_arg("limit", config["PAGE_SIZE_DEFAULT"])
+            after_id = _int_arg("after_id")
+            if limit < 1 or limit > config["PAGE_SIZE_MAX"]:
+                raise ValueError(f"limit must be between 1 and {config['PAGE_SIZE_MAX']}")
+            patients = crud.read_patients_page(limit, after_id)
+            next_after_id = patients[-1]["id"] if len(patients) == limit else None
+            return jsonify({"patients": patients, "next_after_id": next_after_id})
+
+        if request.args.get("format") == "ndjson":
+            body = _stream_patients(lambda patient: json.dumps(patient) + "\n")
+            return Response(stream_with_context(body), mimetype="application/x-ndjson")
+
+        body = _stream_patients(json.dumps, prefix="[", separator=",", suffix="]")
+        return Response(stream_with_context(body), mimetype="application/json")
+    except ValueError as e:
+        logger.error("Invalid pagination parameters: %s", e)
+        return jsonify({"error": str(e)}), 400
     except DatabaseError as e:
         logger.error("Database error in read_all_patients: %s",e)
         return jsonify({"error": str(e)}), 500
@@ -64,6 +196,34 @@ def read_all_patients():
         return jsonify({"error": "Internal server error"}), 500
 
 
+@application.route("/patients/stats", methods=["GET"])
+def patient_stats():
+    """
+    Return cohort statistics for a numeric patient column.
+
+    Query parameters:
+        column: numeric column to summarise (default 'age').
+        mode: 'numpy' (full statistics) or 'sql' (aggregates in the database).
+        bins: number of histogram bins (numpy mode, default 10).
+    """
+    try:
+        result = stats.patient_stats(
+            column=request.args.get("column", "age"),
+            mode=request.args.get("mode", "numpy"),
+            bins=_int_arg("bins", 10),
+        )
+        return jsonify(result)
+    except ValueError as e:
+        logger.error("Invalid stats parameters: %s",e)
+        return jsonify({"error": str(e)}), 400
+    except DatabaseError as e:
+        logger.error("Database error in patient_stats: %s",e)
+        return jsonify({"error": str(e)}), 500
+    except Exception as e:
+        logger.error("Unexpected error in patient_stats: %s",e)
+        return jsonify({"error": "Internal server error"}), 500
+
+
 @application.route("/patients/<int:patient_id>", methods=["GET"])
 def read_patient_by_id(patient_id):
     """Return patient details by ID."""
@@ -114,3 +274,9 @@ def delete_patient(patient_id):
     except Exception as e:
         logger.error("Unexpected error in delete_patient: %s",e)
         return jsonify({"error": "Internal server error"}), 500
+
+
+@application.route("/cache/stats", methods=["GET"])
+def cache_stats():
+    """Return patient cache hit/miss/eviction counters."""
+    return jsonify(patient_cache.stats())
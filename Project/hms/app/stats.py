@@ -0,0 +1,212 @@
+"""
+stats.py
+
+Cohort statistics for the Hospital Management System.
+
+Numeric patient columns are pulled straight from SQL into NumPy arrays and
+summarised with vectorized operations (mean, median, percentiles,
+histograms and group-by-disease aggregates). For very large tables the
+same aggregates that SQL can compute natively (COUNT, AVG, MIN, MAX,
+GROUP BY) are pushed down to the database instead.
+"""
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.exceptions import DatabaseError
+from app.logger import logger
+from app.models import db, Patient
+
+# Columns that may be summarised; add new numeric columns here.
+NUMERIC_COLUMNS = {
+    "age": Patient.age,
+}
+
+DEFAULT_PERCENTILES = (25, 50, 75, 90, 99)
+
+
+def _numeric_column(column):
+    """Return the model column for a numeric column name."""
+    try:
+        return NUMERIC_COLUMNS[column]
+    except KeyError:
+        raise ValueError(
+            f"Unknown numeric column '{column}', expected one of {sorted(NUMERIC_COLUMNS)}"
+        ) from None
+
+
+def load_column_by_disease(column="age", batch_size=10000):
+    """
+    Load a numeric column together with each patient's disease.
+
+    Rows are fetched from the cursor batch_size at a time and each batch is
+    written into NumPy arrays with np.fromiter, so the full result never
+    exists as Python row objects.
+
+    Returns:
+        tuple[numpy.ndarray, numpy.ndarray]: (values, diseases)
+
+    Raises:
+        ValueError: If the column is not a known numeric column.
+        DatabaseError: If a database error occurs.
+    """
+    model_column = _numeric_column(column)
+    value_chunks, disease_chunks = [], []
+    try:
+        result = db.session.execute(
+            select(model_column, Patient.disease).execution_options(yield_per=batch_size)
+        )
+        for rows in result.partitions():
+            value_chunks.append(np.fromiter((row[0] for row in rows), dtype=np.float64, count=len(rows)))
+            disease_chunks.append(np.fromiter((row[1] for row in rows), dtype=object, count=len(rows)))
+    except SQLAlchemyError as e:
+        logger.error("Database error while loading column %s: %s", column, e)
+        raise DatabaseError(str(e)) from e
+    if not value_chunks:
+        return np.empty(0, dtype=np.float64), np.empty(0, dtype=object)
+    return np.concatenate(value_chunks), np.concatenate(disease_chunks)
+
+
+def summarize(values, percentiles=DEFAULT_PERCENTILES, bins=10):
+    """
+    Compute descriptive statistics for an array of values.
+
+    Args:
+        values (numpy.ndarray): Values to summarise.
+        percentiles (Iterable[float]): Percentiles to report.
+        bins (int): Number of equal-width histogram bins.
+
+    Returns:
+        dict: count, mean, median, std, min, max, percentiles and histogram.
+        All statistics are None when there are no values.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    count = int(values.size)
+    if count == 0:
+        return {
+            "count": 0, "mean": None, "median": None, "std": None,
+            "min": None, "max": None,
+            "percentiles": {str(p): None for p in percentiles},
+            "histogram": {"edges": [], "counts": []},
+        }
+    percentiles = list(percentiles)
+    percentile_values = np.percentile(values, percentiles)
+    counts, edges = np.histogram(values, bins=bins)
+    return {
+        "count": count,
+        "mean": float(values.mean()),
+        "median": float(np.median(values)),
+        "std": float(values.std()),
+        "min": float(values.min()),
+        "max": float(values.max()),
+        "percentiles": {str(p): float(v) for p, v in zip(percentiles, percentile_values)},
+        "histogram": {"edges": edges.tolist(), "counts": counts.tolist()},
+    }
+
+
+def group_by(values, groups):
+    """
+    Aggregate values per group without a Python-level loop over rows.
+
+    Args:
+        values (numpy.ndarray): Numeric values.
+        groups (numpy.ndarray): Group label for each value.
+
+    Returns:
+        dict: {group: {"count", "mean", "min", "max"}}
+    """
+    if len(values) == 0:
+        return {}
+    labels, codes = np.unique(groups, return_inverse=True)
+    counts = np.bincount(codes)
+    sums = np.bincount(codes, weights=values)
+    mins = np.full(len(labels), np.inf)
+    maxs = np.full(len(labels), -np.inf)
+    np.minimum.at(mins, codes, values)
+    np.maximum.at(maxs, codes, values)
+    return {
+        str(label): {
+            "count": int(counts[i]),
+            "mean": float(sums[i] / counts[i]),
+            "min": float(mins[i]),
+            "max": float(maxs[i]),
+        }
+        for i, label in enumerate(labels)
+    }
+
+
+def sql_summary(column="age"):
+    """
+    Compute count/mean/min/max overall and per disease inside the database.
+
+    Only aggregates are transferred, so memory use does not depend on the
+    number of patients.
+
+    Returns:
+        dict: {"overall": {...}, "by_disease": {disease: {...}}}
+
+    Raises:
+        ValueError: If the column is not a known numeric column.
+        DatabaseError: If a database error occurs.
+    """
+    model_column = _numeric_column(column)
+    aggregates = (
+        func.count(model_column),
+        func.avg(model_column),
+        func.min(model_column),
+        func.max(model_column),
+    )
+
+    def to_dict(count, mean, minimum, maximum):
+        return {
+            "count": int(count),
+            "mean": None if mean is None else float(mean),
+            "min": None if minimum is None else float(minimum),
+            "max": None if maximum is None else float(maximum),
+        }
+
+    try:
+        overall = db.session.execute(select(*aggregates)).one()
+        grouped = db.session.execute(
+            select(Patient.disease, *aggregates).group_by(Patient.disease)
+        ).all()
+    except SQLAlchemyError as e:
+        logger.error("Database error while summarising column %s: %s", column, e)
+        raise DatabaseError(str(e)) from e
+    return {
+        "overall": to_dict(*overall),
+        "by_disease": {row[0]: to_dict(*row[1:]) for row in grouped},
+    }
+
+
+def patient_stats(column="age", mode="numpy", percentiles=DEFAULT_PERCENTILES, bins=10):
+    """
+    Return cohort statistics for a numeric patient column.
+
+    Args:
+        column (str): Name of a column in NUMERIC_COLUMNS.
+        mode (str): 'numpy' loads the column and computes full statistics;
+            'sql' pushes the aggregates down to the database.
+        percentiles (Iterable[float]): Percentiles to report (numpy mode).
+        bins (int): Number of histogram bins (numpy mode).
+
+    Returns:
+        dict: Statistics for the column.
+
+    Raises:
+        ValueError: If the column or mode is not supported.
+        DatabaseError: If a database error occurs.
+    """
+    if mode == "sql":
+        result = sql_summary(column)
+    elif mode == "numpy":
+        values, diseases = load_column_by_disease(column)
+        result = {
+            "overall": summarize(values, percentiles, bins),
+            "by_disease": group_by(values, diseases),
+        }
+    else:
+        raise ValueError(f"Unknown stats mode '{mode}', expected 'numpy' or 'sql'")
+    logger.info("Computed %s stats for column %s", mode, column)
+    return {"column": column, "mode": mode, **result}
@@ -1,5 +1,10 @@
+from app import emailer
 from app.routes import application
 
 if __name__ == "__main__":
+    # Deliver queued notification emails in the background. Under another
+    # server (e.g. gunicorn) run one `flask --app app.routes dispatch-emails`
+    # process instead; claims keep several dispatchers from double-sending
+    emailer.start_dispatcher(application)
     # Run Flask app
-    application.run(debug=True)
\ No newline at end of file
+    application.run(debug=True, use_reloader=False)
@@ -0,0 +1,85 @@
+"""
+Benchmark fixtures for the HMS API and CRUD layer.
+
+The benchmarks carry the ``benchmark`` marker and are skipped unless
+selected. Run them from the Project directory (requires pytest-benchmark):
+
+    python -m pytest hms/tests/benchmarks -m benchmark --benchmark-autosave
+    python -m pytest hms/tests/benchmarks -m benchmark --benchmark-compare \
+        --benchmark-compare-fail=median:10%
+
+Seed sizes come from HMS_BENCH_SIZES (comma separated, default 1000),
+e.g. HMS_BENCH_SIZES=1000,100000,1000000. Each size is seeded into a
+SQLite file under a temporary directory, with the app's PRAGMAs, so the
+numbers include real disk I/O and WAL commits. Notification emails are
+only queued in the outbox, so no SMTP server is contacted.
+"""
+
+import os
+
+import pytest
+from sqlalchemy import create_engine, event
+
+pytest.importorskip("pytest_benchmark")
+
+from hms.app import routes
+from hms.app.db import _set_sqlite_pragmas, db, engine_options
+
+SIZES = [int(size) for size in os.environ.get("HMS_BENCH_SIZES", "1000").split(",")]
+
+
+def make_patient(patient_id):
+    return {
+        "id": patient_id,
+        "name": f"Patient {patient_id}",
+        "age": patient_id % 90,
+        "disease": ("Flu", "Asthma", "Diabetes", "Heart Disease")[patient_id % 4],
+    }
+
+
+def pytest_collection_modifyitems(config, items):
+    """Skip benchmarks unless they are selected with -m benchmark or --benchmark-only."""
+    if "benchmark" in (config.getoption("markexpr") or "") or config.getoption("benchmark_only"):
+        return
+    skip = pytest.mark.skip(reason="benchmark; run with -m benchmark")
+    for item in items:
+        if item.get_closest_marker("benchmark"):
+            item.add_marker(skip)
+
+
+def record_percentiles(benchmark, rows=1):
+    """
+    Attach p50 (and p99 with at least 100 rounds) latency and throughput to
+    the saved benchmark JSON.
+    """
+    if not benchmark.stats:
+        return
+    data = sorted(benchmark.stats.stats.data)
+    benchmark.extra_info["p50_ms"] = data[int(0.50 * (len(data) - 1))] * 1000
+    if len(data) >= 100:
+        benchmark.extra_info["p99_ms"] = data[int(0.99 * (len(data) - 1))] * 1000
+    benchmark.extra_info["rows_per_sec"] = rows / benchmark.stats.stats.mean
+
+
+@pytest.fixture(scope="module", params=SIZES, ids=lambda size: f"n{size}")
+def seeded(request, tmp_path_factory):
+    """Yield (test client, seed size) with ``size`` patients in a SQLite file."""
+    size = request.param
+    db_url = f"sqlite:///{tmp_path_factory.mktemp('bench') / 'hms.db'}"
+    engine = create_engine(db_url, **engine_options(db_url))
+    event.listen(engine, "connect", _set_sqlite_pragmas)
+    with routes.application.app_context():
+        # db.engines is the app's live bind map; swap the default engine for
+        # the file database while this module runs
+        memory_engine = db.engines[None]
+        db.engines[None] = engine
+        db.create_all()
+        routes.crud.create_patients_bulk(
+            (make_patient(i) for i in range(1, size + 1)), chunk_size=10000
+        )
+        yield routes.application.test_client(), size
+        db.session.remove()
+        db.drop_all()
+        db.engines[None] = memory_engine
+        routes.patient_cache.clear()
+    engine.dispose()
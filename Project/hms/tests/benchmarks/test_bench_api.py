@@ -0,0 +1,120 @@
+import itertools
+import json
+
+import pytest
+from sqlalchemy import create_engine
+
+from hms.app import batch_calc, routes
+from hms.app.db import db
+
+from .conftest import make_patient, record_percentiles
+
+pytestmark = pytest.mark.benchmark
+
+# enough rounds for a meaningful p99 on the per-request benchmarks
+ROUNDS = 200
+
+
+def _post_json(client, url, payload):
+    return client.post(url, data=json.dumps(payload), content_type="application/json")
+
+
+def test_read_by_id_cached(benchmark, seeded):
+    client, size = seeded
+    client.get(f"/patients/{size // 2}")
+    benchmark.pedantic(client.get, args=(f"/patients/{size // 2}",), rounds=ROUNDS)
+    record_percentiles(benchmark)
+
+def test_read_by_id_uncached(benchmark, seeded):
+    client, size = seeded
+    benchmark.pedantic(
+        client.get, args=(f"/patients/{size // 2}",),
+        setup=routes.patient_cache.clear, rounds=ROUNDS,
+    )
+    record_percentiles(benchmark)
+
+def test_read_page(benchmark, seeded):
+    client, size = seeded
+    benchmark.pedantic(client.get, args=(f"/patients?limit=100&after_id={size // 2}",), rounds=ROUNDS)
+    record_percentiles(benchmark, rows=100)
+
+def test_read_all_streamed(benchmark, seeded):
+    client, size = seeded
+    benchmark.pedantic(lambda: client.get("/patients").get_data(), rounds=5)
+    record_percentiles(benchmark, rows=size)
+
+def test_read_all_orm_objects(benchmark, seeded):
+    """Baseline for the projection fast path: hydrate Patient objects, then to_dict()."""
+    client, size = seeded
+    with routes.application.app_context():
+        benchmark.pedantic(
+            lambda: [patient.to_dict() for patient in db.session.query(routes.crud.Patient).all()],
+            rounds=5,
+        )
+    record_percentiles(benchmark, rows=size)
+
+def test_read_all_column_projection(benchmark, seeded):
+    client, size = seeded
+    with routes.application.app_context():
+        benchmark.pedantic(routes.crud.read_all_patients, rounds=5)
+    record_percentiles(benchmark, rows=size)
+
+def test_create_patient(benchmark, seeded):
+    client, size = seeded
+    ids = itertools.count(size + 1)
+    benchmark.pedantic(lambda: _post_json(client, "/patients", make_patient(next(ids))), rounds=ROUNDS)
+    record_percentiles(benchmark)
+
+def test_update_patient(benchmark, seeded):
+    client, size = seeded
+    patient = make_patient(1)
+    benchmark.pedantic(
+        lambda: client.put("/patients/1", data=json.dumps(patient), content_type="application/json"),
+        rounds=ROUNDS,
+    )
+    record_percentiles(benchmark)
+
+def test_delete_patient(benchmark, seeded):
+    client, size = seeded
+    ids = itertools.count(10 * size + 1)
+
+    def setup():
+        patient_id = next(ids)
+        _post_json(client, "/patients", make_patient(patient_id))
+        return (f"/patients/{patient_id}",), {}
+
+    benchmark.pedantic(client.delete, setup=setup, rounds=ROUNDS)
+    record_percentiles(benchmark)
+
+def test_bulk_create(benchmark, seeded):
+    client, size = seeded
+    ids = itertools.count(20 * size + 1)
+
+    def setup():
+        return ("/patients/bulk", [make_patient(next(ids)) for _ in range(1000)]), {}
+
+    benchmark.pedantic(lambda url, rows: _post_json(client, url, rows), setup=setup, rounds=5)
+    record_percentiles(benchmark, rows=1000)
+
+def test_stats_numpy(benchmark, seeded):
+    client, size = seeded
+    benchmark.pedantic(client.get, args=("/patients/stats",), rounds=5)
+    record_percentiles(benchmark, rows=size)
+
+def test_stats_sql(benchmark, seeded):
+    client, size = seeded
+    benchmark.pedantic(client.get, args=("/patients/stats?mode=sql",), rounds=5)
+    record_percentiles(benchmark, rows=size)
+
+def test_batch_calc_aggregate_database(benchmark, seeded, tmp_path):
+    client, size = seeded
+    db_url = f"sqlite:///{tmp_path / 'bench.db'}"
+    engine = create_engine(db_url)
+    db.Model.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(
+            batch_calc.Patient.__table__.insert(),
+            [make_patient(i) for i in range(1, size + 1)],
+        )
+    benchmark.pedantic(batch_calc.aggregate_database, args=(db_url,), kwargs={"workers": 2}, rounds=3)
+    record_percentiles(benchmark, rows=size)
@@ -1,9 +1,18 @@
 
+import os
+
 import pytest
+
+# run the app against an in-memory database; must be set before the
+# routes module initialises the app
+os.environ['HMS_DB_URL'] = 'sqlite:///:memory:'
+
 from hms.app import routes
-from hms.app.db import db, init_db
+from hms.app.db import db
 from hms.app.routes import application
 
+application.config['TESTING'] = True
+
 pytestmark = pytest.mark.asyncio
 @pytest.fixture
 def event_loop():
@@ -14,12 +23,7 @@ def event_loop():
     
 @pytest.fixture
 def client():
-    # configure app for testing
-    application.config['TESTING'] = True
-    application.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
-
-    init_db(application)
-
+    routes.patient_cache.clear()
     with routes.application.app_context():
         db.create_all()
         yield routes.application.test_client()
@@ -1,5 +1,11 @@
 
+import json
+
+import numpy as np
+from sqlalchemy import create_engine, insert
+
 from hms.app import batch_calc
+from hms.app.batch_calc import Patient
 
 def test_threaded_avg_age():
     patients = [
@@ -20,3 +26,47 @@ def test_async_avg_age(event_loop):
         batch_calc.calculate_average_age_async(patients, batch_size=2)
     )
     assert round(avg_age, 2) == round((34 + 45 + 29) / 3, 2)
+
+def test_partial_aggregates_merge_exactly():
+    values = np.arange(1, 1001, dtype=np.float64)
+    merged = batch_calc.PartialAggregate()
+    for chunk in np.array_split(values, 7):
+        merged.merge(batch_calc.PartialAggregate.from_array(chunk))
+    result = merged.result()
+    assert result["count"] == 1000
+    assert result["mean"] == values.mean()
+    assert abs(result["std"] - values.std()) < 1e-9
+    assert (result["min"], result["max"]) == (1, 1000)
+
+def test_aggregate_ndjson_process_pool(tmp_path):
+    path = tmp_path / "patients.ndjson"
+    ages = [(i * 37) % 90 for i in range(5000)]
+    with open(path, "w") as writer:
+        for i, age in enumerate(ages):
+            writer.write(json.dumps({"id": i, "name": f"P{i}", "age": age, "disease": "Flu"}) + "\n")
+
+    result = batch_calc.aggregate_ndjson(str(path), workers=2, chunk_size=100)
+    assert result["count"] == 5000
+    assert abs(result["mean"] - np.mean(ages)) < 1e-9
+    assert abs(result["std"] - np.std(ages)) < 1e-9
+
+def test_aggregate_database_process_pool(tmp_path):
+    db_url = f"sqlite:///{tmp_path / 'patients.db'}"
+    engine = create_engine(db_url)
+    Patient.__table__.create(engine)
+    ages = [(i * 13) % 80 for i in range(1, 2001)]
+    with engine.begin() as connection:
+        connection.execute(insert(Patient.__table__), [
+            {"id": i, "name": f"P{i}", "age": age, "disease": "Flu"}
+            for i, age in enumerate(ages, start=1)
+        ])
+
+    result = batch_calc.aggregate_database(db_url, workers=2, chunk_size=64)
+    assert result["count"] == 2000
+    assert abs(result["mean"] - np.mean(ages)) < 1e-9
+    assert (result["min"], result["max"]) == (min(ages), max(ages))
+
+def test_reset_engines_drops_inherited_engines(tmp_path):
+    engine = batch_calc._engine(f"sqlite:///{tmp_path / 'patients.db'}")
+    batch_calc._reset_engines()
+    assert batch_calc._engine(f"sqlite:///{tmp_path / 'patients.db'}") is not engine
@@ -0,0 +1,69 @@
+import json
+
+from hms.app import routes
+from hms.app.cache import LRUCache
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(max_entries=2, ttl=60)
+    cache.set(1, {"id": 1})
+    cache.set(2, {"id": 2})
+    cache.get(1)
+    cache.set(3, {"id": 3})
+
+    assert cache.get(2) is None
+    assert cache.get(1) == {"id": 1}
+    assert cache.stats()["evictions"] == 1
+
+def test_lru_cache_expires_entries():
+    cache = LRUCache(max_entries=10, ttl=-1)
+    cache.set(1, {"id": 1})
+
+    assert cache.get(1) is None
+    assert cache.stats()["expirations"] == 1
+
+def test_lru_cache_skips_set_after_delete():
+    cache = LRUCache(max_entries=10, ttl=60)
+    generation = cache.generation()
+    cache.delete(1) # a writer committed while the reader queried
+    cache.set(1, {"id": 1, "age": 34}, generation)
+
+    assert cache.get(1) is None
+    cache.set(1, {"id": 1, "age": 35}, cache.generation())
+    assert cache.get(1) == {"id": 1, "age": 35}
+
+def test_read_by_id_does_not_cache_row_replaced_during_query(client, monkeypatch):
+    patient = {"id": 1, "name": "Alice Johnson", "age": 34, "disease": "Flu"}
+    client.post("/patients", data=json.dumps(patient), content_type="application/json")
+    patient_dicts = routes.crud._patient_dicts
+    def racing_patient_dicts(query):
+        rows = list(patient_dicts(query))
+        routes.patient_cache.delete(1) # update committed after the row was read
+        return iter(rows)
+    monkeypatch.setattr(routes.crud, "_patient_dicts", racing_patient_dicts)
+
+    assert client.get("/patients/1").get_json()["age"] == 34
+    assert routes.patient_cache.get(1) is None
+
+def test_read_by_id_served_from_cache(client):
+    patient = {"id": 1, "name": "Alice Johnson", "age": 34, "disease": "Flu"}
+    client.post("/patients", data=json.dumps(patient), content_type="application/json")
+
+    client.get("/patients/1")
+    response = client.get("/patients/1")
+    assert response.get_json()["name"] == "Alice Johnson"
+    stats = client.get("/cache/stats").get_json()
+    assert stats["misses"] == 1
+    assert stats["hits"] == 1
+
+def test_update_invalidates_cache(client):
+    patient = {"id": 1, "name": "Alice Johnson", "age": 34, "disease": "Flu"}
+    client.post("/patients", data=json.dumps(patient), content_type="application/json")
+    client.get("/patients/1")
+
+    patient["age"] = 35
+    client.put("/patients/1", data=json.dumps(patient), content_type="application/json")
+    assert client.get("/patients/1").get_json()["age"] == 35
+
+    client.delete("/patients/1")
+    assert client.get("/patients/1").status_code == 404
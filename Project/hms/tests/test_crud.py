@@ -1,6 +1,7 @@
-
 import json
 
+from hms.app import routes
+
 def test_create_patient(client):
     patient = {"id": 1, "name": "Alice Johnson", "age": 34, "disease": "Flu"}
     response = client.post("/patients", data=json.dumps(patient), content_type="application/json")
@@ -37,3 +38,111 @@ def test_delete_patient(client):
     assert response.status_code == 200
     data = response.get_json()
     assert data["message"] == "Deleted Successfully"
+
+def _create_patients(client, ids):
+    for pid in ids:
+        patient = {"id": pid, "name": f"Patient {pid}", "age": 20 + pid, "disease": "Flu"}
+        client.post("/patients", data=json.dumps(patient), content_type="application/json")
+
+def test_read_all_patients_streams_json_array(client):
+    _create_patients(client, [1, 2, 3])
+
+    response = client.get("/patients")
+    assert response.status_code == 200
+    assert [p["id"] for p in response.get_json()] == [1, 2, 3]
+
+def test_read_all_patients_stream_error_leaves_array_open(client, monkeypatch):
+    def failing_patients(batch_size):
+        yield {"id": 1, "name": "Alice", "age": 34, "disease": "Flu"}
+        raise routes.DatabaseError("connection lost")
+    monkeypatch.setattr(routes.crud, "iter_patients", failing_patients)
+
+    response = client.get("/patients")
+    body = response.get_data(as_text=True)
+    assert body.startswith('[{"id": 1')
+    assert not body.endswith("]")
+
+def test_read_all_patients_keyset_pagination(client):
+    _create_patients(client, [1, 2, 3, 4, 5])
+
+    response = client.get("/patients?limit=2")
+    data = response.get_json()
+    assert [p["id"] for p in data["patients"]] == [1, 2]
+    assert data["next_after_id"] == 2
+
+    response = client.get("/patients?limit=2&after_id=4")
+    data = response.get_json()
+    assert [p["id"] for p in data["patients"]] == [5]
+    assert data["next_after_id"] is None
+
+def test_read_all_patients_invalid_limit(client):
+    response = client.get("/patients?limit=abc")
+    assert response.status_code == 400
+
+def test_read_all_patients_ndjson(client):
+    _create_patients(client, [1, 2])
+
+    response = client.get("/patients?format=ndjson")
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    lines = response.get_data(as_text=True).splitlines()
+    assert [json.loads(line)["id"] for line in lines] == [1, 2]
+
+def test_create_patients_bulk_reports_duplicates(client):
+    _create_patients(client, [1])
+    patients = [
+        {"id": 1, "name": "Alice", "age": 34, "disease": "Flu"},
+        {"id": 2, "name": "Rahul", "age": 45, "disease": "Diabetes"},
+        {"id": 2, "name": "Rahul", "age": 45, "disease": "Diabetes"},
+        {"id": 3, "name": "Sophia"},
+        {"id": 4, "name": "John", "age": 50, "disease": "Asthma"},
+    ]
+    response = client.post("/patients/bulk", data=json.dumps(patients), content_type="application/json")
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["inserted"] == 2
+    assert [f["index"] for f in data["failed"]] == [3, 0, 2]
+
+    response = client.get("/patients")
+    assert [p["id"] for p in response.get_json()] == [1, 2, 4]
+
+def test_create_patients_bulk_ndjson(client):
+    body = "\n".join(
+        json.dumps({"id": pid, "name": f"Patient {pid}", "age": 30, "disease": "Flu"})
+        for pid in range(1, 6)
+    ) + "\nnot json\n"
+    response = client.post("/patients/bulk", data=body, content_type="application/x-ndjson")
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["inserted"] == 5
+    assert data["failed"][0]["index"] == 5
+
+def test_create_patients_bulk_rejects_non_array(client):
+    response = client.post("/patients/bulk", data=json.dumps({"id": 1}), content_type="application/json")
+    assert response.status_code == 400
+
+def test_create_patients_bulk_rejects_wrong_types(client):
+    patients = [
+        {"id": [1], "name": "Alice", "age": 34, "disease": "Flu"},
+        {"id": 2, "name": "Rahul", "age": "45", "disease": "Diabetes"},
+        {"id": 3, "name": "Sophia", "age": 29, "disease": "Asthma"},
+    ]
+    response = client.post("/patients/bulk", data=json.dumps(patients), content_type="application/json")
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["inserted"] == 1
+    assert [f["index"] for f in data["failed"]] == [0, 1]
+
+def test_create_patients_bulk_retries_chunk_per_row(client, monkeypatch):
+    _create_patients(client, [1])
+    # hide existing IDs from the pre-check, as if another writer raced us
+    monkeypatch.setattr(routes.crud.db.session, "scalars", lambda *args, **kwargs: iter(()))
+    patients = [
+        {"id": 1, "name": "Alice", "age": 34, "disease": "Flu"},
+        {"id": 2, "name": "Rahul", "age": 45, "disease": "Diabetes"},
+    ]
+    response = client.post("/patients/bulk", data=json.dumps(patients), content_type="application/json")
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["inserted"] == 1
+    assert data["failed"] == [{"index": 0, "id": 1, "error": "Patient with ID 1 already exists"}]
@@ -0,0 +1,40 @@
+from flask import Flask
+from sqlalchemy import text
+
+from hms.app.config import load_overrides
+from hms.app.db import db, init_db, config
+
+
+def test_load_overrides_from_env_and_file(tmp_path):
+    config_file = tmp_path / "hms.json"
+    config_file.write_text('{"SQLALCHEMY_ENGINE_OPTIONS": {"pool_size": 20}}')
+    settings = {
+        "DB_URL": "sqlite:///a.db",
+        "SQLALCHEMY_ECHO": False,
+        "SQLALCHEMY_ENGINE_OPTIONS": {"pool_size": 5, "max_overflow": 10},
+        "PAGE_SIZE_MAX": 1000,
+    }
+    environ = {
+        "HMS_CONFIG_FILE": str(config_file),
+        "HMS_DB_URL": "sqlite:///b.db",
+        "HMS_SQLALCHEMY_ECHO": "true",
+        "HMS_PAGE_SIZE_MAX": "50",
+    }
+    load_overrides(settings, environ)
+
+    assert settings["DB_URL"] == "sqlite:///b.db"
+    assert settings["SQLALCHEMY_ECHO"] is True
+    assert settings["PAGE_SIZE_MAX"] == 50
+    assert settings["SQLALCHEMY_ENGINE_OPTIONS"] == {"pool_size": 20, "max_overflow": 10}
+
+def test_init_db_applies_sqlite_pragmas(tmp_path, monkeypatch):
+    monkeypatch.setitem(config, "DB_URL", f"sqlite:///{tmp_path / 'hms.db'}")
+    application = Flask(__name__)
+    init_db(application)
+
+    with application.app_context():
+        assert application.config["SQLALCHEMY_ECHO"] is False
+        assert db.session.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert db.session.execute(text("PRAGMA synchronous")).scalar() == 1
+        assert db.session.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+        db.session.remove()
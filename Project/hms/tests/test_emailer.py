@@ -0,0 +1,171 @@
+import json
+import smtplib
+import socket
+
+import pytest
+from hms.app import routes
+from hms.app.routes import application
+
+emailer = routes.emailer
+
+
+class FakeConnection:
+    def __init__(self, failures=0, error=None):
+        self.failures = failures
+        self.error = error or smtplib.SMTPServerDisconnected("connection lost")
+        self.messages = []
+        self.closed = 0
+
+    def send(self, msg):
+        if self.failures:
+            self.failures -= 1
+            raise self.error
+        self.messages.append(msg)
+
+    def close(self):
+        self.closed += 1
+
+
+def test_create_patient_only_enqueues(client):
+    patient = {"id": 1, "name": "Alice Johnson", "age": 34, "disease": "Flu"}
+    client.post("/patients", data=json.dumps(patient), content_type="application/json")
+
+    queued = emailer.db.session.query(emailer.EmailOutbox).all()
+    assert len(queued) == 1
+    assert queued[0].status == "pending"
+    assert "Alice Johnson" in queued[0].subject
+
+def test_dispatcher_sends_batch_over_one_connection(client):
+    for i in range(3):
+        emailer.enqueue_email(emailer.TO_ADDRESS, f"subject {i}", "body")
+    connection = FakeConnection()
+    dispatcher = emailer.EmailDispatcher(application, connection=connection, batch_size=10)
+
+    assert dispatcher.dispatch_once() == 3
+    assert [m["Subject"] for m in connection.messages] == ["subject 0", "subject 1", "subject 2"]
+    assert dispatcher.metrics()["queue_depth"] == 0
+    assert dispatcher.metrics()["sent"] == 3
+
+def test_dispatcher_retries_with_backoff(client):
+    emailer.enqueue_email(emailer.TO_ADDRESS, "subject", "body")
+    connection = FakeConnection(failures=1)
+    dispatcher = emailer.EmailDispatcher(application, connection=connection, backoff_seconds=60)
+
+    dispatcher.dispatch_once()
+    item = emailer.db.session.query(emailer.EmailOutbox).one()
+    assert item.status == "pending"
+    assert item.attempts == 1
+    assert connection.closed == 1
+    # not due again until the backoff has elapsed
+    assert dispatcher.dispatch_once() == 0
+    assert dispatcher.metrics()["retried"] == 1
+
+def test_dispatcher_against_local_smtp_server(client):
+    aiosmtpd_controller = pytest.importorskip("aiosmtpd.controller")
+    aiosmtpd_handlers = pytest.importorskip("aiosmtpd.handlers")
+    handler = aiosmtpd_handlers.Sink()
+    received = []
+    async def handle_DATA(server, session, envelope):
+        received.append(envelope)
+        return "250 OK"
+    handler.handle_DATA = handle_DATA
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    controller = aiosmtpd_controller.Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    try:
+        connection = emailer.SMTPConnection(
+            host="127.0.0.1", port=port,
+            starttls=False, login=False, timeout=5,
+        )
+        emailer.enqueue_email(emailer.TO_ADDRESS, "hello", "body")
+        emailer.enqueue_email(emailer.TO_ADDRESS, "world", "body")
+        dispatcher = emailer.EmailDispatcher(application, connection=connection)
+        assert dispatcher.dispatch_once() == 2
+        connection.close()
+    finally:
+        controller.stop()
+    assert len(received) == 2
+
+def test_dispatcher_commits_each_sent_email(client):
+    emailer.enqueue_email(emailer.TO_ADDRESS, "first", "body")
+    emailer.enqueue_email(emailer.TO_ADDRESS, "second", "body")
+    connection = FakeConnection()
+    def send(msg):
+        if connection.messages:
+            raise RuntimeError("crashed mid-batch")
+        connection.messages.append(msg)
+    connection.send = send
+    dispatcher = emailer.EmailDispatcher(application, connection=connection)
+
+    with pytest.raises(RuntimeError):
+        dispatcher.dispatch_once()
+    emailer.db.session.rollback()
+    statuses = [item.status for item in emailer.db.session.query(emailer.EmailOutbox).order_by(emailer.EmailOutbox.id)]
+    assert statuses == ["sent", "pending"]
+
+def test_dispatcher_loop_survives_unexpected_errors(client):
+    dispatcher = emailer.EmailDispatcher(application, connection=FakeConnection(), poll_interval=0)
+    calls = []
+    def dispatch_once():
+        calls.append(1)
+        if len(calls) == 2:
+            dispatcher._stop.set()
+        raise RuntimeError("boom")
+    dispatcher.dispatch_once = dispatch_once
+
+    dispatcher.run()
+    assert len(calls) == 2
+    assert dispatcher.connection.closed == 1
+
+def test_failed_patient_insert_queues_no_email(client):
+    patient = {"id": 1, "name": "Alice Johnson", "age": 34, "disease": "Flu"}
+    client.post("/patients", data=json.dumps(patient), content_type="application/json")
+    response = client.post("/patients", data=json.dumps(patient), content_type="application/json")
+    assert response.status_code == 400
+
+    assert emailer.db.session.query(emailer.EmailOutbox).count() == 1
+
+def test_claimed_emails_are_not_sent_by_another_dispatcher(client):
+    for i in range(3):
+        emailer.enqueue_email(emailer.TO_ADDRESS, f"subject {i}", "body")
+    first = emailer.EmailDispatcher(application, connection=FakeConnection(), batch_size=2)
+    second = emailer.EmailDispatcher(application, connection=FakeConnection(), batch_size=10)
+
+    with application.app_context():
+        claimed = first._claim(emailer.utc_now())
+    assert len(claimed) == 2
+    assert second.dispatch_once() == 1
+    assert [m["Subject"] for m in second.connection.messages] == ["subject 2"]
+
+def test_expired_claim_is_sent_again(client):
+    emailer.enqueue_email(emailer.TO_ADDRESS, "subject", "body")
+    crashed = emailer.EmailDispatcher(application, connection=FakeConnection())
+    crashed.claim_seconds = -1 # the claim has already run out
+    with application.app_context():
+        crashed._claim(emailer.utc_now())
+
+    dispatcher = emailer.EmailDispatcher(application, connection=FakeConnection())
+    assert dispatcher.dispatch_once() == 1
+    assert emailer.db.session.query(emailer.EmailOutbox).one().status == "sent"
+
+def test_refused_recipient_fails_without_retry(client):
+    emailer.enqueue_email("nobody@example.com", "subject", "body")
+    refused = smtplib.SMTPRecipientsRefused({"nobody@example.com": (550, b"No such user")})
+    dispatcher = emailer.EmailDispatcher(application, connection=FakeConnection(failures=1, error=refused))
+
+    dispatcher.dispatch_once()
+    item = emailer.db.session.query(emailer.EmailOutbox).one()
+    assert item.status == "failed"
+    assert item.attempts == 1
+    assert dispatcher.metrics()["retried"] == 0
+
+def test_dispatch_emails_command_drains_outbox(client, monkeypatch):
+    for i in range(3):
+        emailer.enqueue_email(emailer.TO_ADDRESS, f"subject {i}", "body")
+    monkeypatch.setattr(emailer, "SMTPConnection", FakeConnection)
+
+    result = application.test_cli_runner().invoke(args=["dispatch-emails", "--once"])
+    assert result.exit_code == 0, result.output
+    assert "sent=3" in result.output
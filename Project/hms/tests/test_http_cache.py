@@ -0,0 +1,15 @@
+import os
+
+from hms.app import http_cache
+
+
+# HttpCache itself is tested with the Day5 scrapers (Day5/scrap/test_http_cache.py)
+def test_app_uses_the_shared_cache_class():
+    assert http_cache.HttpCache.__module__ == http_cache.SHARED_MODULE
+    assert isinstance(http_cache.http_cache, http_cache.HttpCache)
+
+
+def test_relative_cache_path_is_kept_in_the_instance_folder(tmp_path):
+    assert http_cache.cache_path("http_cache.db") == os.path.join(http_cache.INSTANCE_DIR, "http_cache.db")
+    assert http_cache.cache_path(str(tmp_path / "cache.db")) == str(tmp_path / "cache.db")
+    assert os.path.dirname(http_cache.http_cache.path) == http_cache.INSTANCE_DIR
@@ -0,0 +1,27 @@
+import json
+import logging
+
+from hms.app.logger import JsonFormatter, ModuleLevelFilter, InfoSamplingFilter
+
+
+def _record(level, module="crud", msg="Patient %s created", args=(1,)):
+    return logging.LogRecord("app", level, f"/app/{module}.py", 10, msg, args, None)
+
+def test_json_formatter_writes_one_object_per_line():
+    line = JsonFormatter().format(_record(logging.INFO))
+    entry = json.loads(line)
+    assert entry["level"] == "INFO"
+    assert entry["module"] == "crud"
+    assert entry["message"] == "Patient 1 created"
+
+def test_module_level_filter():
+    level_filter = ModuleLevelFilter("INFO", {"crud": "WARNING", "stats": "DEBUG"})
+    assert not level_filter.filter(_record(logging.INFO, module="crud"))
+    assert level_filter.filter(_record(logging.ERROR, module="crud"))
+    assert level_filter.filter(_record(logging.DEBUG, module="stats"))
+    assert not level_filter.filter(_record(logging.DEBUG, module="routes"))
+
+def test_info_sampling_filter_keeps_errors():
+    sampling = InfoSamplingFilter(0.0)
+    assert not sampling.filter(_record(logging.INFO))
+    assert sampling.filter(_record(logging.ERROR))
@@ -0,0 +1,78 @@
+import json
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from hms.app import routes
+from hms.app.metrics import Histogram
+
+config = routes.config
+
+
+def test_metrics_records_latency_and_queries(client):
+    patient = {"id": 1, "name": "Alice Johnson", "age": 34, "disease": "Flu"}
+    client.post("/patients", data=json.dumps(patient), content_type="application/json")
+    routes.patient_cache.clear()
+    client.get("/patients/1")
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    text = response.get_data(as_text=True)
+    assert 'hms_request_duration_seconds_count{endpoint="/patients/<int:patient_id>",method="GET",status="200"}' in text
+    assert 'hms_request_db_queries_bucket{endpoint="/patients/<int:patient_id>",method="GET",le="+Inf"}' in text
+    assert "hms_email_outbox_depth 1" in text
+    assert "hms_patient_cache_misses_total" in text
+
+def test_histogram_render():
+    histogram = Histogram("h", "help", (1, 5), ("endpoint",))
+    histogram.observe(0.5, "/a")
+    histogram.observe(3, "/a")
+    histogram.observe(10, "/a")
+
+    lines = histogram.render()
+    assert 'h_bucket{endpoint="/a",le="1"} 1' in lines
+    assert 'h_bucket{endpoint="/a",le="5"} 2' in lines
+    assert 'h_bucket{endpoint="/a",le="+Inf"} 3' in lines
+    assert 'h_count{endpoint="/a"} 3' in lines
+
+def test_profile_query_param(client, monkeypatch):
+    monkeypatch.setitem(config, "PROFILE_ENABLED", True)
+    response = client.get("/patients?limit=10&profile=1")
+    assert response.mimetype == "text/plain"
+    assert "function calls" in response.get_data(as_text=True)
+
+def test_profile_query_param_ignored_when_disabled(client):
+    response = client.get("/patients?limit=10&profile=1")
+    assert response.mimetype == "application/json"
+
+def test_failed_query_leaves_no_timing_state(client):
+    with routes.application.app_context():
+        connection = routes.crud.db.session.connection()
+        try:
+            connection.execute(text("SELECT * FROM no_such_table"))
+        except OperationalError:
+            routes.crud.db.session.rollback()
+        connection = routes.crud.db.session.connection()
+        assert "query_start" not in connection.info
+        connection.execute(text("SELECT 1"))
+
+def _metric(client, name):
+    for line in client.get("/metrics").get_data(as_text=True).splitlines():
+        if line.startswith(name + " "):
+            return float(line.split()[-1])
+    return 0.0
+
+def test_streamed_response_measured_when_closed(client):
+    patient = {"id": 1, "name": "Alice Johnson", "age": 34, "disease": "Flu"}
+    client.post("/patients", data=json.dumps(patient), content_type="application/json")
+    labels = '{endpoint="/patients",method="GET"}'
+    size_before = _metric(client, f"hms_response_size_bytes_sum{labels}")
+    queries_before = _metric(client, f"hms_request_db_queries_sum{labels}")
+
+    response = client.get("/patients?format=ndjson")
+    body = response.get_data()
+    response.close()
+
+    # the body's bytes and its SELECT are only known once it has been sent
+    assert _metric(client, f"hms_response_size_bytes_sum{labels}") - size_before == len(body)
+    assert _metric(client, f"hms_request_db_queries_sum{labels}") - queries_before >= 1
@@ -0,0 +1,57 @@
+import json
+
+import numpy as np
+from hms.app.stats import summarize, group_by, load_column_by_disease
+
+
+def _create_patients(client, patients):
+    body = json.dumps(patients)
+    client.post("/patients/bulk", data=body, content_type="application/json")
+
+def test_summarize():
+    result = summarize(np.array([10, 20, 30, 40]), percentiles=(50,), bins=2)
+    assert result["count"] == 4
+    assert result["mean"] == 25
+    assert result["median"] == 25
+    assert result["percentiles"]["50"] == 25
+    assert result["histogram"]["counts"] == [2, 2]
+
+def test_summarize_empty():
+    result = summarize(np.array([]))
+    assert result["count"] == 0
+    assert result["mean"] is None
+
+def test_group_by():
+    result = group_by(np.array([10.0, 20.0, 30.0]), np.array(["Flu", "Asthma", "Flu"], dtype=object))
+    assert result["Flu"] == {"count": 2, "mean": 20.0, "min": 10.0, "max": 30.0}
+    assert result["Asthma"]["count"] == 1
+
+def test_patient_stats_numpy_and_sql_agree(client):
+    _create_patients(client, [
+        {"id": 1, "name": "Alice", "age": 34, "disease": "Flu"},
+        {"id": 2, "name": "Rahul", "age": 45, "disease": "Diabetes"},
+        {"id": 3, "name": "Sophia", "age": 29, "disease": "Flu"},
+    ])
+
+    numpy_stats = client.get("/patients/stats").get_json()
+    sql_stats = client.get("/patients/stats?mode=sql").get_json()
+
+    assert abs(numpy_stats["overall"]["mean"] - (34 + 45 + 29) / 3) < 1e-9
+    assert numpy_stats["overall"]["median"] == 34
+    assert abs(sql_stats["overall"]["mean"] - numpy_stats["overall"]["mean"]) < 1e-9
+    assert numpy_stats["by_disease"]["Flu"]["count"] == sql_stats["by_disease"]["Flu"]["count"] == 2
+
+def test_patient_stats_rejects_unknown_column(client):
+    response = client.get("/patients/stats?column=name")
+    assert response.status_code == 400
+
+def test_load_column_by_disease_across_batches(client):
+    _create_patients(client, [
+        {"id": i, "name": f"Patient {i}", "age": 20 + i, "disease": "Flu" if i % 2 else "Asthma"}
+        for i in range(1, 6)
+    ])
+
+    values, diseases = load_column_by_disease("age", batch_size=2)
+    assert values.dtype == np.float64
+    assert sorted(values.tolist()) == [21.0, 22.0, 23.0, 24.0, 25.0]
+    assert sorted(diseases.tolist()) == ["Asthma", "Asthma", "Flu", "Flu", "Flu"]